@@ -1,12 +1,20 @@
 # app: movies/services.py
-from neomodel import db
+from neomodel import config as neomodel_config, db
 from .models import Document, Keyword, Item, Class
 
 from pathlib import Path
 import json
 import os
+import sys
+import threading
 from typing import Dict, List, Optional
 
+# The graph schema is defined once, in the ETL package at the repository root
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+from wikidata.neo4j_schema import ensure_schema
+
 # =============== CACHE (OPTION 2) =====================
 BASE_DIR = Path(__file__).resolve().parent
 CACHE_DIR = BASE_DIR / "graph_cache"
@@ -33,6 +41,30 @@ RETURN n, k, i, c, ancestors, subclassRels
 """
 
 
+# =============== SCHEMA ================================
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+def ensure_graph_schema() -> None:
+    """
+    Create the uniqueness constraints of the keyword graph once per process,
+    when the first Neo4j connection is opened. Raises while one is missing, so
+    no query is served on a graph without the indexes its lookups rely on.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        if db.driver is None:
+            db.set_connection(url=neomodel_config.DATABASE_URL)
+        # indexes still being built are fine here: they serve queries once ONLINE
+        ensure_schema(db.driver, wait=False)
+        _schema_ready = True
+
+
 # =============== HELPERS NEO4J/NEOMODEL ================
 
 def _get_or_create_document(docid: str) -> Document:
@@ -146,6 +178,7 @@ def ingest_doc_graph(docid, focus_keyword=None) -> dict:
             return json.load(f)
 
     # ---------- 2) Execute Cypher----------
+    ensure_graph_schema()
     rows, _ = db.cypher_query(CYPHER, {"docid": str(docid)})
 
     doc = _get_or_create_document(docid)
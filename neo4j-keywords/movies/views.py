@@ -1,7 +1,7 @@
 from django.http import JsonResponse
 from django.shortcuts import render
 from .models import Document
-from .services import ingest_doc_graph
+from .services import ensure_graph_schema, ingest_doc_graph
 from neomodel import db
 from .mysql_models import (
     Documents,
@@ -29,6 +29,7 @@ def home(request):
     doc_count = Documents.objects.count()
 
 
+    ensure_graph_schema()
     rows, _ = db.cypher_query("""
         MATCH (k:Keyword)-[:MAPS_TO]->(:Item)
         RETURN count(DISTINCT k) AS kw_count
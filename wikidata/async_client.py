@@ -0,0 +1,260 @@
+import asyncio
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Dict, Optional, TypeVar
+
+import aiohttp
+
+from . import config
+from .utils import abackoff_sleep
+
+T = TypeVar("T")
+
+THROTTLE_STATUSES = {429, 503}
+
+
+class ThrottledError(RuntimeError):
+    """The server asked us to slow down (HTTP 429/503 or a maxlag error)."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(value: Optional[str], default: float) -> float:
+    """Retry-After is either a number of seconds or an HTTP date."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class RateLimiter:
+    """
+    Token bucket with an adaptive refill rate (requests per second).
+
+    - on_success: additive increase while latency stays under the target,
+      multiplicative decrease when the server gets slow.
+    - on_error:    multiplicative decrease.
+    - on_throttle: halve the rate and hold every request until Retry-After has passed.
+    """
+
+    def __init__(self, rate: float, min_rate: float, max_rate: float,
+                 burst: float, target_latency: float):
+        self.rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.burst = float(burst)
+        self.target_latency = float(target_latency)
+        self.tokens = self.burst
+        self.queued = 0
+        self.throttle_events = 0
+        self.errors = 0
+        self.last_latency = 0.0
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait for a token (and for any Retry-After pause to end)."""
+        self.queued += 1
+        try:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+        finally:
+            self.queued -= 1
+
+    def on_success(self, latency: float) -> None:
+        self.last_latency = latency
+        if latency > self.target_latency:
+            self.rate = max(self.min_rate, self.rate * 0.9)
+        else:
+            self.rate = min(self.max_rate, self.rate + 0.1)
+
+    def on_error(self) -> None:
+        self.errors += 1
+        self.rate = max(self.min_rate, self.rate * 0.75)
+
+    def on_throttle(self, retry_after: float) -> None:
+        self.throttle_events += 1
+        self.rate = max(self.min_rate, self.rate * 0.5)
+        self.tokens = min(self.tokens, 0.0)
+        self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def stats(self) -> Dict:
+        return {
+            "rate": round(self.rate, 2),
+            "queued": self.queued,
+            "throttle_events": self.throttle_events,
+            "errors": self.errors,
+            "last_latency": round(self.last_latency, 3),
+            "paused_for": round(max(0.0, self._blocked_until - time.monotonic()), 1),
+        }
+
+
+class AsyncWikidataClient:
+    """
+    asyncio client for the Wikidata API.
+
+    - One aiohttp session, i.e. one persistent connection pool, for the whole run.
+    - At most 'max_in_flight' requests on the wire at the same time.
+    - An adaptive RateLimiter in front of every request; 'maxlag' is sent
+      with each call and 429/503/maxlag answers honour Retry-After.
+    Must be used from a single event loop (see run_sync()).
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None, timeout: Optional[float] = None):
+        self.max_in_flight = int(max_in_flight or getattr(config, "WIKIDATA_MAX_IN_FLIGHT", 8))
+        self.timeout = float(timeout or getattr(config, "WIKIDATA_TIMEOUT_SEC", 20))
+        self.requests_sent = 0
+        self.limiter = RateLimiter(
+            rate=getattr(config, "RATE_LIMIT_INITIAL", 10.0),
+            min_rate=getattr(config, "RATE_LIMIT_MIN", 0.5),
+            max_rate=getattr(config, "RATE_LIMIT_MAX", 50.0),
+            burst=getattr(config, "RATE_LIMIT_BURST", self.max_in_flight),
+            target_latency=getattr(config, "RATE_LIMIT_TARGET_LATENCY_SEC", 1.5),
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_in_flight, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=config.HEADERS,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._sem = asyncio.Semaphore(self.max_in_flight)
+        return self._session
+
+    async def _request(self, session: aiohttp.ClientSession, params: Dict) -> Dict:
+        """One HTTP round trip; raises ThrottledError when the server pushes back."""
+        await self.limiter.acquire()
+        async with self._sem:
+            self.requests_sent += 1
+            started = time.monotonic()
+            async with session.get(config.WIKIDATA_API, params=params) as r:
+                if r.status in THROTTLE_STATUSES:
+                    wait = _parse_retry_after(r.headers.get("Retry-After"), default=5.0)
+                    raise ThrottledError(f"HTTP {r.status}", wait)
+                r.raise_for_status()
+                data = await r.json(content_type=None)
+                retry_after = r.headers.get("Retry-After")
+            latency = time.monotonic() - started
+
+        error = data.get("error") if isinstance(data, dict) else None
+        if error:
+            if error.get("code") == "maxlag":
+                wait = _parse_retry_after(retry_after, default=float(error.get("lag") or 5.0))
+                raise ThrottledError(f"maxlag: {error.get('info', '')}", wait)
+            raise RuntimeError(error)
+        self.limiter.on_success(latency)
+        return data
+
+    async def get(self, params: Dict, retries: int = 5) -> Dict:
+        """GET config.WIKIDATA_API with 'params' and return the decoded JSON."""
+        session = self._ensure_session()
+        params = {**params, "format": "json"}
+        maxlag = getattr(config, "WIKIDATA_MAXLAG", 5)
+        if maxlag:
+            params.setdefault("maxlag", maxlag)
+        for attempt in range(retries):
+            try:
+                return await self._request(session, params)
+            except ThrottledError as exc:
+                # the wait itself happens in limiter.acquire() on the next attempt
+                self.limiter.on_throttle(exc.retry_after)
+                if attempt == retries - 1:
+                    raise
+            except Exception:
+                self.limiter.on_error()
+                if attempt == retries - 1:
+                    raise
+                await abackoff_sleep(attempt)
+        return {}
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# ------------------------- background event loop ----------------------------
+
+class _LoopThread:
+    """Event loop running in a daemon thread, so synchronous code can submit coroutines."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.pid = os.getpid()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="wikidata-io", daemon=True)
+        self.thread.start()
+
+
+_runner: Optional[_LoopThread] = None
+_client: Optional[AsyncWikidataClient] = None
+_runner_lock = threading.Lock()
+
+
+def _get_runner() -> _LoopThread:
+    global _runner, _client
+    with _runner_lock:
+        # a forked worker process inherits the object but not the thread
+        if _runner is None or _runner.pid != os.getpid():
+            _runner = _LoopThread()
+            _client = None
+        return _runner
+
+
+def get_client() -> AsyncWikidataClient:
+    """Process-wide client bound to the background loop."""
+    global _client
+    _get_runner()
+    with _runner_lock:
+        if _client is None:
+            _client = AsyncWikidataClient()
+        return _client
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """Run a coroutine on the background loop and block until it finishes."""
+    runner = _get_runner()
+    if threading.current_thread() is runner.thread:
+        raise RuntimeError("run_sync() called from the Wikidata I/O loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, runner.loop).result()
+
+
+def close_client() -> None:
+    """Close the shared HTTP session (call once at the end of the run)."""
+    global _client
+    if _runner is None or _runner.pid != os.getpid() or _client is None:
+        return
+    run_sync(_client.close())
+    _client = None
+
+
+def limiter_stats() -> Dict:
+    """Current state of the shared client's rate limiter (rate, queue, throttle events)."""
+    if _client is None:
+        return {}
+    return {**_client.limiter.stats(), "requests_sent": _client.requests_sent}
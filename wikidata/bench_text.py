@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark of the text helpers in utils.py (normalize_kw, tokenize, singularize_en).
+
+    python -m wikidata.bench_text [--records api/data/upec_n.json] [--passes 5]
+
+The corpus is real matcher input: HAL keywords and titles from the records file,
+candidate labels from the debug_scores_mode_*.csv files, and every label and
+alias of the entities in the persistent entity cache (config.CACHE_DB_PATH),
+when it exists. Each pass calls the helpers the way the matcher does
+(normalize, tokenize the normalized form, singularize) on every string.
+Timings are given for the previous implementation (uncompiled re.findall, no
+cache), the current one with no cache anywhere in the call chain, and the
+memoized one. Caches are cleared before each run.
+"""
+
+import argparse
+import csv
+import json
+import random
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from . import config
+from . import utils
+
+_HERE = Path(__file__).resolve().parent
+DEFAULT_RECORDS = _HERE.parent / "api" / "data" / "upec_n.json"
+
+# ----------------------------- previous implementation -----------------------
+
+def _legacy_normalize_kw(s: str) -> str:
+    if not s:
+        return ""
+    tokens = re.findall(r"[A-Za-z0-9\-\+]+", s)
+    normalized = []
+    for t in tokens:
+        if t.isalpha() and t.isupper() and 2 <= len(t) <= 5:
+            normalized.append(t)
+        else:
+            normalized.append(t.lower())
+    return " ".join(normalized)
+
+def _legacy_tokenize(text: str) -> List[str]:
+    return [t for t in utils._token_re.split((text or "")) if t]
+
+def _legacy_singularize_en(word: str) -> str:
+    w = _legacy_normalize_kw(word)
+    wl = w.lower()
+    if len(w) > 3 and wl.endswith("ies"): return w[:-3] + "y"
+    if len(w) > 3 and wl.endswith("ses"): return w[:-2]
+    if len(w) > 2 and wl.endswith("s") and not wl.endswith("ss"): return w[:-1]
+    return w
+
+# ----------------------------- corpus ----------------------------------------
+
+def _records_strings(path: Path) -> List[str]:
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    out = []
+    for rec in records:
+        out.extend(rec.get("keyword_s") or [])
+        if rec.get("title_s"):
+            out.append(rec["title_s"])
+    return out
+
+def _debug_csv_strings(folder: Path) -> List[str]:
+    out = []
+    for path in sorted(folder.glob("debug_scores_mode_*.csv")):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                out.extend(v for v in (row.get("kw"), row.get("label")) if v)
+    return out
+
+def _entity_cache_strings(path: Path) -> List[str]:
+    if not path.exists():
+        return []
+    out = []
+    conn = sqlite3.connect(str(path))
+    try:
+        for (value,) in conn.execute("SELECT value FROM entities"):
+            ent = json.loads(value) or {}
+            out.extend(v.get("value", "") for v in (ent.get("labels") or {}).values())
+            for aliases in (ent.get("aliases") or {}).values():
+                out.extend(a.get("value", "") for a in aliases)
+    except sqlite3.OperationalError:
+        pass    # no 'entities' table yet
+    finally:
+        conn.close()
+    return [s for s in out if s]
+
+def load_corpus(records: Path, cache_db: Path) -> List[str]:
+    return _records_strings(records) + _debug_csv_strings(_HERE) + _entity_cache_strings(cache_db)
+
+# ----------------------------- benchmark -------------------------------------
+
+def _run(corpus: List[str], passes: int, normalize: Callable, tokenize: Callable,
+         singularize: Callable) -> float:
+    utils.clear_text_caches()      # every run starts cold; only the memoized one fills them
+    start = time.perf_counter()
+    for _ in range(passes):
+        for s in corpus:
+            tokenize(normalize(s))
+            singularize(s)
+    return time.perf_counter() - start
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the memoized text helpers on real labels and aliases.")
+    ap.add_argument("--records", type=Path, default=DEFAULT_RECORDS, help="HAL records JSON (keywords, titles)")
+    ap.add_argument("--cache-db", type=Path, default=config.CACHE_DB_PATH, help="entity cache with labels/aliases")
+    ap.add_argument("--passes", type=int, default=5, help="times the corpus is replayed (strings recur across documents)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    corpus = load_corpus(args.records, args.cache_db)
+    if not corpus:
+        raise SystemExit("Empty corpus: pass --records and/or --cache-db")
+    random.Random(args.seed).shuffle(corpus)
+
+    # the new helpers must return what the old ones did
+    for s in corpus:
+        assert utils.normalize_kw(s) == _legacy_normalize_kw(s), s
+        assert utils.tokenize(s) == _legacy_tokenize(s), s
+        assert utils.singularize_en(s) == _legacy_singularize_en(s), s
+
+    print(f"📚 Corpus: {len(corpus)} strings ({len(set(corpus))} distinct), {args.passes} passes")
+    legacy = _run(corpus, args.passes, _legacy_normalize_kw, _legacy_tokenize, _legacy_singularize_en)
+    uncached = _run(corpus, args.passes, utils._normalize_kw, utils._tokenize, utils._singularize_uncached)
+    memoized = _run(corpus, args.passes, utils.normalize_kw, utils.tokenize, utils.singularize_en)
+
+    for name, sec in (("previous", legacy), ("precompiled", uncached), ("memoized", memoized)):
+        print(f"   {name:<12} {sec * 1000:9.1f} ms   x{legacy / sec:5.2f}")
+    for name, s in utils.text_cache_stats().items():
+        print(f"   {name:<15} {s['hits']} hits / {s['misses']} misses")
+
+
+if __name__ == "__main__":
+    main()
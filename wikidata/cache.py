@@ -0,0 +1,163 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from . import config
+
+# SQLite caps the number of host parameters per statement (999 on older builds).
+_SQL_CHUNK = 500
+
+
+class DiskCache:
+    """
+    Small persistent key/value store on top of SQLite.
+
+    - Values are JSON-serialised.
+    - Entries older than 'ttl_sec' are treated as misses (and purged on read).
+    - When the table grows past 'max_entries', the least recently used rows
+      are evicted down to 90% of the limit.
+    Several caches can share the same file, each one in its own table.
+    """
+
+    def __init__(self, path: Path, table: str, ttl_sec: float, max_entries: int):
+        self.path = Path(path)
+        self.table = table
+        self.ttl_sec = float(ttl_sec)
+        self.max_entries = int(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key      TEXT PRIMARY KEY,
+                value    TEXT NOT NULL,
+                created  REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed)")
+        self._conn.commit()
+        self._size = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    # ----------------------------- reads ---------------------------------
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, object]:
+        """Return {key: value} for the keys that are present and not expired."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        found, stale = {}, []
+        with self._lock:
+            for i in range(0, len(keys), _SQL_CHUNK):
+                part = keys[i:i + _SQL_CHUNK]
+                marks = ",".join("?" * len(part))
+                for key, value, created in self._conn.execute(
+                    f"SELECT key, value, created FROM {self.table} WHERE key IN ({marks})", part
+                ):
+                    if self.ttl_sec > 0 and now - created > self.ttl_sec:
+                        stale.append(key)
+                        continue
+                    found[key] = json.loads(value)
+
+            if found:
+                hit_keys = list(found)
+                for i in range(0, len(hit_keys), _SQL_CHUNK):
+                    part = hit_keys[i:i + _SQL_CHUNK]
+                    marks = ",".join("?" * len(part))
+                    self._conn.execute(
+                        f"UPDATE {self.table} SET accessed = ? WHERE key IN ({marks})", [now, *part]
+                    )
+            if stale:
+                self._delete(stale)
+                self.expired += len(stale)
+            self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str, default=None):
+        return self.get_many([key]).get(key, default)
+
+    # ----------------------------- writes --------------------------------
+
+    def put_many(self, items: Dict[str, object]) -> None:
+        """Insert or replace several entries, then enforce the size bound."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(k, json.dumps(v, ensure_ascii=False), now, now) for k, v in items.items()]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            # INSERT OR REPLACE counts a replace as delete + insert; good enough as an upper bound.
+            self._size += self._conn.total_changes - before
+            if self.max_entries > 0 and self._size > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def put(self, key: str, value) -> None:
+        self.put_many({key: value})
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+            self._size = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ----------------------------- helpers -------------------------------
+
+    def _delete(self, keys: List[str]) -> None:
+        for i in range(0, len(keys), _SQL_CHUNK):
+            part = keys[i:i + _SQL_CHUNK]
+            marks = ",".join("?" * len(part))
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key IN ({marks})", part)
+
+    def _evict(self) -> None:
+        """Drop least recently used rows until the table is back under 90% of the limit."""
+        self._size = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        target = int(self.max_entries * 0.9)
+        excess = self._size - target
+        if excess <= 0:
+            return
+        self._conn.execute(f"""
+            DELETE FROM {self.table} WHERE key IN (
+                SELECT key FROM {self.table} ORDER BY accessed ASC LIMIT ?
+            )
+        """, (excess,))
+        self.evicted += excess
+        self._size = target
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "size": self._size,
+        }
+
+
+def open_cache(table: str, ttl_sec: float, max_entries: int, path: Optional[Path] = None) -> DiskCache:
+    """Open a table in the shared cache database configured in config.CACHE_DB_PATH."""
+    return DiskCache(path or config.CACHE_DB_PATH, table, ttl_sec, max_entries)
@@ -0,0 +1,119 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from . import config
+
+
+class ProgressJournal:
+    """
+    Durable record of the (docid, keyword) pairs already mapped, with their CSV rows.
+
+    - record() only buffers; commit() writes the buffer in one transaction,
+      together with the byte size of the output CSV at that point.
+    - should_commit() says when a batch is due (CHECKPOINT_EVERY pairs or
+      CHECKPOINT_INTERVAL_SEC seconds), so journaling stays off the hot path.
+    On restart, done_pairs() is the work to skip and csv_offset() is where the
+    output CSV must be cut back to before appending (rows written after the
+    last commit are not journaled and will be produced again).
+    """
+
+    def __init__(self, path: Path, every: Optional[int] = None, interval_sec: Optional[float] = None):
+        self.path = Path(path)
+        self.every = int(every or getattr(config, "CHECKPOINT_EVERY", 500))
+        self.interval_sec = float(interval_sec or getattr(config, "CHECKPOINT_INTERVAL_SEC", 30))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pairs (
+                docid   TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                rows    TEXT NOT NULL,
+                PRIMARY KEY (docid, keyword)
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self._conn.commit()
+        self._buffer: List[Tuple[str, str, str]] = []
+        self._last_commit = time.monotonic()
+        self.committed = 0
+
+    # ----------------------------- reads ---------------------------------
+
+    def done_pairs(self) -> Set[Tuple[str, str]]:
+        with self._lock:
+            return {(d, k) for d, k in self._conn.execute("SELECT docid, keyword FROM pairs")}
+
+    def _meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def csv_offset(self) -> int:
+        return int(self._meta("csv_offset") or 0)
+
+    def is_finished(self) -> bool:
+        """True when the journaled run went to the end (nothing to resume)."""
+        return self._meta("finished") == "1"
+
+    def iter_rows(self) -> Iterator[Dict]:
+        """All journaled CSV rows, in the order they were recorded."""
+        with self._lock:
+            stored = [r for (r,) in self._conn.execute("SELECT rows FROM pairs ORDER BY rowid")]
+        for rows in stored:
+            yield from json.loads(rows)
+
+    # ----------------------------- writes --------------------------------
+
+    def record(self, docid: str, keyword: str, rows: List[Dict]) -> None:
+        self._buffer.append((docid, keyword, json.dumps(rows, ensure_ascii=False)))
+
+    def should_commit(self) -> bool:
+        return bool(self._buffer) and (
+            len(self._buffer) >= self.every
+            or time.monotonic() - self._last_commit >= self.interval_sec
+        )
+
+    def commit(self, csv_offset: Optional[int] = None) -> None:
+        """Write the buffered pairs (and the CSV size they correspond to) atomically."""
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO pairs VALUES (?, ?, ?)", self._buffer)
+                if csv_offset is not None:
+                    self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('csv_offset', ?)", (str(csv_offset),))
+            self.committed += len(self._buffer)
+            self._buffer = []
+            self._last_commit = time.monotonic()
+
+    def mark_finished(self) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('finished', '1')")
+
+    def reset(self) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM pairs")
+                self._conn.execute("DELETE FROM meta")
+            self._buffer = []
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def graph_state_path_for(journal_path: Path) -> Path:
+    """Where a CsvGraphExporter saves its graph between checkpoints: next to the journal."""
+    journal_path = Path(journal_path)
+    return journal_path.with_name(journal_path.name.replace(".progress.sqlite", "") + ".graph.progress.sqlite")
+
+
+def journal_path_for(out_csv: Path) -> Path:
+    """Default journal location: next to the output CSV."""
+    out_csv = Path(out_csv)
+    return getattr(config, "CHECKPOINT_PATH", None) or out_csv.with_name(out_csv.stem + ".progress.sqlite")
@@ -12,6 +12,15 @@ NEO4J_PASSWORD = "test"       # CHANGE THIS
 # =============== WIKIDATA / HTTP =================
 WIKIDATA_API = "https://www.wikidata.org/w/api.php"
 HEADERS = {"User-Agent": "Keyword2Wikidata/1.2 (contact: your-email@example.com)"}
+WIKIDATA_MAX_IN_FLIGHT = 8    # concurrent requests on the shared connection pool
+WIKIDATA_TIMEOUT_SEC = 20
+WIKIDATA_MAXLAG = 5           # seconds of replication lag we accept (0 = don't send maxlag)
+
+# Adaptive token bucket in front of every request (requests per second)
+RATE_LIMIT_INITIAL = 10.0
+RATE_LIMIT_MIN = 0.5
+RATE_LIMIT_MAX = 50.0
+RATE_LIMIT_TARGET_LATENCY_SEC = 1.5   # slow down when responses get slower than this
 
 # =============== LOGIC CONSTANTS =================
 LANGS = ["en", "fr"]
@@ -20,12 +29,65 @@ MIN_TOTAL_SCORE = -9999
 MAX_LEVELS_LINEAGE = 6
 SEARCH_LIMIT = 50
 
+# =============== LOCAL CACHE =================
+# Persistent SQLite store shared by the entity / search caches.
+CACHE_DB_PATH = Path(__file__).resolve().parent / "cache" / "wikidata_cache.sqlite"
+ENABLE_ENTITY_CACHE = True
+ENTITY_CACHE_TTL_SEC = 30 * 24 * 3600     # 30 days
+ENTITY_CACHE_MAX_ENTRIES = 500_000
+ENABLE_SEARCH_CACHE = True
+SEARCH_CACHE_TTL_SEC = 7 * 24 * 3600      # 7 days
+SEARCH_CACHE_NEGATIVE_TTL_SEC = 24 * 3600 # empty results expire sooner
+SEARCH_CACHE_MAX_ENTRIES = 200_000
+
+LABEL_CACHE_SIZE = 50_000   # in-memory QID -> label LRU used for the CSV output
+CANDIDATE_MEMO_SIZE = 20_000  # prepared matcher candidates kept per distinct keyword
+TEXT_CACHE_SIZE = 100_000     # normalize_kw / tokenize / singularize_en LRUs (utils.py)
+TEXT_CACHE_MAX_LEN = 200      # longer strings (titles, abstracts) are not memoized
+
+# =============== OFFLINE MODE =================
+# Answer searches and entity fetches from a local store built from a JSON dump
+# (python -m wikidata.offline_store --dump ...). No network when enabled.
+OFFLINE_MODE = False
+OFFLINE_STORE_PATH = Path(__file__).resolve().parent / "cache" / "wikidata_offline.sqlite"
+
 #==================== Neo4j =======================
 ENABLE_NEO4J_INGEST = True  
+# "neo4j": MERGE into the running database; "csv": write deduplicated node and
+# relationship files to GRAPH_EXPORT_DIR (the /import volume of docker-compose)
+# for neo4j-admin import or LOAD CSV, e.g. for a first load of a whole portal.
+GRAPH_OUTPUT = "neo4j"
+GRAPH_EXPORT_DIR = Path(__file__).resolve().parent.parent / "tests" / "resources"
+GRAPH_EXPORT_COMMIT_EVERY = 10_000   # PERIODIC COMMIT size in the generated load_graph.cypher
+NEO4J_BATCH_SIZE = 1000         # rows per UNWIND batch / pending elements before a flush
+NEO4J_FLUSH_INTERVAL_SEC = 5.0  # flush at least this often while mapping
+NEO4J_BACKGROUND_WRITER = True  # graph writes drained by a writer thread while matching continues
+NEO4J_QUEUE_SIZE = 10_000       # queued write operations before matching waits (backpressure)
+NEO4J_TX_BATCH_SIZE = 20        # statements per explicit transaction on one long-lived session (0 = one per statement)
+NEO4J_MAX_RETRIES = 3           # replays of a transaction after a transient error
+NEO4J_ENSURE_SCHEMA = True      # create/verify uniqueness constraints before ingest (neo4j_schema.py)
+NEO4J_SCHEMA_TIMEOUT_SEC = 300  # wait this long for their indexes to come online
 
 # =============== PERFORMANCE OPTIONS =================
 ENABLE_P279_PATHS = True  
 
+# Document-level parallelism in map_keywords: "serial", "threads" (overlap
+# network waits) or "processes" (network waits in threads, rapidfuzz scoring
+# spread over CPUs in a process pool).
+PARALLEL_MODE = "serial"
+PARALLEL_WORKERS = 4
+PARALLEL_WINDOW = 16          # documents in flight at most (bounds memory)
+CSV_FLUSH_EVERY = 200         # output CSV is flushed every N rows
+FUZZY_CDIST_WORKERS = -1      # threads per rapidfuzz cdist call (-1: all cores; process workers use 1)
+
+# Checkpoint / resume: finished (docid, keyword) pairs are journaled next to
+# OUTPUT_CSV (<name>.progress.sqlite). After a crash the next run skips them and
+# appends to the CSV; a run that reached the end starts from scratch next time.
+ENABLE_CHECKPOINT = True
+RESUME = True
+CHECKPOINT_EVERY = 500        # pairs per journal commit
+CHECKPOINT_INTERVAL_SEC = 30  # ...or at least this often
+
 # ================== Properties y QIDs =================
 P_INSTANCE_OF = "P31"
 P_SUBCLASS_OF = "P279"
@@ -33,6 +95,11 @@ P_BNF_ID = "P268"
 Q_DISAMBIGUATION = "Q4167410"
 P_FIELD_OF_WORK = "P101"
 
+# Slim entities: keep only the claims the matcher/pipeline read, plus
+# precomputed sitelink and claim counts, instead of the full payload.
+SLIM_ENTITIES = True
+SLIM_CLAIM_PIDS = (P_INSTANCE_OF, P_SUBCLASS_OF, P_FIELD_OF_WORK, P_BNF_ID)
+
 # =============== P31 filters ===============
 DISALLOWED_P31 = {
     "Q13442814","Q571","Q1002697","Q737498","Q47461344","Q732577",
@@ -110,6 +177,11 @@ DEBUG_SCORES_PATH = Path(
 DEBUG_SCORES_MODE_PATH = Path(
     r"C:\Users\sanda\Documents\Langara_College\DANA-4850-001-Capstone_Project\hall-api-test-db-mysql\wikidata\debug_scores_mode_upec_n_v3.csv"
 )
+# Debug rows are buffered and written by a background thread (debug_log.py)
+DEBUG_SCORES_SAMPLE_RATE = 1.0   # fraction of keywords logged (e.g. 0.05 in production)
+DEBUG_FLUSH_EVERY = 1000         # rows per write
+DEBUG_FLUSH_INTERVAL_SEC = 2.0   # ... or at least this often
+DEBUG_QUEUE_SIZE = 50_000        # rows buffered before scoring waits for the writer
 
 # --- Context similarity filters ---
 STOPWORDS = {
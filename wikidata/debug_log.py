@@ -0,0 +1,157 @@
+import atexit
+import csv
+import io
+import os
+import queue
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from . import config
+
+_STOP = object()
+_prepared = set()   # paths this process must append to, never replace
+
+
+class DebugCsvSink:
+    """
+    Buffered CSV writer for the debug score files.
+
+    - write() only enqueues the row; a background thread appends the queued rows
+      in batches of DEBUG_FLUSH_EVERY (or every DEBUG_FLUSH_INTERVAL_SEC),
+      instead of one open/append per row.
+    - The queue is bounded (DEBUG_QUEUE_SIZE rows): a producer faster than the
+      disk waits rather than growing memory.
+    - The file is replaced on the first row, and the header written when the
+      file is new, like the per-row writers did; in a process pool only the
+      parent replaces it (start_debug_logs), the workers append (mark_prepared).
+    """
+
+    def __init__(self, path: Path, header: List[str], flush_every: Optional[int] = None,
+                 flush_interval_sec: Optional[float] = None, queue_size: Optional[int] = None):
+        self.path = Path(path)
+        self.header = list(header)
+        self.flush_every = int(flush_every or getattr(config, "DEBUG_FLUSH_EVERY", 1000))
+        self.flush_interval_sec = float(flush_interval_sec or getattr(config, "DEBUG_FLUSH_INTERVAL_SEC", 2.0))
+        self._queue: "queue.Queue" = queue.Queue(maxsize=int(queue_size or getattr(config, "DEBUG_QUEUE_SIZE", 50_000)))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+        self.rows_written = 0
+        self.closed = False
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"debug-csv-{self.path.name}", daemon=True)
+                self._thread.start()
+
+    def write(self, row: list) -> None:
+        if self.closed:
+            return
+        if self._thread is None:
+            self._start()
+        self._queue.put(row)
+
+    def prepare(self) -> None:
+        """Replace the file (unless already prepared) and write the header if it is new."""
+        if self.path not in _prepared and self.path.exists():
+            os.remove(self.path)
+        _prepared.add(self.path)
+        if not self.path.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._append([self.header])
+
+    def _append(self, rows: List[list]) -> None:
+        # one write() per batch on an O_APPEND file: batches from several
+        # processes (PARALLEL_MODE = "processes") never interleave inside a row
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        with open(self.path, "ab", buffering=0) as f:
+            f.write(buf.getvalue().encode("utf-8"))
+
+    def _run(self) -> None:
+        try:
+            self.prepare()
+            batch, stop = [], False
+            last_flush = time.monotonic()
+            while not stop:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval_sec)
+                    if item is _STOP:
+                        stop = True
+                    else:
+                        batch.append(item)
+                except queue.Empty:
+                    pass
+                due = time.monotonic() - last_flush >= self.flush_interval_sec
+                if batch and (stop or due or len(batch) >= self.flush_every):
+                    self._append(batch)
+                    self.rows_written += len(batch)
+                    batch = []
+                    last_flush = time.monotonic()
+        except BaseException as e:
+            self._error = e
+            # keep draining so producers never block on a dead writer
+            while self._queue.get() is not _STOP:
+                pass
+
+    def close(self) -> None:
+        """Write what is still queued and stop the thread (idempotent)."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+        if self._error is not None:
+            print(f"⚠️ Debug log {self.path} could not be written: {self._error}")
+
+
+_sinks: Dict[Path, DebugCsvSink] = {}
+_sinks_lock = threading.Lock()
+
+
+def get_sink(path: Path, header: List[str]) -> DebugCsvSink:
+    """The process-wide sink for 'path' (created on first use)."""
+    path = Path(path)
+    sink = _sinks.get(path)
+    if sink is None:
+        with _sinks_lock:
+            sink = _sinks.get(path)
+            if sink is None:
+                sink = _sinks[path] = DebugCsvSink(path, header)
+    return sink
+
+
+def mark_prepared(paths: Iterable[Path]) -> None:
+    """Files the parent already prepared: this process (a pool worker) only appends to them."""
+    _prepared.update(Path(p) for p in paths)
+
+
+def close_sinks() -> None:
+    """Flush and close every debug sink; main calls it at the end of the run."""
+    with _sinks_lock:
+        sinks = list(_sinks.values())
+        _sinks.clear()
+    for sink in sinks:
+        sink.close()
+
+
+def sampled(keyword: str) -> bool:
+    """
+    True if the rows of 'keyword' should be logged (DEBUG_SCORES_SAMPLE_RATE, 0..1).
+    Decided by a stable hash of the keyword, so a keyword is in or out for every
+    document and in every process, and its candidates are logged together.
+    """
+    rate = float(getattr(config, "DEBUG_SCORES_SAMPLE_RATE", 1.0))
+    if rate >= 1.0:
+        return True
+    if rate <= 0.0:
+        return False
+    return zlib.crc32((keyword or "").encode("utf-8")) % 10_000 < rate * 10_000
+
+
+atexit.register(close_sinks)
@@ -0,0 +1,145 @@
+from typing import Dict, FrozenSet, List, Optional
+
+from . import config
+from .utils import normalize_kw, tokenize
+from .wikidata_api import (
+    get_p31_ids, get_p101_ids, _claim_ids, sitelink_count, claims_count
+)
+
+
+class CompactEntity:
+    """
+    What the matcher needs from one Wikidata entity, computed once:
+    display strings, their normalized forms, the candidate text blob and
+    its token set, the P31/P279/P101 id sets and the structural counts.
+    """
+
+    __slots__ = (
+        "id", "label", "description", "aliases",
+        "label_norm", "aliases_norm", "text_norm", "text_tokens",
+        "p31s", "p279s", "p101s",
+        "sitelinks", "alias_count", "claims_count", "has_p279",
+    )
+
+    def __init__(self, qid: str, label: str = "", description: str = "",
+                 aliases: Optional[List[str]] = None,
+                 p31s: FrozenSet[str] = frozenset(), p279s: FrozenSet[str] = frozenset(),
+                 p101s: FrozenSet[str] = frozenset(),
+                 sitelinks: int = 0, alias_count: int = 0, claims_count: int = 0,
+                 has_p279: bool = False):
+        self.id = qid
+        self.label = label or ""
+        self.description = description or ""
+        self.aliases = list(aliases or [])
+        self.p31s = frozenset(p31s)
+        self.p279s = frozenset(p279s)
+        self.p101s = frozenset(p101s)
+        self.sitelinks = sitelinks
+        self.alias_count = alias_count
+        self.claims_count = claims_count
+        self.has_p279 = has_p279
+        self._normalize()
+
+    def _normalize(self) -> None:
+        self.label_norm = normalize_kw(self.label)
+        self.aliases_norm = [normalize_kw(a) for a in self.aliases]
+        self.text_norm = normalize_kw(" ".join([self.label, self.description, " ".join(self.aliases)]))
+        self.text_tokens = frozenset(tokenize(self.text_norm))
+
+    @classmethod
+    def from_entity(cls, qid: str, ent: Dict, label: Optional[str] = None,
+                    description: Optional[str] = None, **kwargs):
+        """
+        Build from a wbgetentities payload (full or slim). 'label' / 'description'
+        override the entity's own (e.g. the strings shown in the search hit).
+        Aliases are always the entity's aliases in every fetched language.
+        """
+        ent = ent or {}
+        alias_dict = ent.get("aliases") or {}
+        if not description:
+            descs = ent.get("descriptions") or {}
+            description = " ".join(v["value"] for v in descs.values())
+        if label is None:
+            labels = ent.get("labels") or {}
+            label = next(iter(labels.values()), {}).get("value", "")
+        p279s = set(_claim_ids(ent, config.P_SUBCLASS_OF)) if ent else set()
+        return cls(
+            qid,
+            label=label,
+            description=description,
+            aliases=[a["value"] for lst in alias_dict.values() for a in lst],
+            p31s=get_p31_ids(ent) if ent else set(),
+            p279s=p279s,
+            p101s=get_p101_ids(ent) if ent else set(),
+            sitelinks=sitelink_count(ent),
+            alias_count=sum(len(v) for v in alias_dict.values()),
+            claims_count=claims_count(ent),
+            has_p279=bool(p279s),
+            **kwargs,
+        )
+
+
+class Candidate(CompactEntity):
+    """A CompactEntity found for a keyword, plus the per-keyword matching state."""
+
+    __slots__ = (
+        "language", "p31_text", "p279_text", "alias_exact",
+        "match_score", "mode_score", "type_bonus", "label_similarity", "stage",
+    )
+
+    def __init__(self, qid: str, language: str = "", p31_text: str = "", p279_text: str = "",
+                 alias_exact: bool = False, stage: str = "", **kwargs):
+        super().__init__(qid, **kwargs)
+        self.language = language
+        self.p31_text = p31_text
+        self.p279_text = p279_text
+        self.alias_exact = alias_exact
+        self.match_score = 0.0
+        self.mode_score = 0.0
+        self.type_bonus = 0.0
+        self.label_similarity = 0.0
+        self.stage = stage
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "Candidate":
+        """Legacy dict form used before this type existed ('label', '__p31s', ...)."""
+        p279s = d.get("__p279s") or set()
+        c = cls(
+            d.get("id", ""),
+            language=d.get("language", ""),
+            p31_text=d.get("__p31_text") or "",
+            p279_text=d.get("__p279_text") or "",
+            alias_exact=bool(d.get("__alias_exact")),
+            stage=d.get("__stage", ""),
+            label=d.get("label") or "",
+            description=d.get("description") or "",
+            aliases=d.get("aliases") or [],
+            p31s=d.get("__p31s") or set(),
+            p279s=p279s,
+            p101s=d.get("__p101s") or set(),
+            sitelinks=d.get("__sitelinks", 0) or 0,
+            alias_count=d.get("__alias_count", 0) or 0,
+            claims_count=d.get("__claims_count", 0) or 0,
+            has_p279=bool(d.get("__has_p279")),
+        )
+        c.match_score = d.get("match_score", 0.0)
+        c.label_similarity = d.get("label_similarity", 0.0)
+        return c
+
+    def copy(self) -> "Candidate":
+        """Shallow copy: prepared fields are shared, per-document scores are not."""
+        c = object.__new__(type(self))
+        for klass in type(self).__mro__:
+            for name in getattr(klass, "__slots__", ()):
+                setattr(c, name, getattr(self, name))
+        return c
+
+    def __repr__(self) -> str:
+        return f"Candidate({self.id!r}, {self.label!r}, score={self.match_score:.2f})"
+
+
+def as_candidate(ent_like) -> Candidate:
+    """Scoring entry point: accept a Candidate as is, convert legacy dicts."""
+    if isinstance(ent_like, Candidate):
+        return ent_like
+    return Candidate.from_dict(ent_like or {})
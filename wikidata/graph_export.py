@@ -0,0 +1,220 @@
+import csv
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from . import config
+
+# file name -> header; ':ID(...)' / ':START_ID(...)' / ':END_ID(...)' follow the
+# neo4j-admin import format, the ID space being the node label.
+NODE_FILES = {
+    "Document": ("documents.csv", ["id:ID(Document)"]),
+    "Keyword": ("keywords.csv", ["name:ID(Keyword)"]),
+    "Item": ("items.csv", ["qid:ID(Item)", "label"]),
+    "Class": ("classes.csv", ["qid:ID(Class)", "label"]),
+}
+REL_FILES = {
+    "CONTAINS_KEYWORD": ("contains_keyword.csv", [":START_ID(Document)", ":END_ID(Keyword)"]),
+    "MAPS_TO": ("maps_to.csv", [":START_ID(Keyword)", ":END_ID(Item)"]),
+    "INSTANCE_OF": ("instance_of.csv", [":START_ID(Item)", ":END_ID(Class)"]),
+    "SUBCLASS_OF": ("subclass_of.csv", [":START_ID(Item)", ":END_ID(Item)"]),
+}
+
+# LOAD CSV alternative for a non-empty database (run the schema bootstrap first)
+LOAD_CSV_SCRIPT = """\
+// Generated by wikidata.graph_export. Files are read from the /import volume.
+// Create the constraints first (python -m wikidata.neo4j_schema) so every MERGE uses an index.
+USING PERIODIC COMMIT {every} LOAD CSV WITH HEADERS FROM 'file:///documents.csv' AS row
+MERGE (:Document {{id: row.`id:ID(Document)`}});
+USING PERIODIC COMMIT {every} LOAD CSV WITH HEADERS FROM 'file:///keywords.csv' AS row
+MERGE (:Keyword {{name: row.`name:ID(Keyword)`}});
+USING PERIODIC COMMIT {every} LOAD CSV WITH HEADERS FROM 'file:///items.csv' AS row
+MERGE (n:Item {{qid: row.`qid:ID(Item)`}}) SET n.label = coalesce(row.label, n.label);
+USING PERIODIC COMMIT {every} LOAD CSV WITH HEADERS FROM 'file:///classes.csv' AS row
+MERGE (n:Class {{qid: row.`qid:ID(Class)`}}) SET n.label = coalesce(row.label, n.label);
+USING PERIODIC COMMIT {every} LOAD CSV WITH HEADERS FROM 'file:///contains_keyword.csv' AS row
+MATCH (d:Document {{id: row.`:START_ID(Document)`}}), (k:Keyword {{name: row.`:END_ID(Keyword)`}})
+MERGE (d)-[:CONTAINS_KEYWORD]->(k);
+USING PERIODIC COMMIT {every} LOAD CSV WITH HEADERS FROM 'file:///maps_to.csv' AS row
+MATCH (k:Keyword {{name: row.`:START_ID(Keyword)`}}), (i:Item {{qid: row.`:END_ID(Item)`}})
+MERGE (k)-[:MAPS_TO]->(i);
+USING PERIODIC COMMIT {every} LOAD CSV WITH HEADERS FROM 'file:///instance_of.csv' AS row
+MATCH (i:Item {{qid: row.`:START_ID(Item)`}}), (c:Class {{qid: row.`:END_ID(Class)`}})
+MERGE (i)-[:INSTANCE_OF]->(c);
+USING PERIODIC COMMIT {every} LOAD CSV WITH HEADERS FROM 'file:///subclass_of.csv' AS row
+MATCH (c:Item {{qid: row.`:START_ID(Item)`}}), (p:Item {{qid: row.`:END_ID(Item)`}})
+MERGE (c)-[:SUBCLASS_OF]->(p);
+"""
+
+
+class CsvGraphExporter:
+    """
+    Collects the keyword graph with the GraphWriter interface (add_item, add_subclass_of,
+    add_instance_of, add_document_map) and writes deduplicated node / relationship
+    CSV files on close(), for neo4j-admin import or LOAD CSV (see LOAD_CSV_SCRIPT).
+    Nodes only referenced by an edge are exported too, so every edge has its endpoints.
+
+    With a 'state_path' (main: next to the progress journal), flush() also saves
+    what was added since the last flush to that SQLite file. flush() runs before
+    every checkpoint, so a resumed run can load() the graph of the journaled pairs
+    it skips, and close() still exports the whole graph.
+    """
+
+    def __init__(self, out_dir: Optional[Path] = None, state_path: Optional[Path] = None):
+        self.out_dir = Path(out_dir or config.GRAPH_EXPORT_DIR)
+        self.state_path = Path(state_path) if state_path else None
+        self._lock = threading.Lock()
+        self._documents: Set[str] = set()
+        self._keywords: Set[str] = set()
+        self._items: Dict[str, str] = {}
+        self._classes: Dict[str, str] = {}
+        self._rels: Dict[str, Set[Tuple[str, str]]] = {t: set() for t in REL_FILES}
+        self._dirty_nodes: Set[Tuple[str, str]] = set()     # (label, key) changed since the last flush
+        self._dirty_rels: Set[Tuple[str, str, str]] = set() # (type, start, end)
+        self.files: List[Path] = []
+
+    def _item(self, qid: str, label: str = "") -> None:
+        if label or qid not in self._items:
+            self._items[qid] = label or ""
+            self._dirty_nodes.add(("Item", qid))
+
+    def _rel(self, rel_type: str, start: str, end: str) -> None:
+        if (start, end) not in self._rels[rel_type]:
+            self._rels[rel_type].add((start, end))
+            self._dirty_rels.add((rel_type, start, end))
+
+    def add_item(self, qid: str, label: str) -> None:
+        with self._lock:
+            self._item(qid, label)
+
+    def add_subclass_of(self, child_qid: str, parent_qid: str) -> None:
+        with self._lock:
+            self._item(child_qid)
+            self._item(parent_qid)
+            self._rel("SUBCLASS_OF", child_qid, parent_qid)
+
+    def add_instance_of(self, item_qid: str, type_qid: str, type_label: str) -> None:
+        with self._lock:
+            self._item(item_qid)
+            self._classes[type_qid] = type_label or self._classes.get(type_qid, "")
+            self._dirty_nodes.add(("Class", type_qid))
+            self._rel("INSTANCE_OF", item_qid, type_qid)
+
+    def add_document_map(self, docid: str, keyword: str, qid: str) -> None:
+        with self._lock:
+            self._documents.add(docid)
+            self._keywords.add(keyword)
+            self._dirty_nodes.update((("Document", docid), ("Keyword", keyword)))
+            self._item(qid)
+            self._rel("CONTAINS_KEYWORD", docid, keyword)
+            self._rel("MAPS_TO", keyword, qid)
+
+    # ----------------------------- saved state ------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.state_path))
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS nodes (
+                label TEXT NOT NULL, key TEXT NOT NULL, name TEXT NOT NULL,
+                PRIMARY KEY (label, key)
+            );
+            CREATE TABLE IF NOT EXISTS rels (
+                type TEXT NOT NULL, start TEXT NOT NULL, end TEXT NOT NULL,
+                PRIMARY KEY (type, start, end)
+            );
+        """)
+        return conn
+
+    def _node_name(self, label: str, key: str) -> str:
+        if label == "Item":
+            return self._items[key]
+        if label == "Class":
+            return self._classes[key]
+        return ""
+
+    def flush(self) -> None:
+        """Save the nodes and edges added since the last flush (no-op without a state_path)."""
+        if self.state_path is None:
+            return
+        with self._lock:
+            if not (self._dirty_nodes or self._dirty_rels):
+                return
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO nodes VALUES (?, ?, ?)",
+                                     [(lab, key, self._node_name(lab, key)) for lab, key in self._dirty_nodes])
+                    conn.executemany("INSERT OR IGNORE INTO rels VALUES (?, ?, ?)", self._dirty_rels)
+            finally:
+                conn.close()
+            self._dirty_nodes = set()
+            self._dirty_rels = set()
+
+    def load(self) -> int:
+        """Load the graph saved by an interrupted run; returns the number of edges loaded."""
+        if self.state_path is None or not self.state_path.exists():
+            return 0
+        conn = self._connect()
+        try:
+            nodes = conn.execute("SELECT label, key, name FROM nodes").fetchall()
+            rels = conn.execute("SELECT type, start, end FROM rels").fetchall()
+        finally:
+            conn.close()
+        with self._lock:
+            for label, key, name in nodes:
+                if label == "Document":
+                    self._documents.add(key)
+                elif label == "Keyword":
+                    self._keywords.add(key)
+                elif label == "Item":
+                    self._items[key] = name
+                elif label == "Class":
+                    self._classes[key] = name
+            for rel_type, start, end in rels:
+                self._rels[rel_type].add((start, end))
+        return len(rels)
+
+    def reset(self) -> None:
+        """Forget the saved graph (fresh run)."""
+        if self.state_path is not None and self.state_path.exists():
+            self.state_path.unlink()
+
+    def _write(self, name: str, header: List[str], rows) -> None:
+        path = self.out_dir / name
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(header)
+            w.writerows(sorted(rows))
+        self.files.append(path)
+
+    def close(self) -> None:
+        """Write the node / relationship files: the whole graph, duplicates removed."""
+        self.flush()
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self.files = []
+            self._write(*NODE_FILES["Document"], ((d,) for d in self._documents))
+            self._write(*NODE_FILES["Keyword"], ((k,) for k in self._keywords))
+            self._write(*NODE_FILES["Item"], self._items.items())
+            self._write(*NODE_FILES["Class"], self._classes.items())
+            for rel_type, (name, header) in REL_FILES.items():
+                self._write(name, header, self._rels[rel_type])
+            every = int(getattr(config, "GRAPH_EXPORT_COMMIT_EVERY", 10_000))
+            script = self.out_dir / "load_graph.cypher"
+            script.write_text(LOAD_CSV_SCRIPT.format(every=every), encoding="utf-8")
+            self.files.append(script)
+
+    def import_command(self, import_dir: str = "/import", database: str = "neo4j") -> str:
+        """neo4j-admin (4.4) command loading the exported files into an empty database."""
+        args = [f"--nodes={label}={import_dir}/{name}" for label, (name, _) in NODE_FILES.items()]
+        args += [f"--relationships={t}={import_dir}/{name}" for t, (name, _) in REL_FILES.items()]
+        return f"neo4j-admin import --database={database} --ignore-empty-strings=true " + " ".join(args)
+
+    def stats(self) -> Dict:
+        return {
+            "documents": len(self._documents), "keywords": len(self._keywords),
+            "items": len(self._items), "classes": len(self._classes),
+            **{t.lower(): len(r) for t, r in self._rels.items()},
+        }
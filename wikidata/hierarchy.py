@@ -0,0 +1,99 @@
+from typing import Dict, Iterable, List, Optional
+
+from . import config
+from .cache import DiskCache, open_cache
+from .wikidata_api import awbgetentities, entity_text, _claim_ids
+
+
+class P279Closure:
+    """
+    Shared view of the P279 hierarchy, filled lazily and kept on disk.
+
+    Each class is fetched once (packed 50 per request, level by level); its
+    parent list and its text (labels, descriptions, aliases: what the matcher
+    compares with the context) are kept in memory and persisted in the
+    'p279_classes' cache table. Walks (alevels, aparent_map) run over this
+    parent map, so the classes of an earlier keyword or run are dictionary /
+    cache lookups; only classes never seen before hit the API.
+    Ancestor sets are not stored per QID: walks start from a candidate's set of
+    parents and stop at a node budget, so they are recomputed from the parent map.
+    Used by matchers._expand_p279_text and wikidata_api.expand_p279_paths.
+    Methods are coroutines: call them on the I/O loop (run_sync from sync code).
+    """
+
+    def __init__(self, parents_cache: Optional[DiskCache] = None):
+        self._parents: Dict[str, List[str]] = {}
+        self._texts: Dict[str, str] = {}
+        self._parents_cache = parents_cache
+        self.fetched = 0
+        self.lookups = 0
+
+    async def aparents_of(self, qids: Iterable[str]) -> Dict[str, List[str]]:
+        """Direct P279 parents for every QID in 'qids'."""
+        qids = list(dict.fromkeys(q for q in qids if q))
+        self.lookups += len(qids)
+        missing = [q for q in qids if q not in self._parents]
+
+        if missing and self._parents_cache:
+            for q, node in self._parents_cache.get_many(missing).items():
+                self._parents[q], self._texts[q] = node["parents"], node["text"]
+            missing = [q for q in missing if q not in self._parents]
+
+        if missing:
+            ents = await awbgetentities(missing)
+            found = {}
+            for q in missing:
+                ent = ents.get(q) or {}
+                found[q] = {"parents": _claim_ids(ent, config.P_SUBCLASS_OF), "text": entity_text(ent)}
+                self._parents[q], self._texts[q] = found[q]["parents"], found[q]["text"]
+            self.fetched += len(found)
+            if self._parents_cache:
+                self._parents_cache.put_many(found)
+
+        return {q: self._parents[q] for q in qids}
+
+    def texts_of(self, qids: Iterable[str]) -> List[str]:
+        """Stored text of each QID, in order ('' for a missing entity); the QIDs must have been walked."""
+        return [self._texts[q] for q in qids]
+
+    async def alevels(self, start_qids: Iterable[str], max_depth: int,
+                      max_nodes: Optional[int] = None) -> List[List[str]]:
+        """
+        Breadth-first levels above 'start_qids' (level 0 = the start set), at most
+        'max_depth' levels; stops adding levels once 'max_nodes' QIDs were visited.
+        """
+        levels, visited = [], set()
+        frontier = list(dict.fromkeys(q for q in start_qids if q))
+        while frontier and len(levels) < max_depth and (max_nodes is None or len(visited) < max_nodes):
+            batch = [q for q in frontier if q not in visited]
+            if not batch:
+                break
+            parents = await self.aparents_of(batch)
+            visited.update(batch)
+            levels.append(batch)
+            frontier = list(dict.fromkeys(p for q in batch for p in parents[q] if p not in visited))
+        return levels
+
+    async def aparent_map(self, start_qids: Iterable[str], max_depth: int) -> Dict[str, List[str]]:
+        """{qid: parents} for everything within 'max_depth' levels of 'start_qids'."""
+        levels = await self.alevels(start_qids, max_depth)
+        return {q: self._parents[q] for level in levels for q in level}
+
+    def stats(self) -> Dict:
+        return {"lookups": self.lookups, "fetched": self.fetched, "known_classes": len(self._parents)}
+
+
+_closure: Optional[P279Closure] = None
+
+
+def get_closure() -> P279Closure:
+    """Process-wide closure store (disk-backed when the entity cache is on and we are online)."""
+    global _closure
+    if _closure is None:
+        parents_cache = None
+        if getattr(config, "ENABLE_ENTITY_CACHE", False) and not getattr(config, "OFFLINE_MODE", False):
+            ttl = getattr(config, "ENTITY_CACHE_TTL_SEC", 30 * 24 * 3600)
+            max_entries = getattr(config, "ENTITY_CACHE_MAX_ENTRIES", 500_000)
+            parents_cache = open_cache("p279_classes", ttl, max_entries)
+        _closure = P279Closure(parents_cache)
+    return _closure
@@ -1,20 +1,32 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
 from . import config
-from .neo4j_io import Neo4jConnector
-from .pipeline import map_keywords, write_csv
+from .neo4j_io import Neo4jConnector, open_graph_writer
+from .neo4j_schema import ensure_schema
+from .graph_export import CsvGraphExporter
+from .pipeline import LabelTable, map_keywords, write_csv
+from .streaming import iter_json_records
+from .checkpoint import ProgressJournal, graph_state_path_for, journal_path_for
+from .wikidata_api import entity_cache_stats, search_cache_stats, coalescing_stats
+from .async_client import close_client, limiter_stats
+from .matchers import prepared_stats
+from .hierarchy import get_closure
+from .utils import text_cache_stats
+from .debug_log import close_sinks as close_debug_sinks
 
 def main():
-    # 1) Read JSON
+    # 1) Read JSON (streamed: JSON array or NDJSON)
     print(f"📥 Reading JSON from: {config.INPUT_JSON}")
-    with open(config.INPUT_JSON, "r", encoding="utf-8") as f:
-        records = json.load(f)
+    records = iter_json_records(config.INPUT_JSON)
 
     # 2) Map first (without Neo4j by default)
-    neo4j_conn = None
-    if config.ENABLE_NEO4J_INGEST:
+    neo4j_conn, exporter = None, None
+    if config.ENABLE_NEO4J_INGEST and getattr(config, "GRAPH_OUTPUT", "neo4j") == "csv":
+        # bulk export for first-time loads: no connection, CSV files for neo4j-admin import / LOAD CSV
+        exporter = CsvGraphExporter()
+        print(f"📤 Graph will be exported as CSV files to: {exporter.out_dir}")
+    elif config.ENABLE_NEO4J_INGEST:
         print(f"🔗 Trying to connect to Neo4j at {config.NEO4J_URI}...")
         try:
             neo4j_conn = Neo4jConnector(config.NEO4J_URI, config.NEO4J_USER, config.NEO4J_PASSWORD)
@@ -24,16 +36,109 @@ def main():
             print(f"⚠️ Could not connect to Neo4j. Continuing without ingest. Details: {e}")
             neo4j_conn = None
 
-    print(f"🔍 Processing {len(records)} records...")
-    rows = map_keywords(records, neo4j_conn)  # if conn is None or toggle is False, NO ingestion
+    # 2b) Uniqueness constraints behind every MERGE key, online before ingest starts
+    if neo4j_conn and getattr(config, "NEO4J_ENSURE_SCHEMA", True):
+        try:
+            ensure_schema(neo4j_conn)
+            print("✅ Neo4j schema ready (Item.qid, Class.qid, Keyword.name, Document.id).")
+        except Exception as e:
+            print(f"⚠️ Neo4j schema bootstrap failed. Continuing without ingest. Details: {e}")
+            neo4j_conn.close()
+            neo4j_conn = None
+
+    # 3) Map and write the CSV for review as documents are finished
+    print(f"🔍 Processing records, writing results to CSV: {config.OUTPUT_CSV}")
+    journal, done_pairs = None, None
+    if getattr(config, "ENABLE_CHECKPOINT", False):
+        journal = ProgressJournal(journal_path_for(config.OUTPUT_CSV))
+        if not getattr(config, "RESUME", True) or journal.is_finished():
+            journal.reset()
+        done_pairs = journal.done_pairs()
+        if done_pairs:
+            print(f"⏩ Resuming from {journal.path}: {len(done_pairs)} (document, keyword) pairs already done")
+        if exporter:
+            # the exported files must also hold the graph of the pairs skipped on resume
+            exporter.state_path = graph_state_path_for(journal.path)
+            if done_pairs:
+                print(f"⏩ Graph export: {exporter.load()} edges restored from {exporter.state_path}")
+            else:
+                exporter.reset()
+
+    # Graph writes are buffered (and drained by a background thread when
+    # NEO4J_BACKGROUND_WRITER is on); flushed before each checkpoint and on exit.
+    graph = exporter or (open_graph_writer(neo4j_conn) if neo4j_conn else None)
+    label_table = LabelTable()
+    failed = True
+    try:
+        try:
+            rows = map_keywords(records, graph, label_table, skip_pairs=done_pairs)  # if conn is None or toggle is False, NO ingestion
+            n_rows = write_csv(rows, config.OUTPUT_CSV, journal=journal,
+                               before_checkpoint=graph.flush if graph else None)
+            failed = False
+        finally:
+            try:
+                if graph:
+                    print("⏳ Flushing pending graph writes...")
+                    graph.close()
+            except Exception as e:
+                if not failed:
+                    raise
+                # the error that stopped the run is the one to report
+                print(f"⚠️ Closing the graph writer failed too: {e}")
+            finally:
+                close_debug_sinks()   # write the buffered debug score rows
+        print(f"\n💾 {n_rows} rows saved to {config.OUTPUT_CSV}")
+        if journal:
+            journal.mark_finished()
+        if exporter:
+            stats = exporter.stats()
+            print(f"📤 Graph CSV export: {stats['documents']} documents, {stats['keywords']} keywords, "
+                  f"{stats['items']} items, {stats['classes']} classes in {exporter.out_dir}")
+            print(f"   Empty database: {exporter.import_command()}")
+            print(f"   Existing database: run {exporter.out_dir / 'load_graph.cypher'} (LOAD CSV)")
+        elif graph:
+            stats = graph.stats()
+            print(f"🕸️ Graph writer: {stats['rows_written']} rows in {stats['flushes']} flushes"
+                  + (f", producers blocked {stats['blocked_puts']} times" if "blocked_puts" in stats else ""))
+
+        stats = limiter_stats()
+        if stats:
+            print(f"🚦 Wikidata requests: {stats['requests_sent']} sent, final rate {stats['rate']} req/s, "
+                  f"{stats['throttle_events']} throttle events, {stats['errors']} errors")
+    finally:
+        close_client()
+        if journal:
+            journal.close()
 
-    # 3) Save CSV for review
-    print(f"\n💾 Saving results to CSV: {config.OUTPUT_CSV}")
-    write_csv(rows, config.OUTPUT_CSV)
+    stats = entity_cache_stats()
+    if stats:
+        print(f"🗄️ Entity cache: {stats['hits']} hits / {stats['misses']} misses "
+              f"(hit rate {stats['hit_rate']:.1%}, {stats['size']} entries)")
+    stats = coalescing_stats()
+    if stats["coalesced_ids"]:
+        print(f"🔁 Coalesced entity fetches: {stats['coalesced_ids']} IDs shared an in-flight request "
+              f"({stats['fetched_ids']} fetched)")
+    stats = get_closure().stats()
+    print(f"🌳 P279 closure: {stats['lookups']} parent lookups, {stats['fetched']} classes fetched, "
+          f"{stats['known_classes']} known")
+    stats = prepared_stats()
+    print(f"🧩 Prepared candidates: {stats['hits']} reused / {stats['misses']} built "
+          f"({stats['size']} distinct keywords)")
+    print(f"🏷️ Label table: {label_table.hits} hits / {label_table.misses} fetched")
+    stats = text_cache_stats()
+    print("🔤 Text caches: " + ", ".join(f"{name} {s['hits']} hits / {s['misses']} misses"
+                                         for name, s in stats.items()))
+    stats = search_cache_stats()
+    if stats:
+        print(f"🗄️ Search cache: {stats['hits']} hits ({stats['negative_hits']} empty) / "
+              f"{stats['misses']} misses (hit rate {stats['hit_rate']:.1%})")
 
     # 4) Close Neo4j if it was opened
     if neo4j_conn:
         neo4j_conn.close()
+        stats = neo4j_conn.stats()
+        print(f"🧾 Neo4j: {stats['statements']} statements in {stats['commits']} commits, "
+              f"{stats['retries']} retries")
         print("✅ Neo4j connection closed.")
 
     print("🏁 Done.")
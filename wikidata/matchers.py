@@ -1,11 +1,18 @@
-from typing import Dict, List, Optional
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 
 from . import config
 from .utils import normalize_kw, singularize_en
-from .scoring import mode_aware_total_score
+from .scoring import ContextLike, as_context_profile, mode_aware_total_scores
+from .entities import Candidate
+from .async_client import run_sync
+from .hierarchy import get_closure
 from .wikidata_api import (
     wbsearchentities, wbsearch_label_only, wbgetentities,
-    get_p31_ids, _claim_ids, get_p101_ids
+    awbsearchentities, awbsearch_label_only, awbgetentities,
+    get_p31_ids, entity_text, _claim_ids
 )
 
 # ----------------------------------------------------------------------------- #
@@ -22,7 +29,7 @@ def _is_semantically_valid(entity: Dict) -> bool:
     return has_desc
 
 
-def pick_exact_label_only(keyword: str) -> Optional[Dict]:
+def pick_exact_label_only(keyword: str) -> Optional[Candidate]:
     """Atajo legacy; el flujo principal ya no lo usa."""
     kw_norm = normalize_kw(keyword)
     kw_sing = singularize_en(kw_norm)
@@ -38,26 +45,75 @@ def pick_exact_label_only(keyword: str) -> Optional[Dict]:
                 ent = wbgetentities([qid]).get(qid, {})
                 if not ent:
                     continue
-                return {
-                    "id": qid,
-                    "label": h.get("label"),
-                    "description": h.get("description"),
-                    "aliases": h.get("aliases") or [],
-                    "language": lg,
-                    "label_similarity": 100.0,
-                    "match_score": 0.0,
-                    "__stage": "exact_label_legacy",
-                }
+                cand = Candidate.from_entity(
+                    qid, ent,
+                    label=h.get("label") or "",
+                    description=h.get("description"),
+                    language=lg,
+                    stage="exact_label_legacy",
+                )
+                cand.label_similarity = 100.0
+                return cand
     return None
 
 
 # ------------------------------- MATCHER PRINCIPAL --------------------------- #
 
-def pick_with_context_then_exact(keyword: str, context: str) -> Optional[Dict]:
+async def _search_terms(terms: List[str]) -> List[tuple]:
+    """All (term, language) searches at once; same order as the nested loops."""
+    async def _one(term: str, lg: str):
+        hits = await awbsearchentities(term, language=lg, limit=config.SEARCH_LIMIT) or \
+               await awbsearch_label_only(term, language=lg, limit=config.SEARCH_LIMIT)
+        return lg, hits
 
-    raw_keyword = keyword
-    keyword = normalize_kw(keyword)
-    context = normalize_kw(context)
+    return await asyncio.gather(*(_one(term, lg) for term in terms for lg in config.LANGS))
+
+
+async def _fetch_many(*id_lists: List[str]) -> List[Dict]:
+    """wbgetentities for several ID lists concurrently (empty lists cost nothing)."""
+    async def _one(ids: List[str]) -> Dict:
+        return await awbgetentities(ids) if ids else {}
+
+    return await asyncio.gather(*(_one(ids) for ids in id_lists))
+
+
+# Prepared candidates per normalized keyword (search, entities, P31 block,
+# P31/P279 text). They do not depend on the document, so a keyword repeated
+# across documents is only prepared once; see prepare_candidates().
+_prepared: "OrderedDict[str, Tuple[Candidate, ...]]" = OrderedDict()
+_prepared_lock = threading.Lock()
+_prepared_stats = {"hits": 0, "misses": 0}
+
+
+def prepared_stats() -> Dict:
+    return {**_prepared_stats, "size": len(_prepared)}
+
+
+def prepare_candidates(keyword: str) -> Tuple[Candidate, ...]:
+    """
+    Context-independent half of the matcher, memoized per normalized keyword.
+    The returned candidates are shared: score copies of them, never mutate them.
+    """
+    key = normalize_kw(keyword)
+    with _prepared_lock:
+        hit = _prepared.get(key)
+        if hit is not None:
+            _prepared.move_to_end(key)
+            _prepared_stats["hits"] += 1
+            return hit
+        _prepared_stats["misses"] += 1
+
+    prepared = tuple(_prepare(key))
+
+    max_size = int(getattr(config, "CANDIDATE_MEMO_SIZE", 20_000))
+    with _prepared_lock:
+        _prepared[key] = prepared
+        while len(_prepared) > max_size:
+            _prepared.popitem(last=False)
+    return prepared
+
+
+def _prepare(keyword: str) -> List[Candidate]:
     DISABLE_SEM_FILTER = getattr(config, "PURE_SCORE_DISABLE_SEMANTIC_FILTER", True)
 
     
@@ -67,25 +123,22 @@ def pick_with_context_then_exact(keyword: str, context: str) -> Optional[Dict]:
         terms.append(kw_sing)
 
     raw, seen = [], set()
-    for term in terms:
-        for lg in config.LANGS:
-            hits = wbsearchentities(term, language=lg, limit=config.SEARCH_LIMIT) or \
-                   wbsearch_label_only(term, language=lg, limit=config.SEARCH_LIMIT)
-            for h in hits or []:
-                qid = h.get("id")
-                if not qid or qid in seen:
-                    continue
-                seen.add(qid)
-                raw.append({
-                    "id": qid,
-                    "label": h.get("label"),
-                    "description": h.get("description"),
-                    "aliases": h.get("aliases") or [],
-                    "language": lg,
-                })
+    for lg, hits in run_sync(_search_terms(terms)):
+        for h in hits or []:
+            qid = h.get("id")
+            if not qid or qid in seen:
+                continue
+            seen.add(qid)
+            raw.append({
+                "id": qid,
+                "label": h.get("label"),
+                "description": h.get("description"),
+                "aliases": h.get("aliases") or [],
+                "language": lg,
+            })
 
     if not raw:
-        return None
+        return []
 
    
     ents = wbgetentities([c["id"] for c in raw])
@@ -101,8 +154,7 @@ def pick_with_context_then_exact(keyword: str, context: str) -> Optional[Dict]:
         for q in _claim_ids(ent, config.P_SUBCLASS_OF):
             all_p279_ids.add(q)
 
-    p31_ents  = wbgetentities(list(all_p31_ids))  if all_p31_ids else {}
-    p279_ents = wbgetentities(list(all_p279_ids)) if all_p279_ids else {}
+    p31_ents, p279_ents = run_sync(_fetch_many(list(all_p31_ids), list(all_p279_ids)))
 
     def _expand_p279_text(start_qids: set, max_depth: int, max_nodes: int) -> (str, set):
         """
@@ -110,146 +162,110 @@ def pick_with_context_then_exact(keyword: str, context: str) -> Optional[Dict]:
         Devuelve (texto_concatenado, conjunto_de_qids_visitados).
         100% genérico: no hace supuestos de dominio y usa solo P279.
         """
-        texts, visited = [], set()
-        
-        frontier = set(q for q in (start_qids or set()) if q)
-
-        depth = 0
-        while frontier and depth < max_depth and len(visited) < max_nodes:
-            
-            batch = [q for q in frontier if q not in visited]
-            if not batch:
-                break
-
-            
-            ents_level = wbgetentities(batch) or {}
-
-            
-            for qid, ent in ents_level.items():
-                visited.add(qid)
-                if ent:
-                    labs = " ".join([v["value"] for v in (ent.get("labels") or {}).values()])
-                    desc = " ".join([v["value"] for v in (ent.get("descriptions") or {}).values()])
-                    alias_lists = (ent.get("aliases") or {}).values()
-                    aliases = " ".join([a["value"] for L in alias_lists for a in L])
-                    txt = " ".join([labs, desc, aliases]).strip()
-                    if txt:
-                        texts.append(txt)
-
-            
-            next_frontier = set()
-            for ent in ents_level.values():
-                if not ent:
-                    continue
-                for parent in _claim_ids(ent, config.P_SUBCLASS_OF) or []:
-                    if parent not in visited:
-                        next_frontier.add(parent)
-
-            frontier = next_frontier
-            depth += 1
+        # the walk and the class texts are served by the shared P279 store (looked
+        # up in memory / on disk, only unseen classes hit the API, each one once)
+        closure = get_closure()
+        levels = run_sync(closure.alevels(start_qids or set(), max_depth, max_nodes))
+        visited = [q for level in levels for q in level]
+        texts = [txt for txt in closure.texts_of(visited) if txt]
 
         joined = " ".join(texts).strip()
         limit = int(getattr(config, "P279_TEXT_MAXCHARS", 12000))
-        return joined[:limit], visited
+        return joined[:limit], set(visited)
 
 
-    def _text_of_entity(e: Dict) -> str:
-        labs = " ".join([v["value"] for v in (e.get("labels") or {}).values()])
-        desc = " ".join([v["value"] for v in (e.get("descriptions") or {}).values()])
-        alias_lists = (e.get("aliases") or {}).values()
-        aliases = " ".join([a["value"] for L in alias_lists for a in L])
-        return " ".join([labs, desc, aliases]).strip()
 
-    candidates: List[Dict] = []
+    candidates: List[Candidate] = []
 
     
     for c in raw:
         ent = ents.get(c["id"], {})
 
         
-        alias_dict = (ent.get("aliases") or {})
-        c["aliases"] = [a["value"] for lst in alias_dict.values() for a in lst]
-
-        
-        if not c.get("description"):
-            descs = ent.get("descriptions") or {}
-            c["description"] = " ".join(v["value"] for v in descs.values())
-
-        
         if not DISABLE_SEM_FILTER and not _is_semantically_valid(ent):
             continue
 
-        claims = ent.get("claims", {}) if ent else {}
-        c["__sitelinks"]    = len(ent.get("sitelinks", {}) or {}) if ent else 0
-        c["__alias_count"]  = sum(len(v) for v in (ent.get("aliases") or {}).values()) if ent else 0
-        c["__claims_count"] = sum(len(v) for v in (claims or {}).values())
-        c["__has_p279"]     = bool(claims.get(config.P_SUBCLASS_OF))
-
-        # sets P31 / P279
-        p31s  = get_p31_ids(ent) if ent else set()
-        p279s = set(_claim_ids(ent, config.P_SUBCLASS_OF)) if ent else set()
-        c["__p31s"]  = p31s
-        c["__p279s"] = p279s
-        c["__p101s"] = get_p101_ids(ent) if ent else set()
-
         # --- 
+        p31s = get_p31_ids(ent) if ent else set()
         if getattr(config, "ENABLE_P31_BLOCK", True):
             if p31s & config.DISALLOWED_P31:
                 
                 continue
 
+        cand = Candidate.from_entity(
+            c["id"], ent,
+            label=c["label"] or "",
+            description=c["description"],
+            language=c["language"],
+            stage="mode_score",
+        )
+
         # 
         p31_texts= []
-        for pid in p31s:
+        for pid in cand.p31s:
             pe = p31_ents.get(pid, {})
             if pe:
-                p31_texts.append(_text_of_entity(pe))
+                p31_texts.append(entity_text(pe))
 
-        c["__p31_text"]  = " ".join(p31_texts)[:5000]
+        cand.p31_text = " ".join(p31_texts)[:5000]
         
 
         #
-        if getattr(config, "ENABLE_P279_PATHS", False) and p279s:
+        if getattr(config, "ENABLE_P279_PATHS", False) and cand.p279s:
             p279_text, p279_all = _expand_p279_text(
-                start_qids=p279s,
+                start_qids=cand.p279s,
                 max_depth=int(getattr(config, "P279_DEPTH", 5)),
                 max_nodes=int(getattr(config, "P279_MAX_NODES", 300)),
             )
-            c["__p279_text"] = p279_text
-            c["__p279s"]     = p279_all
+            cand.p279_text = p279_text
+            cand.p279s     = frozenset(p279_all)
         else:
             
             p279_texts = []
-            for pid in p279s:
+            for pid in cand.p279s:
                 pe = p279_ents.get(pid, {})
                 if pe:
-                    p279_texts.append(_text_of_entity(pe))
-            c["__p279_text"] = " ".join(p279_texts)[:5000]
-            c["__p279s"]     = p279s
+                    p279_texts.append(entity_text(pe))
+            cand.p279_text = " ".join(p279_texts)[:5000]
         
-        score = mode_aware_total_score(keyword, context, c, raw_keyword=raw_keyword)
-
-
         type_bonus = 0.0
         if getattr(config, "ENABLE_PREFERRED_P31_BONUS", True):
-            if p31s & config.PREFERRED_P31:
+            if cand.p31s & config.PREFERRED_P31:
                 type_bonus = float(getattr(config, "TYPE_BONUS", 30.0))
+        cand.type_bonus = type_bonus
+
+        candidates.append(cand)
 
-        c["match_score"] = score + type_bonus
-        c["__type_bonus"] = type_bonus
-        c["__stage"] = "mode_score"
+    return candidates
 
-        candidates.append(c)
+
+def score_candidates(keyword: str, context: ContextLike, prepared: Tuple[Candidate, ...],
+                     raw_keyword: Optional[str] = None) -> Optional[Candidate]:
+    """
+    Context-dependent half: score each prepared candidate against one document.
+    'context' is the document's ContextProfile (or its raw text, profiled here).
+    """
+    keyword = normalize_kw(keyword)
+    context = as_context_profile(context)
+
+    candidates: List[Candidate] = [prep.copy() for prep in prepared]
+    scores = mode_aware_total_scores(keyword, context, candidates, raw_keyword=raw_keyword)
+    for cand, score in zip(candidates, scores.tolist()):
+        cand.match_score = score + cand.type_bonus
 
     if not candidates:
         return None
 
 
 
-    candidates.sort(key=lambda x: x["match_score"], reverse=True)
+    candidates.sort(key=lambda x: x.match_score, reverse=True)
     top = candidates[0]
 
     MIN_TOTAL_SCORE = getattr(config, "MIN_TOTAL_SCORE", 8.0)
-    if top["match_score"] < MIN_TOTAL_SCORE:
+    if top.match_score < MIN_TOTAL_SCORE:
         return None 
     return top
+
+
+def pick_with_context_then_exact(keyword: str, context: ContextLike) -> Optional[Candidate]:
+    return score_candidates(keyword, context, prepare_candidates(keyword), raw_keyword=keyword)
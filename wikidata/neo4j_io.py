@@ -1,20 +1,64 @@
-from typing import Dict, Optional, List, Set
+import queue
+import threading
+import time
+from typing import Dict, Iterable, Optional, List, Tuple, Union
 from neo4j import GraphDatabase, Driver, WRITE_ACCESS
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+
+from . import config
+from .utils import backoff_sleep
+
+# errors after which the same transaction can be replayed on a fresh session
+TRANSIENT_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
 
 class Neo4jConnector:
-    """Manages connection and transactions with Neo4j."""
-    def __init__(self, uri: str, user: str, password: str):
+    """
+    Manages connection and transactions with Neo4j.
+
+    tx_batch_size (default config.NEO4J_TX_BATCH_SIZE):
+      0   -> one session and one managed write transaction per run_query (errors printed);
+      N>0 -> one long-lived session; statements share an explicit transaction that
+             is committed every N statements and by commit() / flush() / close().
+             Transient errors replay the open transaction up to NEO4J_MAX_RETRIES
+             times, other errors are raised.
+    Batching delays durability: a statement that returned is only on disk once
+    its transaction is committed. Call flush() / commit() at every point that
+    must be durable (e.g. before a checkpoint records the work as done).
+    stats() returns the statement / commit / retry counters.
+    """
+    def __init__(self, uri: str, user: str, password: str, tx_batch_size: Optional[int] = None):
         self.driver: Driver = GraphDatabase.driver(uri, auth=(user, password))
+        if tx_batch_size is None:
+            tx_batch_size = getattr(config, "NEO4J_TX_BATCH_SIZE", 0)
+        self.tx_batch_size = int(tx_batch_size)
+        self.max_retries = int(getattr(config, "NEO4J_MAX_RETRIES", 3))
+        self._lock = threading.RLock()
+        self._session = None
+        self._tx = None
+        self._tx_statements: List[Tuple[str, Optional[Dict]]] = []   # replayed on retry
+        self.statements = 0
+        self.commits = 0
+        self.retries = 0
 
     def close(self):
-        """Close the Neo4j connection."""
-        self.driver.close()
+        """Close the Neo4j connection (committing any open transaction first)."""
+        with self._lock:
+            try:
+                self.commit()
+            finally:
+                self._reset_session()
+                self.driver.close()
 
     def run_query(self, query: str, parameters: Optional[Dict] = None):
         """Execute a Cypher query with optional parameters using write access."""
+        if self.tx_batch_size > 0:
+            return self._run_in_batch(query, parameters)
+
         with self.driver.session(default_access_mode=WRITE_ACCESS) as session:
             try:
                 result = session.execute_write(self._execute_query, query, parameters)
+                self.statements += 1
+                self.commits += 1
                 return result
             except Exception as e:
                 print(f"Error executing Cypher query: {e}\nQuery: {query}\nParameters: {parameters}")
@@ -25,42 +69,365 @@ class Neo4jConnector:
         """Internal helper to run a query within a transaction."""
         return tx.run(query, parameters).consume()
 
-def ingest_p279_hierarchy(connector: Neo4jConnector, entity_qid: str, entity_label: str, qid_paths: List[List[str]]):
-    """Insert subclass hierarchy (P279) relationships into Neo4j."""
-    connector.run_query("""
-        MERGE (e:Item {qid: $qid})
-        SET e.label = $label
-    """, {"qid": entity_qid, "label": entity_label})
-
-    for path in qid_paths:
-        current_child_qid = entity_qid
-        for parent_qid in path:
-            if parent_qid == current_child_qid:
+    # ------------------------ batched transactions ------------------------
+
+    def _begin(self):
+        if self._session is None:
+            self._session = self.driver.session(default_access_mode=WRITE_ACCESS)
+        if self._tx is None:
+            self._tx = self._session.begin_transaction()
+        return self._tx
+
+    def _reset_session(self) -> None:
+        for obj in (self._tx, self._session):
+            if obj is not None:
+                try:
+                    obj.close()
+                except Exception:
+                    pass
+        self._tx = None
+        self._session = None
+
+    def _retrying(self, action, replay: List[Tuple[str, Optional[Dict]]]):
+        """
+        Run 'action' in the open transaction. On a transient error: new session,
+        replay 'replay' (statements already run in the lost transaction), try again.
+        The ingest statements are MERGEs, so a replay is idempotent.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                if attempt:
+                    tx = self._begin()
+                    for q, p in replay:
+                        tx.run(q, p).consume()
+                return action()
+            except TRANSIENT_ERRORS as e:
+                self._reset_session()
+                if attempt == self.max_retries:
+                    self._tx_statements = []
+                    raise
+                self.retries += 1
+                print(f"⚠️ Neo4j transient error, retrying ({attempt + 1}/{self.max_retries}): {e}")
+                backoff_sleep(attempt)
+            except Exception:
+                # the transaction is unusable; its uncommitted statements are lost
+                self._reset_session()
+                self._tx_statements = []
+                raise
+
+    def _run_in_batch(self, query: str, parameters: Optional[Dict]):
+        with self._lock:
+            result = self._retrying(lambda: self._begin().run(query, parameters).consume(),
+                                    list(self._tx_statements))
+            self._tx_statements.append((query, parameters))
+            self.statements += 1
+            if len(self._tx_statements) >= self.tx_batch_size:
+                self.commit()
+            return result
+
+    def commit(self) -> None:
+        """Commit the open transaction (no-op when nothing is pending)."""
+        with self._lock:
+            if self._tx is None:
+                return
+            self._retrying(lambda: self._begin().commit(), self._tx_statements)
+            self._tx = None
+            self._tx_statements = []
+            self.commits += 1
+
+    def flush(self) -> None:
+        """Durability boundary: commit whatever the open transaction holds."""
+        self.commit()
+
+    def stats(self) -> Dict:
+        return {"statements": self.statements, "commits": self.commits, "retries": self.retries,
+                "pending": len(self._tx_statements)}
+
+# ----------------------------- batched writer --------------------------------
+
+MERGE_ITEMS = """
+    UNWIND $rows AS r
+    MERGE (e:Item {qid: r.qid})
+    SET e.label = r.label
+"""
+
+MERGE_SUBCLASS_OF = """
+    UNWIND $rows AS r
+    MERGE (child:Item {qid: r.child})
+    MERGE (parent:Item {qid: r.parent})
+    MERGE (child)-[:SUBCLASS_OF]->(parent)
+"""
+
+MERGE_INSTANCE_OF = """
+    UNWIND $rows AS r
+    MERGE (item:Item {qid: r.item})
+    MERGE (type:Class {qid: r.type})
+    SET type.label = r.label
+    MERGE (item)-[:INSTANCE_OF]->(type)
+"""
+
+MERGE_DOCUMENT_MAP = """
+    UNWIND $rows AS r
+    MERGE (d:Document {id: r.docid})
+    MERGE (k:Keyword {name: r.keyword})
+    MERGE (q:Item {qid: r.qid})
+    MERGE (d)-[:CONTAINS_KEYWORD]->(k)
+    MERGE (k)-[:MAPS_TO]->(q)
+"""
+
+
+class GraphWriter:
+    """
+    Buffers graph nodes and edges and writes them as 'UNWIND $rows' MERGE batches.
+
+    - Duplicates inside the buffer are dropped (last label wins, as with SET).
+    - flush() runs when 'batch_size' elements are pending or 'flush_interval_sec'
+      has passed since the last flush; call close() at the end for the remainder.
+      flush() also commits the connector's open transaction (NEO4J_TX_BATCH_SIZE),
+      so a flush before a checkpoint makes the graph writes durable first.
+    - Items go first, then SUBCLASS_OF, INSTANCE_OF and the document mappings,
+      each batch in at most 'batch_size' rows.
+    """
+
+    def __init__(self, connector: "Neo4jConnector", batch_size: Optional[int] = None,
+                 flush_interval_sec: Optional[float] = None):
+        self.connector = connector
+        self.batch_size = int(batch_size or getattr(config, "NEO4J_BATCH_SIZE", 1000))
+        self.flush_interval_sec = float(flush_interval_sec or getattr(config, "NEO4J_FLUSH_INTERVAL_SEC", 5.0))
+        self._lock = threading.RLock()
+        self._items: Dict[str, str] = {}
+        self._subclass_of: Dict[Tuple[str, str], None] = {}
+        self._class_labels: Dict[str, str] = {}
+        self._instance_of: Dict[Tuple[str, str], None] = {}
+        self._document_map: Dict[Tuple[str, str, str], None] = {}
+        self._last_flush = time.monotonic()
+        self.flushes = 0
+        self.rows_written = 0
+
+    # ----------------------------- buffering -----------------------------
+
+    def add_item(self, qid: str, label: str) -> None:
+        with self._lock:
+            self._items[qid] = label
+        self._maybe_flush()
+
+    def add_subclass_of(self, child_qid: str, parent_qid: str) -> None:
+        with self._lock:
+            self._subclass_of[(child_qid, parent_qid)] = None
+        self._maybe_flush()
+
+    def add_instance_of(self, item_qid: str, type_qid: str, type_label: str) -> None:
+        with self._lock:
+            self._class_labels[type_qid] = type_label
+            self._instance_of[(item_qid, type_qid)] = None
+        self._maybe_flush()
+
+    def add_document_map(self, docid: str, keyword: str, qid: str) -> None:
+        with self._lock:
+            self._document_map[(docid, keyword, qid)] = None
+        self._maybe_flush()
+
+    def pending(self) -> int:
+        return (len(self._items) + len(self._subclass_of)
+                + len(self._instance_of) + len(self._document_map))
+
+    # ----------------------------- flushing ------------------------------
+
+    def _maybe_flush(self) -> None:
+        if (self.pending() >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval_sec):
+            self.flush()
+
+    def _write(self, query: str, rows: List[Dict]) -> None:
+        for i in range(0, len(rows), self.batch_size):
+            chunk = rows[i:i + self.batch_size]
+            self.connector.run_query(query, {"rows": chunk})
+            self.rows_written += len(chunk)
+
+    def _commit(self) -> None:
+        # batched connectors hold statements in an open transaction until commit
+        commit = getattr(self.connector, "commit", None)
+        if commit is not None:
+            commit()
+
+    def flush(self) -> None:
+        """Write everything buffered so far and commit it: once flush() returns, it is durable."""
+        with self._lock:
+            items, self._items = self._items, {}
+            subclass_of, self._subclass_of = self._subclass_of, {}
+            class_labels, self._class_labels = self._class_labels, {}
+            instance_of, self._instance_of = self._instance_of, {}
+            document_map, self._document_map = self._document_map, {}
+            self._last_flush = time.monotonic()
+            if items or subclass_of or instance_of or document_map:
+                self._write(MERGE_ITEMS, [{"qid": q, "label": lab} for q, lab in items.items()])
+                self._write(MERGE_SUBCLASS_OF, [{"child": c, "parent": p} for c, p in subclass_of])
+                self._write(MERGE_INSTANCE_OF, [
+                    {"item": i, "type": t, "label": class_labels[t]} for i, t in instance_of
+                ])
+                self._write(MERGE_DOCUMENT_MAP, [
+                    {"docid": d, "keyword": k, "qid": q} for d, k, q in document_map
+                ])
+                self.flushes += 1
+            self._commit()
+
+    def close(self) -> None:
+        self.flush()
+
+    def stats(self) -> Dict:
+        return {"flushes": self.flushes, "rows_written": self.rows_written, "pending": self.pending()}
+
+
+class BackgroundGraphWriter:
+    """
+    GraphWriter drained by a dedicated thread, so matching does not wait on Neo4j.
+
+    add_* calls only enqueue; the queue is bounded ('queue_size' operations),
+    so producers block when the writer falls behind (backpressure). The thread
+    feeds an inner GraphWriter (same batching / flush interval) and also
+    flushes when idle. flush() waits until everything queued so far is written;
+    close() does that and stops the thread. An error in the writer thread is
+    raised by the next add_* / flush() / close() call.
+    """
+
+    _STOP = object()
+
+    def __init__(self, connector: "Neo4jConnector", batch_size: Optional[int] = None,
+                 flush_interval_sec: Optional[float] = None, queue_size: Optional[int] = None):
+        self.writer = GraphWriter(connector, batch_size, flush_interval_sec)
+        self.queue_size = int(queue_size or getattr(config, "NEO4J_QUEUE_SIZE", 10_000))
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        self._error: Optional[BaseException] = None
+        self.blocked_puts = 0
+        self._thread = threading.Thread(target=self._run, name="neo4j-writer", daemon=True)
+        self._thread.start()
+
+    # ----------------------------- producer side ---------------------------
+
+    def _put(self, op) -> None:
+        self._raise_if_failed()
+        try:
+            self._queue.put_nowait(op)
+        except queue.Full:
+            self.blocked_puts += 1
+            self._queue.put(op)
+
+    def add_item(self, qid: str, label: str) -> None:
+        self._put((GraphWriter.add_item, (qid, label)))
+
+    def add_subclass_of(self, child_qid: str, parent_qid: str) -> None:
+        self._put((GraphWriter.add_subclass_of, (child_qid, parent_qid)))
+
+    def add_instance_of(self, item_qid: str, type_qid: str, type_label: str) -> None:
+        self._put((GraphWriter.add_instance_of, (item_qid, type_qid, type_label)))
+
+    def add_document_map(self, docid: str, keyword: str, qid: str) -> None:
+        self._put((GraphWriter.add_document_map, (docid, keyword, qid)))
+
+    def flush(self) -> None:
+        """Block until every queued operation is written to Neo4j and committed."""
+        if self._thread.is_alive():
+            self._put((GraphWriter.flush, ()))
+            self._queue.join()
+        self._raise_if_failed()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._put((GraphWriter.flush, ()))
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self._raise_if_failed()
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise RuntimeError("Neo4j background writer failed") from self._error
+
+    # ----------------------------- writer thread ---------------------------
+
+    def _run(self) -> None:
+        while True:
+            try:
+                op = self._queue.get(timeout=self.writer.flush_interval_sec)
+            except queue.Empty:
+                if self._error is None:
+                    try:
+                        self.writer.flush()       # idle: write what is buffered
+                    except BaseException as e:
+                        self._error = e
+                        print(f"⚠️ Neo4j background writer error: {e}")
                 continue
-            connector.run_query("""
-                MERGE (child:Item {qid: $child_qid})
-                MERGE (parent:Item {qid: $parent_qid})
-                MERGE (child)-[:SUBCLASS_OF]->(parent)
-            """, {"child_qid": current_child_qid, "parent_qid": parent_qid})
-            current_child_qid = parent_qid
-
-def ingest_document_map(connector: Neo4jConnector, docid: str, keyword: str, qid: str):
+            try:
+                if op is self._STOP:
+                    return
+                if self._error is None:
+                    fn, args = op
+                    fn(self.writer, *args)
+            except BaseException as e:      # keep draining so producers never block forever
+                self._error = e
+                print(f"⚠️ Neo4j background writer error: {e}")
+            finally:
+                self._queue.task_done()
+
+    def pending(self) -> int:
+        return self._queue.qsize() + self.writer.pending()
+
+    def stats(self) -> Dict:
+        return {**self.writer.stats(), "queued": self._queue.qsize(), "blocked_puts": self.blocked_puts}
+
+
+GraphTarget = Union[Neo4jConnector, GraphWriter, BackgroundGraphWriter]
+
+
+def is_graph_writer(target) -> bool:
+    """Anything with the GraphWriter add_* interface (GraphWriter, BackgroundGraphWriter, CsvGraphExporter)."""
+    return hasattr(target, "add_document_map")
+
+
+def open_graph_writer(connector: "Neo4jConnector"):
+    """GraphWriter for 'connector', drained by a background thread when NEO4J_BACKGROUND_WRITER is on."""
+    if getattr(config, "NEO4J_BACKGROUND_WRITER", False):
+        return BackgroundGraphWriter(connector)
+    return GraphWriter(connector)
+
+
+class _OneShot:
+    """Context manager: reuse a GraphWriter, or wrap a bare connector for one call."""
+
+    def __init__(self, target: GraphTarget):
+        self.target = target
+        self.writer = target if is_graph_writer(target) else GraphWriter(target)
+
+    def __enter__(self):
+        return self.writer
+
+    def __exit__(self, *exc) -> None:
+        if self.writer is not self.target:
+            self.writer.close()
+
+
+# ----------------------------- ingest helpers --------------------------------
+# Each accepts a Neo4jConnector (written at the end of the call, batched) or a
+# GraphWriter (buffered across calls until its next flush).
+
+def ingest_p279_hierarchy(connector: GraphTarget, entity_qid: str, entity_label: str, qid_paths: List[List[str]]):
+    """Insert subclass hierarchy (P279) relationships into Neo4j."""
+    with _OneShot(connector) as writer:
+        writer.add_item(entity_qid, entity_label)
+        for path in qid_paths:
+            current_child_qid = entity_qid
+            for parent_qid in path:
+                if parent_qid == current_child_qid:
+                    continue
+                writer.add_subclass_of(current_child_qid, parent_qid)
+                current_child_qid = parent_qid
+
+def ingest_document_map(connector: GraphTarget, docid: str, keyword: str, qid: str):
     """Insert mapping between document, keyword, and Wikidata entity into Neo4j."""
-    connector.run_query("""
-        MERGE (d:Document {id: $docid})
-        MERGE (k:Keyword {name: $keyword})
-        MERGE (q:Item {qid: $qid})
-        MERGE (d)-[:CONTAINS_KEYWORD]->(k)
-        MERGE (k)-[:MAPS_TO]->(q)
-    """, {"docid": docid, "keyword": keyword, "qid": qid})
-
-def ingest_p31_types(connector: Neo4jConnector, entity_qid: str, p31_ids: Set[str], p31_labels: Dict[str, str]):
+    with _OneShot(connector) as writer:
+        writer.add_document_map(docid, keyword, qid)
+
+def ingest_p31_types(connector: GraphTarget, entity_qid: str, p31_ids: Iterable[str], p31_labels: Dict[str, str]):
     """Insert 'instance of' (P31) relationships for a given entity."""
-    for p31_qid in p31_ids:
-        label = p31_labels.get(p31_qid, p31_qid)
-        connector.run_query("""
-            MERGE (item:Item {qid: $item_qid})
-            MERGE (type:Class {qid: $type_qid})
-            SET type.label = $type_label
-            MERGE (item)-[:INSTANCE_OF]->(type)
-        """, {"item_qid": entity_qid, "type_qid": p31_qid, "type_label": label})
+    with _OneShot(connector) as writer:
+        for p31_qid in p31_ids:
+            writer.add_instance_of(entity_qid, p31_qid, p31_labels.get(p31_qid, p31_qid))
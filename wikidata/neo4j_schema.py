@@ -0,0 +1,115 @@
+import argparse
+from typing import Dict, List, Tuple
+
+from neo4j import Driver
+from neo4j.exceptions import ClientError
+
+from . import config
+
+# (constraint name, label, property): every MERGE of the ingest and the web app's
+# CYPHER looks nodes up by one of these keys. Single definition of the graph
+# schema: the ETL and the web app (movies/services.py) apply it at startup, "python -m wikidata.neo4j_schema" on demand. A uniqueness constraint also creates
+# the index MERGE / MATCH use, so no separate index is needed for them.
+UNIQUE_KEYS: List[Tuple[str, str, str]] = [
+    ("item_qid_unique", "Item", "qid"),
+    ("class_qid_unique", "Class", "qid"),
+    ("keyword_name_unique", "Keyword", "name"),
+    ("document_id_unique", "Document", "id"),
+]
+
+# Neo4j 4.4+ syntax (the docker-compose image is neo4j:4.4-enterprise)
+CREATE_CONSTRAINT = "CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE"
+
+
+def constraint_statements() -> List[str]:
+    """The CREATE CONSTRAINT statements, e.g. to paste into the Neo4j browser."""
+    return [CREATE_CONSTRAINT.format(name=name, label=label, prop=prop) for name, label, prop in UNIQUE_KEYS]
+
+
+def _driver_of(target) -> Driver:
+    """Accept a Driver or anything holding one (Neo4jConnector)."""
+    return getattr(target, "driver", target)
+
+
+def create_constraints(target) -> None:
+    """Create the uniqueness constraints (no-op for the ones that already exist)."""
+    with _driver_of(target).session() as session:
+        for (name, label, prop), statement in zip(UNIQUE_KEYS, constraint_statements()):
+            try:
+                session.run(statement).consume()
+            except ClientError as e:
+                # e.g. duplicate values already in the graph, or a plain index on the same key
+                print(f"⚠️ Could not create constraint {name} on :{label}({prop}): {e.message}")
+
+
+def schema_status(target) -> Dict[Tuple[str, str], str]:
+    """
+    {(label, property): state} for every key in UNIQUE_KEYS: the state of its
+    uniqueness-backed index ("ONLINE", "POPULATING", ...) or "MISSING".
+    Keys are matched by schema, so constraints created under other names
+    (e.g. by neomodel's install_labels) count too.
+    """
+    with _driver_of(target).session() as session:
+        constraints = session.run("SHOW CONSTRAINTS").data()
+        indexes = session.run("SHOW INDEXES").data()
+
+    unique = {
+        (tuple(c.get("labelsOrTypes") or ()), tuple(c.get("properties") or ()))
+        for c in constraints if "UNIQUE" in (c.get("type") or "")
+    }
+    states = {
+        (tuple(i.get("labelsOrTypes") or ()), tuple(i.get("properties") or ())): i.get("state")
+        for i in indexes
+    }
+    out = {}
+    for _, label, prop in UNIQUE_KEYS:
+        key = ((label,), (prop,))
+        out[(label, prop)] = states.get(key, "MISSING") if key in unique else "MISSING"
+    return out
+
+
+def ensure_schema(target, timeout_sec: int = None, wait: bool = True) -> None:
+    """
+    Idempotent schema bootstrap: create the constraints, wait for their indexes
+    and raise if any of them is not ONLINE (MERGE would fall back to label scans).
+    With wait=False (web app startup) indexes still being built are accepted;
+    only a constraint that could not be created raises.
+    """
+    timeout_sec = int(timeout_sec or getattr(config, "NEO4J_SCHEMA_TIMEOUT_SEC", 300))
+    create_constraints(target)
+    if wait:
+        with _driver_of(target).session() as session:
+            session.run("CALL db.awaitIndexes($timeout)", {"timeout": timeout_sec}).consume()
+
+    status = schema_status(target)
+    accepted = ("ONLINE",) if wait else ("ONLINE", "POPULATING")
+    not_ready = {f":{label}({prop})": state for (label, prop), state in status.items() if state not in accepted}
+    if not_ready:
+        raise RuntimeError(f"Neo4j schema not ready: {not_ready}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Create and verify the keyword graph constraints in Neo4j.")
+    ap.add_argument("--uri", default=config.NEO4J_URI)
+    ap.add_argument("--user", default=config.NEO4J_USER)
+    ap.add_argument("--password", default=config.NEO4J_PASSWORD)
+    ap.add_argument("--print-cypher", action="store_true", help="only print the statements")
+    args = ap.parse_args()
+
+    if args.print_cypher:
+        print(";\n".join(constraint_statements()) + ";")
+        return
+
+    from neo4j import GraphDatabase
+    driver = GraphDatabase.driver(args.uri, auth=(args.user, args.password))
+    try:
+        ensure_schema(driver)
+        for (label, prop), state in schema_status(driver).items():
+            print(f"   :{label}({prop}) {state}")
+        print("✅ Neo4j schema ready.")
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
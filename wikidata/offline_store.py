@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline Wikidata store built from a JSON dump.
+
+Build (streams the dump, one entity per line, .bz2/.gz/plain):
+    python -m wikidata.offline_store --dump latest-all.json.bz2 --out wikidata/offline.sqlite \
+        [--seeds seeds.txt] [--languages en fr]
+
+'seeds.txt' holds one QID or keyword per line. With seeds, only the seed
+entities and what is reachable from them through P31/P279/P101 are kept.
+
+Then set OFFLINE_MODE = True in config.py: wbsearchentities / wbgetentities
+are answered from the store and no HTTP request is made.
+"""
+
+import argparse
+import bz2
+import gzip
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from . import config
+from .utils import normalize_kw
+from .wikidata_api import slim_entity, sitelink_count
+
+# Claims followed when keeping only what is reachable from the seeds
+REACH_PIDS = (config.P_INSTANCE_OF, config.P_SUBCLASS_OF, config.P_FIELD_OF_WORK)
+
+_QID_RE = re.compile(r"^Q\d+$")
+_COMMIT_EVERY = 10_000
+
+
+def _term(text: str) -> str:
+    """Normalized form used for the term index (case-insensitive)."""
+    return normalize_kw(text).lower()
+
+
+# ----------------------------- dump reading ---------------------------------
+
+def iter_dump(path: Path) -> Iterator[Dict]:
+    """Yield entities from a Wikidata JSON dump (array with one entity per line)."""
+    path = Path(path)
+    if path.suffix == ".bz2":
+        f = bz2.open(path, "rt", encoding="utf-8")
+    elif path.suffix == ".gz":
+        f = gzip.open(path, "rt", encoding="utf-8")
+    else:
+        f = open(path, "r", encoding="utf-8")
+    with f:
+        for line in f:
+            line = line.strip().rstrip(",")
+            if not line or line in ("[", "]"):
+                continue
+            yield json.loads(line)
+
+
+def _claim_targets(entity: Dict, pids: Iterable[str]) -> List[str]:
+    out = []
+    claims = entity.get("claims") or {}
+    for pid in pids:
+        for cl in claims.get(pid, []):
+            v = cl.get("mainsnak", {}).get("datavalue", {}).get("value")
+            if isinstance(v, dict) and v.get("id"):
+                out.append(v["id"])
+    return out
+
+
+def project_entity(entity: Dict, languages: List[str]) -> Dict:
+    """Slim entity (see wikidata_api.slim_entity) restricted to 'languages'."""
+    langs = set(languages)
+    slim = slim_entity({
+        **entity,
+        "labels": {lg: v for lg, v in (entity.get("labels") or {}).items() if lg in langs},
+        "descriptions": {lg: v for lg, v in (entity.get("descriptions") or {}).items() if lg in langs},
+        "aliases": {lg: v for lg, v in (entity.get("aliases") or {}).items() if lg in langs},
+    })
+    slim["type"] = entity.get("type", "item")
+    return slim
+
+
+# ----------------------------- the store ------------------------------------
+
+class OfflineStore:
+    """Read side of the offline store: wbsearchentities- and wbgetentities-style lookups."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"Offline store not found: {self.path} (build it with python -m wikidata.offline_store)")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+
+    def _load(self, qids: List[str]) -> Dict[str, Dict]:
+        out = {}
+        with self._lock:
+            for i in range(0, len(qids), 500):
+                part = qids[i:i + 500]
+                marks = ",".join("?" * len(part))
+                for qid, data in self._conn.execute(
+                    f"SELECT qid, data FROM entities WHERE qid IN ({marks})", part
+                ):
+                    out[qid] = json.loads(data)
+        return out
+
+    def get_entities(self, ids: List[str], languages: List[str] = None) -> Dict[str, Dict]:
+        """Same contract as wbgetentities: unknown IDs come back as {'id': ..., 'missing': ''}."""
+        languages = languages or config.LANGS
+        ids = list(dict.fromkeys(q for q in ids if q))
+        found = self._load(ids)
+        out = {}
+        for q in ids:
+            ent = found.get(q)
+            if ent is None:
+                out[q] = {"id": q, "missing": ""}
+                continue
+            langs = set(languages)
+            for field in ("labels", "descriptions", "aliases"):
+                ent[field] = {lg: v for lg, v in ent.get(field, {}).items() if lg in langs}
+            out[q] = ent
+        return out
+
+    def search(self, search: str, language: str = "en", limit: int = config.SEARCH_LIMIT,
+               label_only: bool = False) -> List[Dict]:
+        """
+        Prefix search over labels (and aliases unless 'label_only'), like wbsearchentities
+        with strictlanguage=0: exact matches first, then the requested language,
+        then entities with more sitelinks.
+        """
+        term = _term(search)
+        if not term:
+            return []
+        kind_filter = "AND t.kind = 'label'" if label_only else ""
+        with self._lock:
+            rows = self._conn.execute(f"""
+                SELECT t.qid,
+                       MIN(CASE WHEN t.term = ? THEN 0 ELSE 1 END) AS not_exact,
+                       MIN(CASE WHEN t.lang = ? THEN 0 ELSE 1 END) AS other_lang,
+                       e.sitelinks
+                FROM terms t JOIN entities e ON e.qid = t.qid
+                WHERE t.term >= ? AND t.term < ? {kind_filter}
+                GROUP BY t.qid
+                ORDER BY not_exact, other_lang, e.sitelinks DESC, t.qid
+                LIMIT ?
+            """, (term, language, term, term + "\U0010ffff", int(limit))).fetchall()
+
+        ents = self._load([r[0] for r in rows])
+        hits = []
+        for qid, *_ in rows:
+            ent = ents.get(qid, {})
+            labels, descs = ent.get("labels", {}), ent.get("descriptions", {})
+            lab = labels.get(language) or next(iter(labels.values()), None)
+            desc = descs.get(language) or next(iter(descs.values()), None)
+            hits.append({
+                "id": qid,
+                "label": lab["value"] if lab else qid,
+                "description": desc["value"] if desc else None,
+                "aliases": [a["value"] for a in ent.get("aliases", {}).get(language, [])],
+            })
+        return hits
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ----------------------------- build ----------------------------------------
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    conn.executescript("""
+        DROP TABLE IF EXISTS entities;
+        DROP TABLE IF EXISTS terms;
+        DROP TABLE IF EXISTS meta;
+        CREATE TABLE entities (qid TEXT PRIMARY KEY, sitelinks INTEGER NOT NULL, data TEXT NOT NULL);
+        CREATE TABLE terms (term TEXT NOT NULL, lang TEXT NOT NULL, qid TEXT NOT NULL, kind TEXT NOT NULL);
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+    """)
+
+
+def _insert(conn: sqlite3.Connection, ent: Dict) -> None:
+    qid = ent["id"]
+    conn.execute("INSERT OR REPLACE INTO entities VALUES (?, ?, ?)",
+                 (qid, sitelink_count(ent), json.dumps(ent, ensure_ascii=False)))
+    rows = set()
+    for lg, v in ent["labels"].items():
+        rows.add((_term(v["value"]), lg, qid, "label"))
+    for lg, lst in ent["aliases"].items():
+        for a in lst:
+            rows.add((_term(a["value"]), lg, qid, "alias"))
+    conn.executemany("INSERT INTO terms VALUES (?, ?, ?, ?)", [r for r in rows if r[0]])
+
+
+def _matches_terms(entity: Dict, terms: Set[str]) -> bool:
+    for v in (entity.get("labels") or {}).values():
+        if _term(v["value"]) in terms:
+            return True
+    for lst in (entity.get("aliases") or {}).values():
+        for a in lst:
+            if _term(a["value"]) in terms:
+                return True
+    return False
+
+
+def build_store(dump_path: Path, out_path: Path, seeds: Optional[Iterable[str]] = None,
+                languages: List[str] = None, max_passes: int = 10) -> int:
+    """
+    Stream 'dump_path' into a new store at 'out_path'. Returns the number of entities kept.
+
+    Without seeds every item is kept. With seeds (QIDs and/or keywords matched
+    against labels and aliases), the dump is streamed again until no new entity
+    becomes reachable through P31/P279/P101 (or 'max_passes' is hit).
+    """
+    languages = languages or config.LANGS
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(out_path))
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    _create_schema(conn)
+
+    seeds = [s.strip() for s in (seeds or []) if s and s.strip()]
+    keep_all = not seeds
+    wanted = {s for s in seeds if _QID_RE.match(s)}
+    seed_terms = {_term(s) for s in seeds if not _QID_RE.match(s)}
+    stored: Set[str] = set()
+
+    passes = 0
+    while True:
+        passes += 1
+        added = 0
+        started = time.time()
+        for entity in iter_dump(dump_path):
+            qid = entity.get("id", "")
+            if not qid.startswith("Q") or qid in stored:
+                continue
+            if not keep_all and qid not in wanted:
+                if passes > 1 or not seed_terms or not _matches_terms(entity, seed_terms):
+                    continue
+            _insert(conn, project_entity(entity, languages))
+            stored.add(qid)
+            added += 1
+            if not keep_all:
+                wanted.update(_claim_targets(entity, REACH_PIDS))
+            if added % _COMMIT_EVERY == 0:
+                conn.commit()
+        conn.commit()
+        print(f"📦 Pass {passes}: {added} entities added ({time.time() - started:.0f}s)")
+        if keep_all or not (wanted - stored) or added == 0 or passes >= max_passes:
+            break
+
+    print("🔎 Building indexes...")
+    conn.execute("CREATE INDEX terms_term ON terms(term)")
+    conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+        ("languages", ",".join(languages)),
+        ("source", str(dump_path)),
+        ("built_at", time.strftime("%Y-%m-%d %H:%M:%S")),
+    ])
+    conn.commit()
+    conn.close()
+    return len(stored)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build an offline Wikidata store from a JSON dump.")
+    ap.add_argument("--dump", required=True, type=Path, help="Wikidata JSON dump (.json, .json.gz, .json.bz2)")
+    ap.add_argument("--out", type=Path, default=config.OFFLINE_STORE_PATH, help="SQLite file to create")
+    ap.add_argument("--seeds", type=Path, help="file with one QID or keyword per line")
+    ap.add_argument("--languages", nargs="+", default=config.LANGS)
+    ap.add_argument("--max-passes", type=int, default=10)
+    args = ap.parse_args()
+
+    seeds = None
+    if args.seeds:
+        with open(args.seeds, "r", encoding="utf-8") as f:
+            seeds = [line for line in f]
+    n = build_store(args.dump, args.out, seeds=seeds, languages=args.languages, max_passes=args.max_passes)
+    print(f"🏁 {n} entities written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
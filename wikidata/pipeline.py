@@ -1,11 +1,19 @@
 import csv
 import json
+import os
 import re
-from typing import Dict, List, Optional, Tuple, Set
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Set
 
 from . import config
-from .neo4j_io import Neo4jConnector, ingest_p279_hierarchy, ingest_document_map, ingest_p31_types
-from .matchers import pick_with_context_then_exact
+from .checkpoint import ProgressJournal
+from .neo4j_io import Neo4jConnector, GraphTarget, is_graph_writer, open_graph_writer, ingest_p279_hierarchy, ingest_document_map, ingest_p31_types
+from .matchers import pick_with_context_then_exact, prepare_candidates, score_candidates
+from .entities import Candidate
+from .scoring import ContextProfile, context_profile, start_debug_logs
 from .wikidata_api import (
     wbgetentities, extract_bnf_id, extract_label, is_disambiguation,
     get_p31_ids, expand_p279_paths, _claim_ids
@@ -38,113 +46,371 @@ def get_labels_for(qids: List[str], languages: List[str] = None) -> Dict[str, st
         labels[q] = lab or q
     return labels
 
-def map_keywords(records: List[Dict], neo4j_conn: Neo4jConnector) -> List[Dict]:
-    """Map HAL keywords to Wikidata QIDs, create Neo4j nodes, and prepare CSV rows."""
+class LabelTable:
+    """
+    Bounded LRU of QID -> display label, shared by every document of a run.
+    resolve() fetches all unknown QIDs of a call in packed wbgetentities requests.
+    """
+
+    def __init__(self, max_size: int = None, languages: List[str] = None):
+        self.max_size = int(max_size or getattr(config, "LABEL_CACHE_SIZE", 50_000))
+        self.languages = languages or config.LANGS
+        self._labels: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, qids) -> Dict[str, str]:
+        """{qid: label} for every QID Wikidata returned (same contract as get_labels_for)."""
+        qids = list(dict.fromkeys(q for q in qids if q))
+        out, missing = {}, []
+        with self._lock:
+            for q in qids:
+                if q in self._labels:
+                    self._labels.move_to_end(q)
+                    out[q] = self._labels[q]
+                else:
+                    missing.append(q)
+            self.hits += len(out)
+            self.misses += len(missing)
+
+        if missing:
+            fetched = get_labels_for(missing, self.languages)
+            out.update(fetched)
+            with self._lock:
+                for q, lab in fetched.items():
+                    self._labels[q] = lab
+                    self._labels.move_to_end(q)
+                while len(self._labels) > self.max_size:
+                    self._labels.popitem(last=False)
+        return out
+
+def _match_keyword(kw: str, context: ContextProfile) -> Dict:
+    """Matching + hierarchy expansion for one keyword; labels are resolved later."""
+    # Try to find the best Wikidata match for the keyword
+    return _finish_keyword(kw, pick_with_context_then_exact(kw, context))
+
+def _finish_keyword(kw: str, cand: Optional[Candidate]) -> Dict:
+    """Entity details and P279 paths of the chosen candidate (network side)."""
+    res = {
+        "keyword": kw, "cand": None, "qid": "", "label": "", "bnf": "",
+        "disambig": False, "match_stage": "none", "best_sim": 0.0, "best_score": 0.0,
+        "p31s": [], "qid_paths": [], "skip_paths": False,
+    }
+    res["cand"] = cand
+    if not cand:
+        return res
+
+    ent = wbgetentities([cand.id]).get(cand.id, {})
+    if not ent:
+        return res
+    res["disambig"] = is_disambiguation(cand.id, ent)
+    if res["disambig"]:
+        return res
+
+    res["qid"] = cand.id
+    res["label"] = get_label(ent)
+    res["bnf"] = get_bnf(ent) or ""
+    res["match_stage"] = cand.stage or "context_or_exact"
+    res["best_sim"] = cand.label_similarity
+    res["best_score"] = cand.match_score
+
+    # P31 (instance of)
+    # kept as a list: its order (used for p31_label) must survive pickling to process workers
+    res["p31s"] = list(get_p31_ids(ent))
+
+    # P279 (subclass of) – optional for speed
+    if config.ENABLE_P279_PATHS:
+        direct_p279 = claim_ids(ent, config.P_SUBCLASS_OF)
+        if direct_p279:
+            res["qid_paths"] = expand_p279_paths(
+                direct_p279,
+                config.MAX_LEVELS_LINEAGE,
+                config.LANGS
+            )
+    else:
+        # skip hierarchy expansion for faster runs
+        res["skip_paths"] = True
+    return res
+
+def _emit_keyword(res: Dict, docid: str, title: str, labels: Dict[str, str],
+                  neo4j_conn: Optional[GraphTarget]) -> List[Dict]:
+    """Neo4j ingest + CSV rows for one matched keyword."""
+    kw, qid, label = res["keyword"], res["qid"], res["label"]
+    p31s_out: List[str] = res["p31s"]
+    p31_labels_out = ""
+    p279_paths_labels: List[str] = []
+
+    if qid:
+        p31_labels = {x: labels[x] for x in p31s_out if x in labels}
+        p31_labels_out = ";".join(p31_labels.get(x, x) for x in p31s_out)
+
+        # Neo4j: insert P31 relationships
+        if neo4j_conn and config.ENABLE_NEO4J_INGEST:
+            ingest_p31_types(neo4j_conn, qid, p31s_out, p31_labels)
+
+        if res["skip_paths"]:
+            p279_paths_labels = [""]
+        elif res["qid_paths"]:
+            # Neo4j: insert P279 hierarchy
+            if neo4j_conn and config.ENABLE_NEO4J_INGEST:
+                ingest_p279_hierarchy(neo4j_conn, qid, label, res["qid_paths"])
+
+            # CSV: collect subclass labels
+            for qpath in res["qid_paths"]:
+                p279_paths_labels.append(" > ".join(labels.get(q, q) for q in qpath))
+
+        # Neo4j: create Document–Keyword–Item mapping
+        if neo4j_conn and config.ENABLE_NEO4J_INGEST:
+            ingest_document_map(neo4j_conn, docid, kw, qid)
+
+    # CSV (replicate for each P279 path; if no QID, create an empty row)
     rows = []
-    seen_pairs = set()
+    paths = (p279_paths_labels or [""]) if qid else [""]
+    for path_text in paths:
+        rows.append({
+            "docid": docid, "title": title, "keyword": kw,
+            "wikidata_label": label, "wikidata_qid": qid,
+            "bnf_id": res["bnf"], "p279_path": path_text,
+            "retry_source": res["match_stage"], "match_stage": res["match_stage"],
+            "is_disambiguation": "yes" if (res["cand"] and res["disambig"]) else "no",
+            "label_similarity": round(res["best_sim"], 1), "match_score": round(res["best_score"], 1),
+            "p31_types": ";".join(sorted(p31s_out)) if p31s_out else "",
+            "p31_label": p31_labels_out,
+        })
+    return rows
 
+def _document_jobs(records: Iterable[Dict], seen_pairs: Set[Tuple[str, str]]):
+    """
+    (docid, title, context, keywords) per record, in input order. The (docid, keyword)
+    dedupe happens here, in the calling thread, so workers never share 'seen_pairs'.
+    'context' is the ContextProfile of title + abstract, built once for all keywords.
+    """
     for rec in records:
         title = rec.get("title_s") or ""
         abstract = rec.get("abstract_s") or ""
-        context = f"{title}. {abstract}"
+        context = context_profile(f"{title}. {abstract}")
         docid = rec.get("docid") or rec.get("halId_s") or ""
 
         keywords = rec.get("keyword_s") or []
         if not keywords and rec.get("keywords_joined"):
             keywords = _split_keywords(rec["keywords_joined"])
 
-        print(f"\n--- Processing Document {docid} with {len(keywords)} keywords ---")
-
+        todo = []
         for kw in keywords:
             if (docid, kw) in seen_pairs:
                 continue
             seen_pairs.add((docid, kw))
+            todo.append(kw)
+        yield docid, title, context, keywords, todo
 
-            qid = label = bnf = ""
-            disambig = False
-            match_stage = "none"
-            best_sim = 0.0
-            best_score = 0.0
-            p31s_out: Set[str] = set()
-            p31_labels_out = ""
-            p279_paths_labels: List[str] = []
-
-            # Try to find the best Wikidata match for the keyword
-            cand = pick_with_context_then_exact(kw, context)
-
-            if cand:
-                ent = wbgetentities([cand["id"]]).get(cand["id"], {})
-                if ent:
-                    disambig = is_disambiguation(cand["id"], ent)
-                    if not disambig:
-                        qid = cand["id"]
-                        label = get_label(ent)
-                        bnf = get_bnf(ent) or ""
-                        match_stage = cand.get("__stage", "context_or_exact")
-                        best_sim = cand.get("label_similarity", 0.0)
-                        best_score = cand.get("match_score", 0.0)
-
-                        # P31 (instance of)
-                        p31s_out = get_p31_ids(ent)
-                        p31_labels = get_labels_for(list(p31s_out)) if p31s_out else {}
-                        p31_labels_out = ";".join(p31_labels.get(x, x) for x in p31s_out)
-
-                        # Neo4j: insert P31 relationships
-                        if neo4j_conn and config.ENABLE_NEO4J_INGEST:
-                            ingest_p31_types(neo4j_conn, qid, p31s_out, p31_labels)
-
-                        # P279 (subclass of) – optional for speed
-                        p279_paths_labels = []
-                        if config.ENABLE_P279_PATHS:
-                            direct_p279 = claim_ids(ent, config.P_SUBCLASS_OF)
-                            if direct_p279:
-                                qid_paths = expand_p279_paths(
-                                    direct_p279,
-                                    config.MAX_LEVELS_LINEAGE,
-                                    config.LANGS
-                                )
-
-                                # Neo4j: insert P279 hierarchy
-                                if neo4j_conn and config.ENABLE_NEO4J_INGEST:
-                                    ingest_p279_hierarchy(neo4j_conn, qid, label, qid_paths)
-
-                                # CSV: collect subclass labels
-                                for qpath in qid_paths:
-                                    labs = get_labels_for(qpath, config.LANGS)
-                                    p279_paths_labels.append(" > ".join(labs.get(q, q) for q in qpath))
-                        else:
-                            # skip hierarchy expansion for faster runs
-                            p279_paths_labels = [""]
-
-                        # Neo4j: create Document–Keyword–Item mapping
-                        if neo4j_conn and config.ENABLE_NEO4J_INGEST:
-                            ingest_document_map(neo4j_conn, docid, kw, qid)
-
-            # CSV (replicate for each P279 path; if no QID, create an empty row)
-            paths = p279_paths_labels or [""] if qid else [""]
-            for path_text in paths:
-                rows.append({
-                    "docid": docid, "title": title, "keyword": kw,
-                    "wikidata_label": label, "wikidata_qid": qid,
-                    "bnf_id": bnf, "p279_path": path_text,
-                    "retry_source": match_stage, "match_stage": match_stage,
-                    "is_disambiguation": "yes" if (cand and disambig) else "no",
-                    "label_similarity": round(best_sim, 1), "match_score": round(best_score, 1),
-                    "p31_types": ";".join(sorted(p31s_out)) if p31s_out else "",
-                    "p31_label": p31_labels_out,
-                })
+def _match_document(keywords: List[str], context: ContextProfile,
+                    labels_lru: LabelTable) -> Tuple[List[Dict], Dict[str, str]]:
+    """Match every keyword of a document, then resolve all of its labels in one pass."""
+    # 1) match every keyword of the document
+    results = [_match_keyword(kw, context) for kw in keywords]
+    return results, _resolve_labels(results, labels_lru)
 
-    return rows
+def _resolve_labels(results: List[Dict], labels_lru: LabelTable) -> Dict[str, str]:
+    # 2) one label-resolution pass for all P31 types and P279 paths of the document
+    wanted = set()
+    for res in results:
+        if res["qid"]:
+            wanted.update(res["p31s"])
+            for qpath in res["qid_paths"]:
+                wanted.update(qpath)
+    return labels_lru.resolve(wanted) if wanted else {}
+
+# ----------------------------- worker pool -----------------------------------
+# "threads": whole documents are matched in a thread pool (the work is mostly
+# network waits, all threads share one Wikidata client and rate limiter).
+# "processes": the same I/O threads run in this process, and only the scoring
+# (score_candidates: rapidfuzz, numpy) is sent to the process pool. Workers
+# make no Wikidata request, so the rate limit, connection pool, caches and
+# label table stay single and shared, whatever the number of processes.
 
-def write_csv(rows: List[Dict], out_path):
-    """Write the mapping results to a CSV file."""
-    fieldnames = [
-        "docid", "title", "keyword", "wikidata_label", "wikidata_qid",
-        "bnf_id", "p279_path", "retry_source", "match_stage", "is_disambiguation",
-        "label_similarity", "match_score", "p31_types", "p31_label"
-    ]
+def _score_document(keywords: List[str], context: ContextProfile,
+                    prepared: List[Tuple[Candidate, ...]]) -> List[Optional[Candidate]]:
+    """Runs in a process worker: pick the best candidate of each keyword (CPU only)."""
+    return [score_candidates(kw, context, prep, raw_keyword=kw) for kw, prep in zip(keywords, prepared)]
+
+def _match_document_split(keywords: List[str], context: ContextProfile, labels_lru: LabelTable,
+                          scorer: Executor) -> Tuple[List[Dict], Dict[str, str]]:
+    """_match_document with the scoring in 'scorer' (a process pool); runs in an I/O thread."""
+    prepared = [prepare_candidates(kw) for kw in keywords]
+    picked = scorer.submit(_score_document, keywords, context, prepared).result()
+    results = [_finish_keyword(kw, cand) for kw, cand in zip(keywords, picked)]
+    return results, _resolve_labels(results, labels_lru)
+
+def _process_worker_config() -> Dict:
+    """Config values a scoring worker must share with this process (spawned workers re-import config.py)."""
+    names = ("DEBUG_SCORES", "DEBUG_SCORES_MODE_PATH", "DEBUG_CTX_DETAIL", "DEBUG_CTX_DETAIL_PATH",
+             "DEBUG_SCORES_SAMPLE_RATE")
+    return {name: getattr(config, name) for name in names if hasattr(config, name)}
+
+def _init_process_worker(debug_paths: Iterable[Path] = (), settings: Optional[Dict] = None) -> None:
+    """
+    Scoring worker setup: take the parent's settings, drop state a forked worker
+    must not share with its parent (SQLite handles, loop futures).
+    """
+    from multiprocessing.util import Finalize
+    from . import wikidata_api, hierarchy, debug_log
+    for name, value in (settings or {}).items():
+        setattr(config, name, value)
+    wikidata_api._entity_cache = None
+    wikidata_api._search_caches = None
+    wikidata_api._offline_store = None
+    wikidata_api._inflight = {}
+    hierarchy._closure = None
+    # debug sinks: the parent's writer threads do not survive the fork, and pool
+    # workers exit without atexit hooks, so close them from a multiprocessing finalizer
+    debug_log._sinks = {}
+    debug_log.mark_prepared(debug_paths)     # the parent created them: append only (fork or spawn)
+    Finalize(None, debug_log.close_sinks, exitpriority=10)
+
+def _make_scorer(workers: int) -> ProcessPoolExecutor:
+    settings = _process_worker_config()
+    # the pool already spreads documents over the cores: one cdist thread per worker
+    settings["FUZZY_CDIST_WORKERS"] = 1
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_process_worker,
+                               initargs=(start_debug_logs(), settings))
+
+def _iter_matched(jobs, mode: str, workers: int, labels_lru: LabelTable):
+    """(job, (results, labels)) per document, in job order, matched serially or in a pool."""
+    if mode not in ("threads", "processes"):
+        for job in jobs:
+            yield job, _match_document(job[4], job[2], labels_lru)
+        return
+
+    # at most 'window' documents in flight; results are consumed in submission order
+    window = max(workers, int(getattr(config, "PARALLEL_WINDOW", workers * 4)))
+    scorer = _make_scorer(workers) if mode == "processes" else None
+    io_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="map-keywords")
+
+    def _submit(job):
+        if scorer is None:
+            return io_pool.submit(_match_document, job[4], job[2], labels_lru)
+        return io_pool.submit(_match_document_split, job[4], job[2], labels_lru, scorer)
+
+    pending = deque()
+    try:
+        with io_pool:
+            for job in jobs:
+                pending.append((job, _submit(job)))
+                if len(pending) >= window:
+                    done_job, fut = pending.popleft()
+                    yield done_job, fut.result()
+            while pending:
+                done_job, fut = pending.popleft()
+                yield done_job, fut.result()
+    finally:
+        if scorer is not None:
+            scorer.shutdown()
+
+def map_keywords(records: Iterable[Dict], neo4j_conn: Optional[GraphTarget],
+                 label_table: Optional[LabelTable] = None,
+                 mode: Optional[str] = None, workers: Optional[int] = None,
+                 skip_pairs: Optional[Set[Tuple[str, str]]] = None) -> Iterator[Dict]:
+    """
+    Map HAL keywords to Wikidata QIDs, create Neo4j nodes, and yield CSV rows
+    as each document is finished ('records' may be a stream, see streaming.py).
+
+    mode (default config.PARALLEL_MODE): "serial", "threads" or "processes"
+    (I/O threads here, candidate scoring in a process pool, see _iter_matched).
+    Matching runs in the pool; Neo4j ingest and row building stay in this
+    thread and follow input order, so the output equals the serial run.
+    'skip_pairs' are (docid, keyword) pairs finished in an earlier run (see checkpoint.py).
+    Graph writes go through a GraphWriter (UNWIND batches, optionally on a
+    background thread); a bare connector is wrapped in one that is flushed
+    when the generator finishes.
+    """
+    mode = mode or getattr(config, "PARALLEL_MODE", "serial")
+    workers = int(workers or getattr(config, "PARALLEL_WORKERS", 4))
+    seen_pairs = set(skip_pairs or ())
+    labels_lru = label_table or LabelTable()
+    jobs = _document_jobs(records, seen_pairs)
+
+    graph = neo4j_conn
+    if graph is not None and not is_graph_writer(graph):
+        graph = open_graph_writer(graph)
+
+    def _emit(job, matched):
+        docid, title, _, keywords, _ = job
+        results, labels = matched
+        print(f"\n--- Processing Document {docid} with {len(keywords)} keywords ---")
+        # 3) Neo4j ingest + CSV rows, in keyword order
+        rows = []
+        for res in results:
+            rows.extend(_emit_keyword(res, docid, title, labels, graph))
+        return rows
+
+    try:
+        for job, matched in _iter_matched(jobs, mode, workers, labels_lru):
+            yield from _emit(job, matched)
+    finally:
+        if graph is not None and graph is not neo4j_conn:
+            graph.close()
+
+CSV_FIELDNAMES = [
+    "docid", "title", "keyword", "wikidata_label", "wikidata_qid",
+    "bnf_id", "p279_path", "retry_source", "match_stage", "is_disambiguation",
+    "label_similarity", "match_score", "p31_types", "p31_label"
+]
+
+def write_csv(rows: Iterable[Dict], out_path, flush_every: Optional[int] = None,
+              journal: Optional[ProgressJournal] = None,
+              before_checkpoint: Optional[Callable[[], None]] = None) -> int:
+    """
+    Write the mapping results to a CSV file as they arrive; returns the number of rows.
+
+    With a journal, each finished (docid, keyword) pair is recorded and the
+    journal is committed in batches right after the CSV is flushed to disk.
+    If the journal already holds a checkpoint, the CSV is cut back to it and
+    appended to (rebuilt from the journal if the file is missing or shorter).
+    'before_checkpoint' runs before each journal commit (e.g. flush pending graph writes).
+    """
+    flush_every = int(flush_every or getattr(config, "CSV_FLUSH_EVERY", 200))
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(out_path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+    resume_at = journal.csv_offset() if journal else 0
+    n = 0
+
+    if resume_at and out_path.exists() and out_path.stat().st_size >= resume_at:
+        with open(out_path, "r+b") as raw:
+            raw.truncate(resume_at)
+        f = open(out_path, "a", encoding="utf-8", newline="")
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
+    else:
+        f = open(out_path, "w", encoding="utf-8", newline="")
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
         writer.writeheader()
-        writer.writerows(rows)
+        if resume_at:
+            print(f"⚠️ {out_path} is missing or shorter than the checkpoint; rebuilding it from the journal.")
+            writer.writerows(journal.iter_rows())
+
+    def _checkpoint() -> None:
+        if before_checkpoint:
+            before_checkpoint()
+        f.flush()
+        os.fsync(f.fileno())
+        journal.commit(csv_offset=os.fstat(f.fileno()).st_size)
+
+    with f:
+        key, group = None, []
+        for row in rows:
+            if journal and (row["docid"], row["keyword"]) != key:
+                if group:
+                    journal.record(key[0], key[1], group)
+                    if journal.should_commit():
+                        _checkpoint()
+                key, group = (row["docid"], row["keyword"]), []
+            writer.writerow(row)
+            if journal:
+                group.append(row)
+            n += 1
+            if n % flush_every == 0:
+                f.flush()
+        if journal:
+            if group:
+                journal.record(key[0], key[1], group)
+            _checkpoint()
+    return n
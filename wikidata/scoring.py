@@ -1,45 +1,36 @@
-from typing import Dict
-from rapidfuzz import fuzz
+from typing import Dict, FrozenSet, List, NamedTuple, Sequence, Union
+from rapidfuzz import fuzz, process
 from pathlib import Path
 import math
-import os
-import csv
+import numpy as np
 
 from . import config
+from . import debug_log
 from .utils import normalize_kw, tokenize, singularize_en
+from .entities import Candidate, as_candidate
 
-_DEBUG_HEADER_WRITTEN = False
+# Scoring functions take a Candidate; legacy dicts are converted on the fly.
+EntLike = Union[Candidate, Dict]
 
 # ----------------------------- Debug CSV ----------------------------
+# Rows go through buffered sinks (debug_log.py): one open file and a writer thread
+# per CSV instead of one open/append per row. Only sampled keywords are logged.
+
+_DEBUG_SCORE_HEADER = [
+    "kw_norm", "qid", "label",
+    "ctx_sim", "lbl_sim", "canon",
+    "alias_exact_flag", "penalty", "exact_bonus", "alias_bonus",
+    "total",
+    "p31_ids", "p101_ids", "p31_cnt", "p101_cnt",
+    "p31_fuzzy_ctx"
+]
 
 def _debug_log_score(row: list) -> None:
-    """Append one debug row if DEBUG_SCORES is enabled."""
-    global _DEBUG_HEADER_WRITTEN
-    if not getattr(config, "DEBUG_SCORES", False):
+    """Queue one debug row if DEBUG_SCORES is enabled and its keyword (row[0]) is sampled."""
+    if not getattr(config, "DEBUG_SCORES", False) or not debug_log.sampled(row[0]):
         return
-
     path = getattr(config, "DEBUG_SCORES_PATH", Path("debug_scores.csv"))
-
-    if not hasattr(_debug_log_score, "_cleared"):
-        if path.exists():
-            os.remove(path)
-        _debug_log_score._cleared = True
-
-    write_header = (not path.exists()) and (not _DEBUG_HEADER_WRITTEN)
-
-    with open(path, "a", encoding="utf-8", newline="") as f:
-        w = csv.writer(f)
-        if write_header:
-            w.writerow([
-                "kw_norm", "qid", "label",
-                "ctx_sim", "lbl_sim", "canon",
-                "alias_exact_flag", "penalty", "exact_bonus", "alias_bonus",
-                "total",
-                "p31_ids", "p101_ids", "p31_cnt", "p101_cnt",
-                "p31_fuzzy_ctx"
-            ])
-            _DEBUG_HEADER_WRITTEN = True
-        w.writerow(row)
+    debug_log.get_sink(path, _DEBUG_SCORE_HEADER).write(row)
 
 #============================================
 
@@ -64,7 +55,31 @@ def _normalize_for_ctx(text: str) -> str:
     return " ".join(kept)
 
 
-def _short_kw_case_bonus(keyword: str, ent_like: Dict) -> float:
+class ContextProfile(NamedTuple):
+    """A document context (title + abstract) prepared once for all of its candidates."""
+    norm: str                     # normalize_kw(context)
+    tokens: FrozenSet[str]        # tokens of 'norm'
+    filtered: str                 # _normalize_for_ctx(context): stopwords / short tokens dropped
+    filtered_tokens: FrozenSet[str]
+
+
+def context_profile(context: str) -> ContextProfile:
+    norm = normalize_kw(context or "")
+    filtered = _normalize_for_ctx(norm)
+    return ContextProfile(norm, frozenset(tokenize(norm)), filtered, frozenset(tokenize(filtered)))
+
+
+# Scoring functions take a ContextProfile; plain strings are profiled on the fly.
+ContextLike = Union[ContextProfile, str]
+
+
+def as_context_profile(context: ContextLike) -> ContextProfile:
+    if isinstance(context, ContextProfile):
+        return context
+    return context_profile(context)
+
+
+def _short_kw_case_bonus(keyword: str, ent_like: EntLike) -> float:
     """
     Bonus genérico para keywords cortas (<=4 chars) que coinciden
     EXACTAMENTE (case-sensitive) con el label o algún alias de Wikidata.
@@ -76,9 +91,9 @@ def _short_kw_case_bonus(keyword: str, ent_like: Dict) -> float:
     if len(kw_raw) == 0 or len(kw_raw) > 4:
         return 0.0
 
-    
-    label = ent_like.get("label") or ""
-    aliases = ent_like.get("aliases") or []
+    c = as_candidate(ent_like)
+    label = c.label
+    aliases = c.aliases
 
     
     if kw_raw == label:
@@ -94,50 +109,39 @@ def _short_kw_case_bonus(keyword: str, ent_like: Dict) -> float:
 
 # ======================= DEBUG: mode-aware total score ========================
 
+_DEBUG_MODE_HEADER = [
+    "kw","qid","label","mode",
+    
+    "exact_label","exact_alias",
+    "ctx","sl_log1p","p31_cnt","p279_cnt","ctx_p31","ctx_p279","alias_inv",
+    
+    "w_ctx","w_sl","w_p31","w_p279","w_ctx_p31","w_ctx_p279","w_alias_inv",
+   
+    "bonus_label","bonus_alias",
+    
+    "total"
+]
+
 def _debug_log_mode_score(row: list) -> None:
-    if not getattr(config, "DEBUG_SCORES", False):
+    if not getattr(config, "DEBUG_SCORES", False) or not debug_log.sampled(row[0]):
         return
     path = getattr(config, "DEBUG_SCORES_MODE_PATH", Path("debug_scores_mode.csv"))
-    if not hasattr(_debug_log_mode_score, "_cleared"):
-        if path.exists():
-            os.remove(path)
-        _debug_log_mode_score._cleared = True
-    write_header = not path.exists()
-    with open(path, "a", encoding="utf-8", newline="") as f:
-        w = csv.writer(f)
-        if write_header:
-            w.writerow([
-                "kw","qid","label","mode",
-                
-                "exact_label","exact_alias",
-                "ctx","sl_log1p","p31_cnt","p279_cnt","ctx_p31","ctx_p279","alias_inv",
-                
-                "w_ctx","w_sl","w_p31","w_p279","w_ctx_p31","w_ctx_p279","w_alias_inv",
-               
-                "bonus_label","bonus_alias",
-                
-                "total"
-            ])
-        w.writerow(row)
+    debug_log.get_sink(path, _DEBUG_MODE_HEADER).write(row)
 
 # ----------------------------- Similarities ----------------------------------
 
-def label_similarity(keyword: str, ent_like: Dict) -> float:
+def label_similarity(keyword: str, ent_like: EntLike) -> float:
     """Strict char-level similarity between keyword and (label or any alias)."""
+    c = as_candidate(ent_like)
     kw = normalize_kw(keyword)
-    label = normalize_kw(ent_like.get("label") or "")
-    aliases = [normalize_kw(a) for a in (ent_like.get("aliases") or [])]
-    sims = [fuzz.ratio(kw, label)] + [fuzz.ratio(kw, a) for a in aliases]
+    sims = [fuzz.ratio(kw, c.label_norm)] + [fuzz.ratio(kw, a) for a in c.aliases_norm]
     return float(max(sims))
 
-def _context_similarity(context: str, ent_like: Dict) -> float:
+def _context_similarity(context: ContextLike, ent_like: EntLike) -> float:
 
-    ctx = _normalize_for_ctx(context)
-    label = ent_like.get("label") or ""
-    desc = ent_like.get("description") or ""
-    aliases = " ".join(ent_like.get("aliases") or [])
-    cand_text = normalize_kw(" ".join([label, desc, aliases]))
-    if not ctx or not cand_text:
+    c = as_candidate(ent_like)
+    ctx = as_context_profile(context)
+    if not ctx.filtered or not c.text_norm:
         return 0.0
 
     sw = set(getattr(config, "STOPWORDS", set()))
@@ -151,8 +155,8 @@ def _context_similarity(context: str, ent_like: Dict) -> float:
     #A = _filtered_tokens(ctx)
     #B = _filtered_tokens(cand_text)
 
-    A = set(tokenize(ctx))
-    B = set(tokenize(cand_text))
+    A = ctx.filtered_tokens
+    B = c.text_tokens
 
     if not A or not B:
         return 0.0
@@ -160,39 +164,73 @@ def _context_similarity(context: str, ent_like: Dict) -> float:
     overlap = len(A & B)
     return 100.0 * overlap / max(1, len(A))
 
-def _context_similarity_full(context: str, ent_like: Dict) -> float:
+def _context_similarity_full(context: ContextLike, ent_like: EntLike) -> float:
     
-    from .utils import tokenize
-    A = set(tokenize(normalize_kw(context)))
-    label = ent_like.get("label") or ""
-    desc  = ent_like.get("description") or ""
-    aliases = " ".join(ent_like.get("aliases") or [])
-    B = set(tokenize(normalize_kw(f"{label} {desc} {aliases}")))
+    c = as_candidate(ent_like)
+    A = as_context_profile(context).tokens
+    B = c.text_tokens
     if not A or not B:
         return 0.0
     return 100.0 * len(A & B) / max(1, len(A))
 
-def _fuzzy_ctx(textA: str, textB: str) -> float:
+def _fuzzy_ctx(textA: ContextLike, textB: str) -> float:
     
-    a = _normalize_for_ctx(textA or "")
+    a = as_context_profile(textA).filtered
     b = _normalize_for_ctx(textB or "")
     if not a or not b:
         return 0.0
     return float(fuzz.token_set_ratio(a, b))
 
-def _p31_fuzzy_context(context: str, ent_like: Dict) -> float:
-    ctx = normalize_kw(context)
-    p31_text = normalize_kw(ent_like.get("__p31_text") or "")
+def _p31_fuzzy_context(context: ContextLike, ent_like: EntLike) -> float:
+    ctx = as_context_profile(context).norm
+    p31_text = normalize_kw(as_candidate(ent_like).p31_text)
     if not ctx or not p31_text:
         return 0.0
     return float(fuzz.token_set_ratio(ctx, p31_text))
 
+# ------------------------- Batched similarities ------------------------------
+
+def _cdist_row(query: str, choices: List[str], scorer) -> np.ndarray:
+    """scorer(query, choice) for every choice (rapidfuzz cdist, FUZZY_CDIST_WORKERS threads)."""
+    if not choices:
+        return np.zeros(0, dtype=np.float64)
+    workers = int(getattr(config, "FUZZY_CDIST_WORKERS", -1))
+    return process.cdist([query], choices, scorer=scorer, dtype=np.float64, workers=workers)[0]
+
+
+def label_similarity_many(keyword: str, cands: Sequence[EntLike]) -> np.ndarray:
+    """label_similarity of one keyword against many candidates: one cdist over every label and alias."""
+    cands = [as_candidate(c) for c in cands]
+    if not cands:
+        return np.zeros(0, dtype=np.float64)
+    names, starts = [], []
+    for c in cands:
+        starts.append(len(names))
+        names.append(c.label_norm)
+        names.extend(c.aliases_norm)
+    sims = _cdist_row(normalize_kw(keyword), names, fuzz.ratio)
+    return np.maximum.reduceat(sims, starts)
+
+
+def fuzzy_ctx_many(context: ContextLike, texts: Sequence[str]) -> np.ndarray:
+    """_fuzzy_ctx of one context against many texts (e.g. every candidate's P31 text)."""
+    out = np.zeros(len(texts), dtype=np.float64)
+    ctx = as_context_profile(context).filtered
+    if not ctx:
+        return out
+    normed = [_normalize_for_ctx(t or "") for t in texts]
+    keep = [i for i, t in enumerate(normed) if t]
+    if keep:
+        out[keep] = _cdist_row(ctx, [normed[i] for i in keep], fuzz.token_set_ratio)
+    return out
+
 # ----------------------------- Canonicality ----------------------------------
 
-def _canonicality_bonus(ent_like: Dict) -> float:
-    sl = float(ent_like.get("__sitelinks", 0) or 0)
-    has_p279 = 1.0 if ent_like.get("__has_p279") else 0.0
-    alias_count = float(ent_like.get("__alias_count", 0) or 0)
+def _canonicality_bonus(ent_like: EntLike) -> float:
+    c = as_candidate(ent_like)
+    sl = float(c.sitelinks or 0)
+    has_p279 = 1.0 if c.has_p279 else 0.0
+    alias_count = float(c.alias_count or 0)
     sitelinks_term = 3.2 * math.log1p(sl)
     structure_term = 2.0 * has_p279
     alias_term = 0.01 * min(alias_count, 200)
@@ -200,19 +238,21 @@ def _canonicality_bonus(ent_like: Dict) -> float:
 
 # ----------------------------- Total score -----------------------
 
-def total_score(keyword: str, context: str, ent_like: Dict, allow_exact_bonus: bool = True) -> float:
-    lbl = normalize_kw(ent_like.get("label") or "")
+def total_score(keyword: str, context: ContextLike, ent_like: EntLike, allow_exact_bonus: bool = True) -> float:
+    c = as_candidate(ent_like)
+    context = as_context_profile(context)
+    lbl = c.label_norm
     kw_norm = normalize_kw(keyword)
     kw_sing = singularize_en(kw_norm)
     exact = (lbl == kw_norm) or (lbl == kw_sing)
     exact_bonus = 1.0 if (allow_exact_bonus and exact) else 0.0
 
-    ctx_sim = _context_similarity(context, ent_like)   # 0..100
-    lbl_sim = label_similarity(keyword, ent_like)      # 0..100
+    ctx_sim = _context_similarity(context, c)   # 0..100
+    lbl_sim = label_similarity(keyword, c)      # 0..100
 
     kw_tokens = set(tokenize(kw_norm))
     lbl_tokens = set(tokenize(lbl))
-    alias_exact_flag = bool(ent_like.get("__alias_exact"))
+    alias_exact_flag = bool(c.alias_exact)
     is_short_acronym = (2 <= len(kw_norm) <= 5) and kw_norm.isalpha() and (kw_norm.isupper() or alias_exact_flag)
 
     if is_short_acronym or alias_exact_flag:
@@ -221,12 +261,12 @@ def total_score(keyword: str, context: str, ent_like: Dict, allow_exact_bonus: b
         extra_tokens = len([t for t in lbl_tokens if t not in kw_tokens])
         penalty = 0 * min(extra_tokens, 2)  
 
-    canon = _canonicality_bonus(ent_like)
+    canon = _canonicality_bonus(c)
     alias_bonus = 1.0 if alias_exact_flag else 0.0
-    p31_fuzzy_ctx = _p31_fuzzy_context(context, ent_like)
+    p31_fuzzy_ctx = _p31_fuzzy_context(context, c)
 
-    p31_ids  = sorted(list(ent_like.get("__p31s", [])))
-    p101_ids = sorted(list(ent_like.get("__p101s", [])))
+    p31_ids  = sorted(c.p31s)
+    p101_ids = sorted(c.p101s)
     p31_cnt = len(p31_ids)
     p101_cnt = len(p101_ids)
 
@@ -252,7 +292,7 @@ def total_score(keyword: str, context: str, ent_like: Dict, allow_exact_bonus: b
         penalty
     )
 
-    qid = ent_like.get("id", "")
+    qid = c.id
     _debug_log_score([
         kw_norm, qid, lbl,
         round(ctx_sim, 1), round(lbl_sim, 1), round(canon, 1),
@@ -262,11 +302,13 @@ def total_score(keyword: str, context: str, ent_like: Dict, allow_exact_bonus: b
         round(p31_fuzzy_ctx, 1)
     ])
 
-    ent_like["__ctx_sim"] = ctx_sim
-    ent_like["__lbl_sim"] = lbl_sim
-    ctx_tokens = set(tokenize(normalize_kw(context)))
-    label_tokens = set(tokenize(ent_like.get("label") or ""))
-    ent_like["__ctx_label_overlap"] = len(ctx_tokens & label_tokens)
+    if isinstance(ent_like, dict):
+        # legacy callers read these back from the dict
+        ent_like["__ctx_sim"] = ctx_sim
+        ent_like["__lbl_sim"] = lbl_sim
+        ctx_tokens = context.tokens
+        label_tokens = set(tokenize(c.label))
+        ent_like["__ctx_label_overlap"] = len(ctx_tokens & label_tokens)
 
     return total
 
@@ -274,8 +316,8 @@ def total_score(keyword: str, context: str, ent_like: Dict, allow_exact_bonus: b
 
 def mode_aware_total_score(
     keyword: str,
-    context: str,
-    ent_like: Dict,
+    context: ContextLike,
+    ent_like: EntLike,
     raw_keyword: str = None
 ) -> float:
     """
@@ -287,9 +329,11 @@ def mode_aware_total_score(
           + w_ctx_p31(mode)  * (ctx vs P31_text)/100
           + w_ctx_p279(mode) * (ctx vs P279_text)/100
     """
+    c = as_candidate(ent_like)
+    context = as_context_profile(context)
     kw = normalize_kw(keyword)
-    lbl = normalize_kw(ent_like.get("label") or "")
-    aliases_norm = [normalize_kw(a) for a in (ent_like.get("aliases") or [])]
+    lbl = c.label_norm
+    aliases_norm = c.aliases_norm
 
     exact_label = 1.0 if (lbl == kw or lbl == singularize_en(kw)) else 0.0
     exact_alias = 1.0 if (kw in aliases_norm) else 0.0
@@ -305,18 +349,18 @@ def mode_aware_total_score(
     W = config.WEIGHTS_MODE.get(mode, config.WEIGHTS_MODE["none"])
 
     
-    ctx_sim  = _context_similarity(context, ent_like)               # 0..100
-    sl_log1p = math.log1p(float(ent_like.get("__sitelinks", 0) or 0))
-    p31_cnt  = float(len(ent_like.get("__p31s", set()) or set()))
-    p279_cnt = float(len(ent_like.get("__p279s", set()) or set()))
-    ctx_p31  = _fuzzy_ctx(context, ent_like.get("__p31_text") or "")     # 0..100
-    ctx_p279 = _fuzzy_ctx(context, ent_like.get("__p279_text") or "")    # 0..100
+    ctx_sim  = _context_similarity(context, c)               # 0..100
+    sl_log1p = math.log1p(float(c.sitelinks or 0))
+    p31_cnt  = float(len(c.p31s))
+    p279_cnt = float(len(c.p279s))
+    ctx_p31  = _fuzzy_ctx(context, c.p31_text)     # 0..100
+    ctx_p279 = _fuzzy_ctx(context, c.p279_text)    # 0..100
      # --- DETAILED DEBUG ONLY FOR kw="Cr" ---================================================
-    _debug_log_ctx_detail(keyword, context, ent_like, ctx_sim, ctx_p31, ctx_p279)
+    _debug_log_ctx_detail(keyword, context, c, ctx_sim, ctx_p31, ctx_p279)
 
     
     
-    alias_cnt = float(ent_like.get("__alias_count", 0) or 0)
+    alias_cnt = float(c.alias_count or 0)
 
     
     alias_inverse = 1.0 / (1.0 + alias_cnt / 2.0)
@@ -340,11 +384,11 @@ def mode_aware_total_score(
 
     # =================== BONUS ===================
     kw_for_bonus = raw_keyword if raw_keyword is not None else keyword
-    case_bonus = _short_kw_case_bonus(kw_for_bonus, ent_like)
+    case_bonus = _short_kw_case_bonus(kw_for_bonus, c)
     total += case_bonus
 
     _debug_log_mode_score([
-        keyword, ent_like.get("id",""), ent_like.get("label") or "", mode,
+        keyword, c.id, c.label, mode,
         int(exact_label), int(exact_alias),
         round(ctx_sim,1), round(sl_log1p,2), round(p31_cnt,1), round(p279_cnt,1), round(ctx_p31,1), round(ctx_p279,1),round(alias_inverse, 3),
         W["ctx"], W["sl"], W["p31"], W["p279"], W["ctx_p31"], W["ctx_p279"], W.get("alias_inv", 0.0),
@@ -352,12 +396,136 @@ def mode_aware_total_score(
         round(total,2)
     ])
 
-    ent_like["__mode_score"] = total
+    c.mode_score = total
+    if isinstance(ent_like, dict):
+        ent_like["__mode_score"] = total
     return total
 
+# --------------------- Mode-aware total score (batch) ----------------
+
+_MODES = ("label", "alias", "none")
+# weight columns, in the order the terms are added in mode_aware_total_score
+_WEIGHT_KEYS = ("ctx", "sl", "p31", "p279", "ctx_p31", "ctx_p279", "alias_inv")
+
+
+def _mode_weight_matrix() -> np.ndarray:
+    """(3, 7) weights, one row per mode of _MODES (missing modes fall back to 'none')."""
+    rows = []
+    for mode in _MODES:
+        W = config.WEIGHTS_MODE.get(mode, config.WEIGHTS_MODE["none"])
+        rows.append([W[k] for k in _WEIGHT_KEYS[:-1]] + [W.get("alias_inv", 0.0)])
+    return np.array(rows, dtype=np.float64)
+
+
+def mode_aware_total_scores(
+    keyword: str,
+    context: ContextLike,
+    cands: Sequence[Candidate],
+    raw_keyword: str = None
+) -> np.ndarray:
+    """
+    mode_aware_total_score for every candidate of one keyword in a single pass.
+
+    The fuzzy P31/P279 similarities come from one cdist call each; the other
+    string features are computed per candidate. The feature matrix is then
+    weighted by mode and summed column by column in the same order as the
+    scalar function, so totals are identical.
+    Sets c.mode_score and writes the same debug rows.
+    """
+    n = len(cands)
+    if not n:
+        return np.zeros(0, dtype=np.float64)
+
+    context = as_context_profile(context)
+    kw = normalize_kw(keyword)
+    kw_sing = singularize_en(kw)
+    kw_for_bonus = raw_keyword if raw_keyword is not None else keyword
+
+    # columns: ctx, sl_log1p, p31_cnt, p279_cnt, ctx_p31, ctx_p279, alias_cnt
+    feats = np.empty((n, 7), dtype=np.float64)
+    exact_label = np.empty(n, dtype=np.float64)
+    exact_alias = np.empty(n, dtype=np.float64)
+    case_bonus = np.empty(n, dtype=np.float64)
+    ctx_p31s = fuzzy_ctx_many(context, [c.p31_text for c in cands]).tolist()
+    ctx_p279s = fuzzy_ctx_many(context, [c.p279_text for c in cands]).tolist()
+    for i, c in enumerate(cands):
+        lbl = c.label_norm
+        exact_label[i] = 1.0 if (lbl == kw or lbl == kw_sing) else 0.0
+        exact_alias[i] = 1.0 if (kw in c.aliases_norm) else 0.0
+        ctx_sim = _context_similarity(context, c)
+        ctx_p31, ctx_p279 = ctx_p31s[i], ctx_p279s[i]
+        _debug_log_ctx_detail(keyword, context, c, ctx_sim, ctx_p31, ctx_p279)
+        # math.log1p: np.log1p may differ from it in the last bit
+        feats[i] = (ctx_sim, math.log1p(float(c.sitelinks or 0)), len(c.p31s), len(c.p279s),
+                    ctx_p31, ctx_p279, float(c.alias_count or 0))
+        case_bonus[i] = _short_kw_case_bonus(kw_for_bonus, c)
+
+    # label wins over alias, as in the scalar function
+    mode_idx = np.where(exact_label > 0, 0, np.where(exact_alias > 0, 1, 2))
+    W = _mode_weight_matrix()[mode_idx]                      # (n, 7)
+
+    alias_inverse = np.round(1.0 / (1.0 + feats[:, 6] / 2.0), 3)
+    terms = feats.copy()
+    terms[:, 4] /= 100.0
+    terms[:, 5] /= 100.0
+    terms[:, 6] = alias_inverse
+
+    bonus_label = getattr(config, "EXACT_BONUS_LABEL", 4.41916603709261) * exact_label
+    bonus_alias = getattr(config, "EXACT_BONUS_ALIAS", 3.04158247354928) * exact_alias
+
+    weighted = W * terms
+    totals = bonus_label + bonus_alias
+    for j in range(weighted.shape[1]):      # left to right, never a reduction
+        totals = totals + weighted[:, j]
+    totals = totals + case_bonus
+
+    if getattr(config, "DEBUG_SCORES", False) and debug_log.sampled(keyword):
+        for i, c in enumerate(cands):
+            f, w = feats[i].tolist(), W[i].tolist()
+            _debug_log_mode_score([
+                keyword, c.id, c.label, _MODES[mode_idx[i]],
+                int(exact_label[i]), int(exact_alias[i]),
+                round(f[0],1), round(f[1],2), round(f[2],1), round(f[3],1), round(f[4],1), round(f[5],1), round(float(alias_inverse[i]), 3),
+                *w,
+                round(float(bonus_label[i]),2), round(float(bonus_alias[i]),2),
+                round(float(totals[i]),2)
+            ])
+
+    for c, total in zip(cands, totals.tolist()):
+        c.mode_score = total
+    return totals
+
 #=================================================================================
 
-def _debug_log_ctx_detail(keyword: str, context: str, ent_like: Dict,
+_DEBUG_CTX_DETAIL_HEADER = [
+    "kw", "qid", "label",
+    "ctx_sim", "ctx_p31", "ctx_p279",
+    "ctx_norm", "cand_norm",
+    "ctx_tokens", "cand_tokens",
+    "overlap_tokens",
+    "len_ctx_tokens", "len_cand_tokens", "len_overlap_tokens",
+]
+
+
+def start_debug_logs() -> List[Path]:
+    """
+    Create the enabled debug CSVs (header only) now, in the parent, before the
+    process workers start. Returns their paths: the workers get them through
+    debug_log.mark_prepared and append to these files instead of replacing them.
+    """
+    sinks = []
+    if getattr(config, "DEBUG_SCORES", False):
+        sinks.append(debug_log.get_sink(getattr(config, "DEBUG_SCORES_MODE_PATH", Path("debug_scores_mode.csv")),
+                                        _DEBUG_MODE_HEADER))
+    if getattr(config, "DEBUG_CTX_DETAIL", False):
+        sinks.append(debug_log.get_sink(getattr(config, "DEBUG_CTX_DETAIL_PATH", Path("debug_ctx_detail.csv")),
+                                        _DEBUG_CTX_DETAIL_HEADER))
+    for sink in sinks:
+        sink.prepare()
+    return [sink.path for sink in sinks]
+
+
+def _debug_log_ctx_detail(keyword: str, context: ContextLike, ent_like: EntLike,
                           ctx_sim: float, ctx_p31: float, ctx_p279: float) -> None:
 
     
@@ -372,50 +540,29 @@ def _debug_log_ctx_detail(keyword: str, context: str, ent_like: Dict,
     path = getattr(config, "DEBUG_CTX_DETAIL_PATH", Path("debug_ctx_detail.csv"))
 
     
-    if not hasattr(_debug_log_ctx_detail, "_cleared"):
-        if path.exists():
-            os.remove(path)
-        _debug_log_ctx_detail._cleared = True
+    profile = as_context_profile(context)
+    ctx_norm = profile.norm
+    ctx_tokens = set(profile.tokens)
 
-    write_header = not path.exists()
-
-    
-    ctx_norm = normalize_kw(context)
-    ctx_tokens = set(tokenize(ctx_norm))
-
-    label = ent_like.get("label") or ""
-    desc = ent_like.get("description") or ""
-    aliases_list = ent_like.get("aliases") or []
-    cand_norm = normalize_kw(f"{label} {desc} {' '.join(aliases_list)}")
-    cand_tokens = set(tokenize(cand_norm))
+    c = as_candidate(ent_like)
+    cand_norm = c.text_norm
+    cand_tokens = set(c.text_tokens)
 
     overlap_tokens = ctx_tokens & cand_tokens
 
-    with open(path, "a", encoding="utf-8", newline="") as f:
-        w = csv.writer(f)
-        if write_header:
-            w.writerow([
-                "kw", "qid", "label",
-                "ctx_sim", "ctx_p31", "ctx_p279",
-                "ctx_norm", "cand_norm",
-                "ctx_tokens", "cand_tokens",
-                "overlap_tokens",
-                "len_ctx_tokens", "len_cand_tokens", "len_overlap_tokens",
-            ])
-
-        w.writerow([
-            keyword,
-            ent_like.get("id", ""),
-            ent_like.get("label") or "",
-            round(ctx_sim, 3),
-            round(ctx_p31, 3),
-            round(ctx_p279, 3),
-            ctx_norm,
-            cand_norm,
-            " ".join(sorted(ctx_tokens)),
-            " ".join(sorted(cand_tokens)),
-            " ".join(sorted(overlap_tokens)),
-            len(ctx_tokens),
-            len(cand_tokens),
-            len(overlap_tokens),
-        ])
+    debug_log.get_sink(path, _DEBUG_CTX_DETAIL_HEADER).write([
+        keyword,
+        c.id,
+        c.label,
+        round(ctx_sim, 3),
+        round(ctx_p31, 3),
+        round(ctx_p279, 3),
+        ctx_norm,
+        cand_norm,
+        " ".join(sorted(ctx_tokens)),
+        " ".join(sorted(cand_tokens)),
+        " ".join(sorted(overlap_tokens)),
+        len(ctx_tokens),
+        len(cand_tokens),
+        len(overlap_tokens),
+    ])
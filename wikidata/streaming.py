@@ -0,0 +1,80 @@
+import json
+from pathlib import Path
+from typing import Dict, Iterator, TextIO
+
+_CHUNK = 1 << 16
+_WS = " \t\r\n"
+_NUM = "0123456789+-.eE"
+
+
+def _iter_json_array(f: TextIO, first: str) -> Iterator[Dict]:
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = first, 0, False
+
+    def _more() -> bool:
+        nonlocal buf, pos, eof
+        chunk = f.read(_CHUNK)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk   # drop what was already consumed
+        pos = 0
+        return True
+
+    # opening bracket (already known to be the first non-blank character)
+    pos = buf.index("[") + 1
+    while True:
+        while pos < len(buf) and (buf[pos] in _WS or buf[pos] == ","):
+            pos += 1
+        if pos >= len(buf):
+            if not _more():
+                raise ValueError("Unexpected end of JSON array")
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if not _more():
+                raise
+            continue
+        if not eof and (end == len(buf) or buf[end] in _NUM):
+            # a number may continue in the next chunk ("-1." decodes as -1); decode again with more data
+            if _more():
+                continue
+        pos = end
+        yield obj
+
+
+def iter_json_records(path: Path) -> Iterator[Dict]:
+    """
+    Stream records from a JSON array file or an NDJSON file (one object per line).
+    The format is detected from the first non-blank character.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        first = ""
+        while True:
+            chunk = f.read(_CHUNK)
+            if not chunk:
+                return
+            first += chunk
+            if first.strip():
+                break
+
+        if first.lstrip()[0] == "[":
+            yield from _iter_json_array(f, first)
+            return
+
+        # NDJSON: finish the current line, then go line by line
+        pending = first
+        for line in f:
+            pending += line
+            if pending.endswith("\n"):
+                for part in pending.splitlines():
+                    if part.strip():
+                        yield json.loads(part)
+                pending = ""
+        for part in pending.splitlines():
+            if part.strip():
+                yield json.loads(part)
@@ -0,0 +1,198 @@
+import asyncio
+import os
+import random
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from wikidata import async_client, config, debug_log, hierarchy, matchers, neo4j_io, wikidata_api
+
+
+class FakeTx:
+    """Explicit transaction: statements become visible in the driver only on commit()."""
+
+    def __init__(self, driver: "FakeDriver"):
+        self.driver = driver
+        self.statements: List[Tuple[str, Optional[Dict]]] = []
+        self.closed = False
+
+    def run(self, query, parameters=None):
+        self.statements.append((query, parameters))
+        return self
+
+    def consume(self):
+        return None
+
+    def commit(self):
+        self.driver.committed.extend(self.statements)
+        self.driver.commits += 1
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    def __init__(self, driver: "FakeDriver"):
+        self.driver = driver
+
+    def begin_transaction(self):
+        tx = FakeTx(self.driver)
+        self.driver.transactions.append(tx)
+        return tx
+
+    def execute_write(self, fn, *args):
+        tx = FakeTx(self.driver)
+        result = fn(tx, *args)
+        tx.commit()
+        return result
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeDriver:
+    """Records what a Neo4j server would have committed."""
+
+    def __init__(self):
+        self.committed: List[Tuple[str, Optional[Dict]]] = []
+        self.transactions: List[FakeTx] = []
+        self.commits = 0
+
+    def session(self, **kwargs):
+        return FakeSession(self)
+
+    def close(self):
+        pass
+
+    def uncommitted(self) -> int:
+        return sum(len(tx.statements) for tx in self.transactions if not tx.closed)
+
+    def committed_rows(self, query: str) -> List[Dict]:
+        return [r for q, p in self.committed if q == query for r in p["rows"]]
+
+
+@pytest.fixture(autouse=True)
+def debug_logs_in_tmp(tmp_path, monkeypatch):
+    """Scoring writes debug CSVs when DEBUG_SCORES is on: keep them out of the working tree."""
+    monkeypatch.setattr(config, "DEBUG_SCORES_MODE_PATH", tmp_path / "debug_scores_mode.csv", raising=False)
+    monkeypatch.setattr(config, "DEBUG_CTX_DETAIL_PATH", tmp_path / "debug_ctx_detail.csv", raising=False)
+    monkeypatch.setattr(debug_log, "_prepared", set())
+    yield
+    debug_log.close_sinks()
+
+
+@pytest.fixture
+def fake_driver(monkeypatch) -> FakeDriver:
+    driver = FakeDriver()
+    monkeypatch.setattr(neo4j_io.GraphDatabase, "driver", lambda *a, **kw: driver)
+    return driver
+
+
+@pytest.fixture
+def connector(fake_driver):
+    """Neo4jConnector on the fake driver, batching 20 statements per transaction."""
+    return neo4j_io.Neo4jConnector("bolt://fake", "neo4j", "test", tx_batch_size=20)
+
+
+# ----------------------------- fake Wikidata ---------------------------------
+
+def _claim(qid: str) -> Dict:
+    return {"mainsnak": {"datavalue": {"value": {"id": qid}}}}
+
+
+class FakeWikidata:
+    """
+    A small deterministic Wikidata behind AsyncWikidataClient.get: 40 classes
+    (P279 DAG), three items per keyword (exact label, longer label, other word
+    first). Records every request with the pid that sent it.
+    """
+
+    WORDS = ("carbon graphene lithium battery copper growth cell film oxide polymer "
+             "catalyst membrane sensor laser optics neuron protein enzyme soil climate").split()
+    KEYWORDS = ["graphene", "lithium battery", "CVD", "polymers", "laser optics", "soil",
+                "protein", "catalysis", "neural networks", "climate change"]
+
+    def __init__(self):
+        rnd = random.Random(7)
+        self.entities: Dict[str, Dict] = {}
+        for i in range(1, 41):
+            parents = [f"Q{rnd.randint(1, i - 1)}" for _ in range(rnd.randint(1, 2))] if i > 3 else []
+            self._add(f"Q{i}", " ".join(rnd.sample(self.WORDS, 2)), rnd, [f"Q{rnd.randint(1, 10)}"], parents)
+        n = 100
+        for kw in self.KEYWORDS:
+            for label in (kw.lower(), f"{kw.lower()} {rnd.choice(self.WORDS)}", f"{rnd.choice(self.WORDS)} {kw.split()[0].lower()}"):
+                n += 1
+                self._add(f"Q{n}", label, rnd, [f"Q{rnd.randint(1, 40)}" for _ in range(rnd.randint(0, 2))],
+                          [f"Q{rnd.randint(1, 40)}" for _ in range(rnd.randint(0, 2))],
+                          aliases=[kw] if kw.isupper() else [])
+        self.requests: List[Tuple[int, Dict]] = []
+
+    def _add(self, qid, label, rnd, p31, p279, aliases=()):
+        self.entities[qid] = {"label": label, "desc": " ".join(rnd.sample(self.WORDS, 4)),
+                              "aliases": list(aliases), "p31": p31, "p279": p279, "sitelinks": rnd.randint(0, 40)}
+
+    def records(self, n_docs: int = 12) -> List[Dict]:
+        rnd = random.Random(11)
+        records = []
+        for d in range(n_docs):
+            keywords = rnd.sample(self.KEYWORDS, 4)
+            records.append({
+                "docid": str(1000 + d),
+                "title_s": " ".join(rnd.sample(self.WORDS, 5)).capitalize(),
+                "abstract_s": " ".join(rnd.choice(self.WORDS) for _ in range(40)),
+                "keyword_s": keywords + keywords[:1] * (d % 5 == 0),   # some documents repeat a keyword
+            })
+        return records
+
+    def _entity(self, qid: str, languages: List[str]) -> Dict:
+        e = self.entities.get(qid)
+        if e is None:
+            return {"id": qid, "missing": ""}
+        return {
+            "type": "item", "id": qid,
+            "labels": {lg: {"language": lg, "value": e["label"]} for lg in languages},
+            "descriptions": {"en": {"language": "en", "value": e["desc"]}},
+            "aliases": {"en": [{"language": "en", "value": a} for a in e["aliases"]]},
+            "claims": {"P31": [_claim(q) for q in e["p31"]], "P279": [_claim(q) for q in e["p279"]]},
+            "sitelinks": {f"wiki{i}": {} for i in range(e["sitelinks"])},
+        }
+
+    def respond(self, params: Dict) -> Dict:
+        self.requests.append((os.getpid(), dict(params)))
+        if params["action"] == "wbsearchentities":
+            term = params["search"].split(":", 1)[-1].lower()
+            hits = [q for q, e in self.entities.items()
+                    if term in e["label"] or term in (a.lower() for a in e["aliases"])]
+            hits.sort(key=lambda q: (self.entities[q]["label"] != term, -self.entities[q]["sitelinks"], q))
+            return {"search": [{"id": q, "label": self.entities[q]["label"], "description": self.entities[q]["desc"]}
+                               for q in hits[:int(params["limit"])]]}
+        langs = params["languages"].split("|")
+        return {"entities": {q: self._entity(q, langs) for q in params["ids"].split("|")}}
+
+
+@pytest.fixture
+def fake_wikidata(monkeypatch) -> FakeWikidata:
+    """FakeWikidata behind the shared client; caches off, module-level memos reset."""
+    wd = FakeWikidata()
+
+    async def fake_get(self, params, retries=5):
+        await asyncio.sleep(0)
+        return wd.respond(params)
+
+    monkeypatch.setattr(async_client.AsyncWikidataClient, "get", fake_get)
+    for name, value in (("ENABLE_ENTITY_CACHE", False), ("ENABLE_SEARCH_CACHE", False),
+                        ("OFFLINE_MODE", False), ("DEBUG_CTX_DETAIL", False)):
+        monkeypatch.setattr(config, name, value, raising=False)
+    monkeypatch.setattr(wikidata_api, "_entity_cache", None)
+    monkeypatch.setattr(wikidata_api, "_search_caches", None)
+    monkeypatch.setattr(wikidata_api, "_inflight", {})
+    monkeypatch.setattr(hierarchy, "_closure", None)
+    monkeypatch.setattr(matchers, "_prepared", matchers.OrderedDict())
+    return wd
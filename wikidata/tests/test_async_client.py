@@ -0,0 +1,84 @@
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+
+from wikidata import async_client
+from wikidata.async_client import RateLimiter
+
+
+def _drive(coro):
+    """Run a coroutine whose only awaits are the fake sleeps (no event loop needed)."""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise AssertionError("coroutine suspended on something other than the fake sleep")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock; asyncio.sleep in the client advances it instead of waiting."""
+    now = [0.0]         # exact tenths: 0.1 s refills exactly one token at 10/s
+    slept = []
+
+    async def fake_sleep(sec):
+        slept.append(sec)
+        now[0] += sec
+
+    # module-local stand-ins: patching the real time/asyncio modules would freeze pytest too
+    monkeypatch.setattr(async_client, "time", SimpleNamespace(monotonic=lambda: now[0], time=time.time))
+    monkeypatch.setattr(async_client, "asyncio", SimpleNamespace(sleep=fake_sleep))
+    return now, slept
+
+
+def _limiter(**kw):
+    args = dict(rate=10.0, min_rate=1.0, max_rate=20.0, burst=3, target_latency=1.0)
+    args.update(kw)
+    return RateLimiter(**args)
+
+
+def test_burst_then_one_token_per_interval(clock):
+    now, slept = clock
+    limiter = _limiter()
+    start = now[0]
+
+    async def take(n):
+        for _ in range(n):
+            await limiter.acquire()
+
+    _drive(take(5))
+    assert slept == [pytest.approx(0.1), pytest.approx(0.1)]    # 3 from the bucket, then 10/s
+    assert now[0] - start == pytest.approx(0.2)
+    assert limiter.queued == 0
+
+
+def test_throttle_halves_the_rate_and_holds_requests(clock):
+    now, _ = clock
+    limiter = _limiter()
+    limiter.on_throttle(retry_after=30)
+    assert limiter.rate == 5.0 and limiter.throttle_events == 1
+    start = now[0]
+    _drive(limiter.acquire())
+    assert now[0] - start >= 30
+
+
+def test_rate_adapts_within_bounds(clock):
+    limiter = _limiter(rate=19.95)
+    limiter.on_success(0.2)
+    limiter.on_success(0.2)
+    assert limiter.rate == 20.0                 # additive increase, capped
+    limiter.on_success(2.0)
+    assert limiter.rate == pytest.approx(18.0)  # slow answer: x0.9
+    for _ in range(20):
+        limiter.on_error()
+    assert limiter.rate == 1.0 and limiter.errors == 20
+
+
+def test_parse_retry_after():
+    assert async_client._parse_retry_after("7", default=5.0) == 7.0
+    assert async_client._parse_retry_after(None, default=5.0) == 5.0
+    assert async_client._parse_retry_after("soon", default=5.0) == 5.0
+    in_a_minute = formatdate(time.time() + 60, usegmt=True)
+    assert 55 <= async_client._parse_retry_after(in_a_minute, default=5.0) <= 60
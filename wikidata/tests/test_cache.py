@@ -0,0 +1,56 @@
+from wikidata import cache as cache_mod
+from wikidata.cache import DiskCache
+
+
+def _cache(tmp_path, ttl_sec=3600, max_entries=100, table="entities"):
+    return DiskCache(tmp_path / "cache.sqlite", table, ttl_sec=ttl_sec, max_entries=max_entries)
+
+
+def test_values_round_trip_and_persist(tmp_path):
+    c = _cache(tmp_path)
+    c.put_many({"Q1": {"id": "Q1", "labels": {"en": "carbon"}}, "Q2": ["a", 1]})
+    assert c.get_many(["Q1", "Q2", "Q3"]) == {"Q1": {"id": "Q1", "labels": {"en": "carbon"}}, "Q2": ["a", 1]}
+    assert (c.hits, c.misses) == (2, 1)
+    c.close()
+
+    reopened = _cache(tmp_path)
+    assert reopened.get("Q2") == ["a", 1]
+    assert reopened.stats()["size"] == 2
+
+
+def test_tables_in_one_file_are_independent(tmp_path):
+    a, b = _cache(tmp_path, table="search"), _cache(tmp_path, table="labels")
+    a.put("k", 1)
+    assert b.get("k") is None
+
+
+def test_expired_entries_are_misses_and_purged(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_mod.time, "time", lambda: now[0])
+    c = _cache(tmp_path, ttl_sec=60)
+    c.put("Q1", 1)
+    now[0] += 30
+    assert c.get("Q1") == 1
+    now[0] += 61
+    assert c.get("Q1") is None
+    assert c.expired == 1
+    assert c._conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0] == 0
+
+
+def test_least_recently_used_rows_are_evicted(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_mod.time, "time", lambda: now[0])
+    c = _cache(tmp_path, max_entries=10)
+    for i in range(10):
+        now[0] += 1
+        c.put(f"Q{i}", i)
+    now[0] += 1
+    c.get("Q0")                  # Q0 becomes the most recently used
+    now[0] += 1
+    c.put("Q10", 10)             # over the limit: back down to 9 rows
+
+    kept = c.get_many([f"Q{i}" for i in range(11)])
+    assert len(kept) == 9
+    assert "Q0" in kept and "Q10" in kept
+    assert "Q1" not in kept and "Q2" not in kept
+    assert c.evicted == 2
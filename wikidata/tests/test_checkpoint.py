@@ -0,0 +1,85 @@
+import pytest
+
+from wikidata.checkpoint import ProgressJournal, graph_state_path_for, journal_path_for
+from wikidata.pipeline import CSV_FIELDNAMES, write_csv
+
+# (docid, keyword) -> number of candidate rows
+PAIRS = [(f"doc{d}", f"kw{k}", 1 + (d + k) % 3) for d in range(6) for k in range(3)]
+
+
+class Crash(Exception):
+    pass
+
+
+def _rows(skip=frozenset(), crash_after=None):
+    n = 0
+    for docid, kw, count in PAIRS:
+        if (docid, kw) in skip:
+            continue
+        for i in range(count):
+            if crash_after is not None and n == crash_after:
+                raise Crash()
+            n += 1
+            yield {**{f: "" for f in CSV_FIELDNAMES}, "docid": docid, "keyword": kw,
+                   "wikidata_qid": f"Q{i}", "title": "Thé, \"quoted\"\nline"}
+
+
+def _journal(path):
+    return ProgressJournal(path, every=4, interval_sec=3600)
+
+
+def _interrupted_then_resumed(tmp_path, crash_after, before_resume=None):
+    out = tmp_path / "out.csv"
+    journal = _journal(tmp_path / "out.progress.sqlite")
+    with pytest.raises(Crash):
+        write_csv(_rows(crash_after=crash_after), out, journal=journal)
+    journal.close()
+    if before_resume:
+        before_resume(out)
+
+    journal = _journal(tmp_path / "out.progress.sqlite")
+    done = journal.done_pairs()
+    assert len(done) < len(PAIRS)
+    write_csv(_rows(skip=done), out, journal=journal)
+    journal.mark_finished()
+    assert journal.is_finished()
+    journal.close()
+    return out.read_bytes()
+
+
+def _uninterrupted(tmp_path):
+    out = tmp_path / "ref.csv"
+    write_csv(_rows(), out)
+    return out.read_bytes()
+
+
+@pytest.mark.parametrize("crash_after", [3, 20, 33])     # 3: before the first checkpoint
+def test_resume_gives_the_same_csv_as_an_uninterrupted_run(tmp_path, crash_after):
+    assert _interrupted_then_resumed(tmp_path, crash_after) == _uninterrupted(tmp_path)
+
+
+def test_resume_rebuilds_a_missing_csv_from_the_journal(tmp_path, capsys):
+    got = _interrupted_then_resumed(tmp_path, 20, before_resume=lambda out: out.unlink())
+    assert got == _uninterrupted(tmp_path)
+    assert "rebuilding it from the journal" in capsys.readouterr().out
+
+
+def test_uncommitted_pairs_are_not_done(tmp_path):
+    journal = _journal(tmp_path / "j.sqlite")
+    journal.record("doc0", "kw0", [{"docid": "doc0"}])
+    assert not journal.should_commit()
+    assert journal.done_pairs() == set()
+    journal.commit(csv_offset=123)
+    assert journal.done_pairs() == {("doc0", "kw0")}
+    assert journal.csv_offset() == 123
+    assert list(journal.iter_rows()) == [{"docid": "doc0"}]
+    journal.reset()
+    assert journal.done_pairs() == set() and journal.csv_offset() == 0
+
+
+def test_default_paths_sit_next_to_the_output(tmp_path, monkeypatch):
+    from wikidata import config
+    monkeypatch.setattr(config, "CHECKPOINT_PATH", None, raising=False)
+    journal = journal_path_for(tmp_path / "out.csv")
+    assert journal == tmp_path / "out.progress.sqlite"
+    assert graph_state_path_for(journal) == tmp_path / "out.graph.progress.sqlite"
@@ -0,0 +1,50 @@
+import csv
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from wikidata import config, debug_log, pipeline, scoring
+
+
+def _write_rows(path, start, n):
+    config.DEBUG_FLUSH_EVERY = 1     # one append per row: a late os.remove would drop earlier rows
+    sink = debug_log.get_sink(path, scoring._DEBUG_MODE_HEADER)
+    for i in range(start, start + n):
+        sink.write([f"kw{i}"] + [""] * (len(scoring._DEBUG_MODE_HEADER) - 1))
+    return start
+
+
+def test_spawned_workers_append_to_the_parent_file(tmp_path, monkeypatch):
+    path = tmp_path / "debug_scores_mode.csv"
+    path.write_text("stale row from a previous run\n")
+    monkeypatch.setattr(config, "DEBUG_SCORES", True, raising=False)
+    monkeypatch.setattr(config, "DEBUG_CTX_DETAIL", False, raising=False)
+    monkeypatch.setattr(config, "DEBUG_SCORES_MODE_PATH", path, raising=False)
+    monkeypatch.setattr(debug_log, "_sinks", {})
+    monkeypatch.setattr(debug_log, "_prepared", set())
+
+    paths = scoring.start_debug_logs()
+    assert paths == [path]
+    with ProcessPoolExecutor(max_workers=3, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=pipeline._init_process_worker, initargs=(paths,)) as ex:
+        list(ex.map(_write_rows, [path] * 12, range(0, 120, 10), [10] * 12))
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == scoring._DEBUG_MODE_HEADER
+    assert sorted(r[0] for r in rows[1:]) == sorted(f"kw{i}" for i in range(120))
+
+
+def test_prepare_replaces_the_file_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(debug_log, "_prepared", set())
+    path = tmp_path / "d.csv"
+    path.write_text("old\n")
+    sink = debug_log.DebugCsvSink(path, ["a", "b"])
+    sink.prepare()
+    sink._append([["1", "2"]])
+    sink.prepare()
+    assert path.read_text().splitlines() == ["a,b", "1,2"]
+
+    debug_log.mark_prepared([tmp_path / "kept.csv"])
+    (tmp_path / "kept.csv").write_text("a,b\r\nx,y\r\n")
+    debug_log.DebugCsvSink(tmp_path / "kept.csv", ["a", "b"]).prepare()
+    assert (tmp_path / "kept.csv").read_text().splitlines() == ["a,b", "x,y"]
@@ -0,0 +1,57 @@
+import csv
+
+from wikidata.checkpoint import graph_state_path_for
+from wikidata.graph_export import CsvGraphExporter, REL_FILES
+
+
+def _rows(out_dir, name):
+    with open(out_dir / name, encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))[1:]
+
+
+def test_export_dedupes_and_adds_edge_endpoints(tmp_path):
+    exp = CsvGraphExporter(tmp_path)
+    exp.add_document_map("d1", "graphene", "Q1")
+    exp.add_document_map("d1", "graphene", "Q1")
+    exp.add_item("Q1", "graphene")
+    exp.add_instance_of("Q1", "Q11173", "chemical compound")
+    exp.add_subclass_of("Q1", "Q2")
+    exp.close()
+    assert _rows(tmp_path, "maps_to.csv") == [["graphene", "Q1"]]
+    assert _rows(tmp_path, "items.csv") == [["Q1", "graphene"], ["Q2", ""]]
+    assert _rows(tmp_path, "classes.csv") == [["Q11173", "chemical compound"]]
+    assert (tmp_path / "load_graph.cypher").exists()
+
+
+def test_resumed_export_contains_the_graph_of_skipped_pairs(tmp_path):
+    state = graph_state_path_for(tmp_path / "out.progress.sqlite")
+    assert state.name == "out.graph.progress.sqlite"
+
+    # first run: checkpoint (flush) after d1, then crash before close()
+    first = CsvGraphExporter(tmp_path / "export", state)
+    first.add_document_map("d1", "graphene", "Q1")
+    first.add_item("Q1", "graphene")
+    first.flush()
+
+    # resumed run: d1 is skipped by the journal, only d2 is mapped again
+    second = CsvGraphExporter(tmp_path / "export", state)
+    assert second.load() == 2
+    second.add_document_map("d2", "graphene", "Q1")
+    second.add_item("Q1", "")                    # an empty label keeps the known one
+    second.close()
+
+    out = tmp_path / "export"
+    assert _rows(out, "documents.csv") == [["d1"], ["d2"]]
+    assert _rows(out, "contains_keyword.csv") == [["d1", "graphene"], ["d2", "graphene"]]
+    assert _rows(out, "items.csv") == [["Q1", "graphene"]]
+    assert set(second.stats()) >= {t.lower() for t in REL_FILES}
+
+
+def test_reset_forgets_the_saved_graph(tmp_path):
+    state = tmp_path / "graph.sqlite"
+    exp = CsvGraphExporter(tmp_path, state)
+    exp.add_document_map("d1", "graphene", "Q1")
+    exp.flush()
+    fresh = CsvGraphExporter(tmp_path, state)
+    fresh.reset()
+    assert fresh.load() == 0
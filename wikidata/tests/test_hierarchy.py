@@ -0,0 +1,62 @@
+import asyncio
+
+from wikidata import config, hierarchy
+from wikidata.cache import DiskCache
+
+# child -> P279 parents
+GRAPH = {"Q1": ["Q2", "Q3"], "Q2": ["Q4"], "Q3": ["Q4"], "Q4": ["Q5"], "Q5": []}
+
+
+def _entity(qid):
+    return {"id": qid, "labels": {"en": {"value": f"class {qid}"}}, "claims": {config.P_SUBCLASS_OF: [
+        {"mainsnak": {"datavalue": {"value": {"id": p}}}} for p in GRAPH[qid]]}}
+
+
+def _fake_fetch(monkeypatch):
+    calls = []
+
+    async def fake_awbgetentities(ids, languages=None):
+        calls.append(list(ids))
+        return {q: _entity(q) for q in ids}
+
+    monkeypatch.setattr(hierarchy, "awbgetentities", fake_awbgetentities)
+    return calls
+
+
+def test_levels_are_breadth_first_and_fetched_once_per_level(monkeypatch):
+    calls = _fake_fetch(monkeypatch)
+    store = hierarchy.P279Closure()
+    levels = asyncio.run(store.alevels(["Q1"], max_depth=10))
+    assert levels == [["Q1"], ["Q2", "Q3"], ["Q4"], ["Q5"]]
+    assert calls == [["Q1"], ["Q2", "Q3"], ["Q4"], ["Q5"]]
+
+    # a second walk over known classes is served from memory
+    assert asyncio.run(store.aparent_map(["Q2"], max_depth=2)) == {"Q2": ["Q4"], "Q4": ["Q5"]}
+    assert len(calls) == 4
+
+
+def test_max_nodes_stops_adding_levels(monkeypatch):
+    _fake_fetch(monkeypatch)
+    levels = asyncio.run(hierarchy.P279Closure().alevels(["Q1"], max_depth=10, max_nodes=3))
+    assert levels == [["Q1"], ["Q2", "Q3"]]
+
+
+def test_parent_lists_are_reused_from_disk(monkeypatch, tmp_path):
+    calls = _fake_fetch(monkeypatch)
+    cache = DiskCache(tmp_path / "cache.sqlite", "p279_classes", ttl_sec=3600, max_entries=100)
+    asyncio.run(hierarchy.P279Closure(cache).alevels(["Q1"], max_depth=10))
+    n = len(calls)
+
+    fresh = hierarchy.P279Closure(cache)       # e.g. the next run
+    assert asyncio.run(fresh.alevels(["Q1"], max_depth=10))[-1] == ["Q5"]
+    assert len(calls) == n
+    assert fresh.stats()["fetched"] == 0
+    assert fresh.texts_of(["Q1", "Q5"]) == ["class Q1", "class Q5"]
+
+
+def test_class_texts_come_from_the_walk(monkeypatch):
+    calls = _fake_fetch(monkeypatch)
+    store = hierarchy.P279Closure()
+    visited = [q for level in asyncio.run(store.alevels(["Q2"], max_depth=10)) for q in level]
+    assert store.texts_of(visited) == ["class Q2", "class Q4", "class Q5"]
+    assert calls == [["Q2"], ["Q4"], ["Q5"]]
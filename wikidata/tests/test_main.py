@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from wikidata import config, main
+from wikidata.checkpoint import ProgressJournal
+
+
+class _FailingExporter:
+    """CsvGraphExporter stand-in whose close() fails, like a writer thread that died."""
+
+    out_dir = state_path = None
+
+    def flush(self):
+        pass
+
+    def reset(self):
+        pass
+
+    def close(self):
+        raise OSError("graph writer failed")
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    (tmp_path / "in.json").write_text(json.dumps([{"docid": "1", "keyword_s": ["graphene"]}]))
+    for name, value in (("INPUT_JSON", tmp_path / "in.json"), ("OUTPUT_CSV", tmp_path / "out.csv"),
+                        ("ENABLE_NEO4J_INGEST", True), ("GRAPH_OUTPUT", "csv"),
+                        ("ENABLE_CHECKPOINT", True), ("CHECKPOINT_PATH", tmp_path / "out.progress.sqlite")):
+        monkeypatch.setattr(config, name, value, raising=False)
+    closed = []
+    journals = []
+
+    class _Journal(ProgressJournal):
+        def __init__(self, *a, **kw):
+            super().__init__(*a, **kw)
+            journals.append(self)
+
+        def close(self):
+            closed.append("journal")
+            super().close()
+
+    monkeypatch.setattr(main, "CsvGraphExporter", _FailingExporter)
+    monkeypatch.setattr(main, "ProgressJournal", _Journal)
+    monkeypatch.setattr(main, "map_keywords", lambda *a, **kw: iter(()))
+    monkeypatch.setattr(main, "close_debug_sinks", lambda: closed.append("debug_sinks"))
+    monkeypatch.setattr(main, "close_client", lambda: closed.append("client"))
+    return closed, journals
+
+
+def test_close_error_does_not_hide_the_run_error(run, monkeypatch):
+    closed, _ = run
+
+    def failing_write_csv(*a, **kw):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(main, "write_csv", failing_write_csv)
+    with pytest.raises(RuntimeError, match="disk full"):
+        main.main()
+    assert sorted(closed) == ["client", "debug_sinks", "journal"]
+
+
+def test_close_error_fails_an_otherwise_good_run(run):
+    closed, journals = run
+    with pytest.raises(OSError, match="graph writer failed"):
+        main.main()
+    assert sorted(closed) == ["client", "debug_sinks", "journal"]
+    # the graph was not written: the next run must not treat this one as finished
+    assert not ProgressJournal(journals[0].path).is_finished()
@@ -0,0 +1,141 @@
+import pytest
+from neo4j.exceptions import TransientError
+
+from wikidata import neo4j_io
+from wikidata.checkpoint import ProgressJournal
+from wikidata.pipeline import CSV_FIELDNAMES, write_csv
+
+
+def test_connector_commits_every_tx_batch_size_statements(connector, fake_driver):
+    for i in range(45):
+        connector.run_query("RETURN $i", {"i": i})
+    assert fake_driver.commits == 2
+    assert len(fake_driver.committed) == 40
+    assert connector.stats()["pending"] == 5
+
+
+def test_connector_flush_commits_the_open_transaction(connector, fake_driver):
+    connector.run_query("RETURN 1")
+    assert fake_driver.committed == []
+    connector.flush()
+    assert fake_driver.committed == [("RETURN 1", None)]
+    assert fake_driver.uncommitted() == 0
+    connector.flush()                       # nothing pending: no empty commit
+    assert fake_driver.commits == 1
+
+
+def test_connector_close_commits(connector, fake_driver):
+    connector.run_query("RETURN 1")
+    connector.close()
+    assert len(fake_driver.committed) == 1
+
+
+def test_connector_replays_transaction_after_transient_error(connector, fake_driver, monkeypatch):
+    monkeypatch.setattr(neo4j_io, "backoff_sleep", lambda attempt: None)
+    connector.run_query("RETURN 1")
+    fail = {"left": 1}
+    real_run = fake_driver.transactions[0].run.__func__
+
+    def flaky_run(tx, query, parameters=None):
+        if query == "RETURN 2" and fail["left"]:
+            fail["left"] -= 1
+            raise TransientError("deadlock")
+        return real_run(tx, query, parameters)
+
+    monkeypatch.setattr(type(fake_driver.transactions[0]), "run", flaky_run)
+    connector.run_query("RETURN 2")
+    connector.commit()
+    assert [q for q, _ in fake_driver.committed] == ["RETURN 1", "RETURN 2"]
+    assert connector.stats()["retries"] == 1
+
+
+# ----------------------------- GraphWriter -----------------------------------
+
+def _writer(kind, connector):
+    cls = neo4j_io.GraphWriter if kind == "sync" else neo4j_io.BackgroundGraphWriter
+    return cls(connector, batch_size=1000, flush_interval_sec=60)
+
+
+@pytest.mark.parametrize("kind", ["sync", "background"])
+def test_graph_writer_flush_commits(kind, connector, fake_driver):
+    writer = _writer(kind, connector)
+    writer.add_document_map("d1", "graphene", "Q169917")
+    writer.flush()
+    assert fake_driver.uncommitted() == 0
+    assert fake_driver.committed_rows(neo4j_io.MERGE_DOCUMENT_MAP) == [
+        {"docid": "d1", "keyword": "graphene", "qid": "Q169917"}]
+    writer.close()
+
+
+@pytest.mark.parametrize("kind", ["sync", "background"])
+def test_journal_never_ahead_of_neo4j_commit(kind, connector, fake_driver, tmp_path):
+    """Every pair a checkpoint records as done has its graph writes committed."""
+    writer = _writer(kind, connector)
+    journal = ProgressJournal(tmp_path / "out.progress.sqlite", every=3, interval_sec=3600)
+    checked = []
+
+    real_commit = journal.commit
+
+    def checked_commit(csv_offset=None):
+        pending = {(d, k) for d, k, _ in journal._buffer}
+        durable = {(r["docid"], r["keyword"]) for r in fake_driver.committed_rows(neo4j_io.MERGE_DOCUMENT_MAP)}
+        assert pending <= durable, pending - durable
+        checked.append(len(pending))
+        real_commit(csv_offset)
+
+    journal.commit = checked_commit
+
+    def rows():
+        for i in range(10):
+            docid, kw = f"d{i // 2}", f"kw{i}"
+            writer.add_document_map(docid, kw, f"Q{i}")
+            yield {**{f: "" for f in CSV_FIELDNAMES}, "docid": docid, "keyword": kw}
+
+    try:
+        n = write_csv(rows(), tmp_path / "out.csv", journal=journal, before_checkpoint=writer.flush)
+    finally:
+        writer.close()
+        journal.close()
+    assert n == 10
+    assert sum(checked) == 10
+    assert len(checked) > 1
+
+
+# ----------------------------- UNWIND batches --------------------------------
+
+def test_graph_writer_dedupes_and_writes_in_dependency_order(connector, fake_driver):
+    writer = neo4j_io.GraphWriter(connector, batch_size=1000, flush_interval_sec=60)
+    neo4j_io.ingest_p279_hierarchy(writer, "Q1", "graphene", [["Q2", "Q3"], ["Q2", "Q3"], ["Q1", "Q4"]])
+    neo4j_io.ingest_p31_types(writer, "Q1", ["Q11173", "Q11173"], {"Q11173": "chemical compound"})
+    neo4j_io.ingest_document_map(writer, "d1", "graphene", "Q1")
+    neo4j_io.ingest_document_map(writer, "d1", "graphene", "Q1")
+    writer.add_item("Q1", "Graphene")                # last label wins, as with SET
+    writer.close()
+
+    assert [q for q, _ in fake_driver.committed] == [
+        neo4j_io.MERGE_ITEMS, neo4j_io.MERGE_SUBCLASS_OF, neo4j_io.MERGE_INSTANCE_OF, neo4j_io.MERGE_DOCUMENT_MAP]
+    assert fake_driver.committed_rows(neo4j_io.MERGE_ITEMS) == [{"qid": "Q1", "label": "Graphene"}]
+    assert fake_driver.committed_rows(neo4j_io.MERGE_SUBCLASS_OF) == [
+        {"child": "Q1", "parent": "Q2"}, {"child": "Q2", "parent": "Q3"}, {"child": "Q1", "parent": "Q4"}]
+    assert fake_driver.committed_rows(neo4j_io.MERGE_INSTANCE_OF) == [
+        {"item": "Q1", "type": "Q11173", "label": "chemical compound"}]
+    assert len(fake_driver.committed_rows(neo4j_io.MERGE_DOCUMENT_MAP)) == 1
+
+
+def test_graph_writer_splits_batches_and_flushes_when_full(connector, fake_driver):
+    writer = neo4j_io.GraphWriter(connector, batch_size=3, flush_interval_sec=60)
+    for i in range(7):
+        writer.add_document_map("d1", f"kw{i}", f"Q{i}")
+    assert writer.stats()["flushes"] == 2 and writer.pending() == 1
+    writer.flush()
+    sizes = [len(p["rows"]) for q, p in fake_driver.committed]
+    assert sizes == [3, 3, 1]
+    assert writer.stats()["rows_written"] == 7
+
+
+def test_ingest_helpers_on_a_bare_connector_write_one_statement_per_call(connector, fake_driver):
+    neo4j_io.ingest_p31_types(connector, "Q1", ["Q5", "Q6"], {"Q5": "human"})
+    connector.flush()
+    assert [q for q, _ in fake_driver.committed] == [neo4j_io.MERGE_INSTANCE_OF]
+    assert fake_driver.committed_rows(neo4j_io.MERGE_INSTANCE_OF) == [
+        {"item": "Q1", "type": "Q5", "label": "human"}, {"item": "Q1", "type": "Q6", "label": "Q6"}]
@@ -0,0 +1,86 @@
+import pytest
+from neo4j.exceptions import ClientError
+
+from wikidata import neo4j_schema
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def data(self):
+        return self.rows
+
+    def consume(self):
+        return None
+
+
+class _SchemaDriver:
+    """Answers SHOW CONSTRAINTS / SHOW INDEXES from the constraints created so far."""
+
+    def __init__(self, state="ONLINE"):
+        self.state = state
+        self.created = []
+        self.queries = []
+
+    def session(self, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def run(self, query, parameters=None):
+        self.queries.append(query)
+        if query.startswith("CREATE CONSTRAINT"):
+            self.created.append(query)
+        keys = [(k[1], k[2]) for k, q in zip(neo4j_schema.UNIQUE_KEYS, neo4j_schema.constraint_statements())
+                if q in self.created]
+        if query == "SHOW CONSTRAINTS":
+            return _Result([{"type": "UNIQUENESS", "labelsOrTypes": [l], "properties": [p]} for l, p in keys])
+        if query == "SHOW INDEXES":
+            return _Result([{"labelsOrTypes": [l], "properties": [p], "state": self.state} for l, p in keys])
+        return _Result([])
+
+
+def test_statements_follow_unique_keys():
+    statements = neo4j_schema.constraint_statements()
+    assert len(statements) == len(neo4j_schema.UNIQUE_KEYS)
+    assert statements[0] == "CREATE CONSTRAINT item_qid_unique IF NOT EXISTS FOR (n:Item) REQUIRE n.qid IS UNIQUE"
+
+
+def test_schema_status_reports_missing_keys():
+    status = neo4j_schema.schema_status(_SchemaDriver())
+    assert set(status.values()) == {"MISSING"}
+
+
+def test_ensure_schema_creates_and_verifies():
+    driver = _SchemaDriver()
+    neo4j_schema.ensure_schema(driver, timeout_sec=1)
+    assert len(driver.created) == len(neo4j_schema.UNIQUE_KEYS)
+    assert set(neo4j_schema.schema_status(driver).values()) == {"ONLINE"}
+
+
+def test_ensure_schema_raises_when_an_index_is_not_online():
+    with pytest.raises(RuntimeError, match="POPULATING"):
+        neo4j_schema.ensure_schema(_SchemaDriver(state="POPULATING"), timeout_sec=1)
+
+
+def test_ensure_schema_without_wait_accepts_populating_indexes():
+    driver = _SchemaDriver(state="POPULATING")
+    neo4j_schema.ensure_schema(driver, wait=False)
+    assert len(driver.created) == len(neo4j_schema.UNIQUE_KEYS)
+    assert not any("awaitIndexes" in q for q in driver.queries)
+
+
+def test_ensure_schema_without_wait_raises_on_missing_constraint():
+    class _Refusing(_SchemaDriver):
+        def run(self, query, parameters=None):
+            if query.startswith("CREATE CONSTRAINT document_id_unique"):
+                raise ClientError("duplicate Document.id values")
+            return super().run(query, parameters)
+
+    with pytest.raises(RuntimeError, match="Document"):
+        neo4j_schema.ensure_schema(_Refusing(), wait=False)
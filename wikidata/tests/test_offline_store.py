@@ -0,0 +1,71 @@
+import gzip
+import json
+
+import pytest
+
+from wikidata.offline_store import OfflineStore, build_store
+
+
+def _claim(ids):
+    return [{"mainsnak": {"datavalue": {"value": {"id": q}}}} for q in ids]
+
+
+def _item(qid, en, fr=None, aliases=(), p31=(), p279=(), sitelinks=0):
+    labels = {"en": {"language": "en", "value": en}, "de": {"language": "de", "value": en + " (de)"}}
+    if fr:
+        labels["fr"] = {"language": "fr", "value": fr}
+    return {
+        "type": "item", "id": qid, "labels": labels,
+        "descriptions": {"en": {"language": "en", "value": f"about {en}"}},
+        "aliases": {"en": [{"language": "en", "value": a} for a in aliases]},
+        "claims": {"P31": _claim(p31), "P279": _claim(p279), "P18": _claim(["Q999"])},
+        "sitelinks": {f"wiki{i}": {} for i in range(sitelinks)},
+    }
+
+
+DUMP = [
+    _item("Q1", "graphene", fr="graphène", aliases=["graphite monolayer"], p31=["Q2"], p279=["Q3"], sitelinks=50),
+    _item("Q2", "chemical substance", p279=["Q4"], sitelinks=10),
+    _item("Q3", "carbon allotrope", sitelinks=5),
+    _item("Q4", "matter", sitelinks=90),
+    _item("Q5", "graphene oxide", p31=["Q2"], sitelinks=20),
+    _item("Q6", "opera", sitelinks=99),
+]
+
+
+@pytest.fixture
+def dump(tmp_path):
+    path = tmp_path / "dump.json.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("[\n" + ",\n".join(json.dumps(e, ensure_ascii=False) for e in DUMP) + "\n]\n")
+    return path
+
+
+def test_seeds_keep_only_what_is_reachable(dump, tmp_path, capsys):
+    n = build_store(dump, tmp_path / "store.sqlite", seeds=["graphene\n", "Q5"], languages=["en", "fr"])
+    assert n == 5                                    # Q6 is not reachable
+    store = OfflineStore(tmp_path / "store.sqlite")
+    ents = store.get_entities(["Q1", "Q4", "Q6"], ["en"])
+    assert ents["Q6"] == {"id": "Q6", "missing": ""}
+    assert ents["Q1"]["labels"] == {"en": {"language": "en", "value": "graphene"}}
+    assert ents["Q1"]["sitelinks_count"] == 50
+    assert set(ents["Q1"]["claims"]) == {"P31", "P279"}      # slim: no P18
+    assert "Q4" in ents and "missing" not in ents["Q4"]
+    store.close()
+
+
+def test_search_ranks_exact_then_language_then_sitelinks(dump, tmp_path):
+    build_store(dump, tmp_path / "store.sqlite", languages=["en", "fr"])
+    store = OfflineStore(tmp_path / "store.sqlite")
+    assert [h["id"] for h in store.search("Graphene", "en")] == ["Q1", "Q5"]
+    assert [h["id"] for h in store.search("graph", "en")] == ["Q1", "Q5"]       # prefix, then sitelinks
+    assert store.search("graphène", "fr")[0]["label"] == "graphène"
+    assert [h["id"] for h in store.search("graphite monolayer", "en")] == ["Q1"]
+    assert store.search("graphite monolayer", "en", label_only=True) == []
+    assert store.search("", "en") == []
+    store.close()
+
+
+def test_missing_store_has_a_helpful_error(tmp_path):
+    with pytest.raises(FileNotFoundError, match="python -m wikidata.offline_store"):
+        OfflineStore(tmp_path / "nope.sqlite")
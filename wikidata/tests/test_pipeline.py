@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from wikidata import hierarchy, matchers, pipeline
+
+
+def _run(fake_wikidata, mode):
+    # every mode starts cold, so each one does its own requests
+    matchers._prepared.clear()
+    hierarchy._closure = None
+    records = fake_wikidata.records()
+    return list(pipeline.map_keywords(records, None, mode=mode, workers=3))
+
+
+@pytest.mark.parametrize("mode", ["threads", "processes"])
+def test_parallel_modes_give_the_serial_rows(fake_wikidata, mode):
+    serial = _run(fake_wikidata, "serial")
+    assert len(serial) > 40
+    assert sum(1 for r in serial if r["wikidata_qid"]) > 20
+    assert _run(fake_wikidata, mode) == serial
+
+
+def test_process_workers_make_no_wikidata_request(fake_wikidata):
+    _run(fake_wikidata, "processes")
+    assert fake_wikidata.requests
+    assert {pid for pid, _ in fake_wikidata.requests} == {os.getpid()}
+
+
+def test_a_keyword_repeated_in_a_document_is_matched_once(fake_wikidata):
+    records = fake_wikidata.records()
+    rows = _run(fake_wikidata, "threads")
+    groups = [(r["docid"], r["keyword"]) for i, r in enumerate(rows)
+              if i == 0 or (rows[i - 1]["docid"], rows[i - 1]["keyword"]) != (r["docid"], r["keyword"])]
+    expected = [(rec["docid"], kw) for rec in records for kw in dict.fromkeys(rec["keyword_s"])]
+    assert any(len(rec["keyword_s"]) != len(set(rec["keyword_s"])) for rec in records)
+    assert groups == expected
+
+
+def _cdist_workers():
+    from wikidata import config
+    return config.FUZZY_CDIST_WORKERS
+
+
+def test_process_workers_run_cdist_on_one_thread():
+    scorer = pipeline._make_scorer(1)
+    try:
+        assert scorer.submit(_cdist_workers).result() == 1
+    finally:
+        scorer.shutdown()
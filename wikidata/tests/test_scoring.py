@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from wikidata import scoring
+
+CONTEXT = ("Graphene-based electrodes for lithium-ion batteries. We study CVD growth of "
+           "graphene on copper and its electrochemical performance.")
+TEXTS = [
+    "chemical compound allotrope of carbon",
+    "",
+    "disease of the heart or blood vessels cardiovascular disease CVD",
+    "the of and",                          # only stopwords / short tokens
+    "battery electrochemical cell lithium",
+]
+
+
+def test_fuzzy_ctx_many_equals_scalar():
+    batch = scoring.fuzzy_ctx_many(CONTEXT, TEXTS)
+    assert batch.tolist() == [scoring._fuzzy_ctx(CONTEXT, t) for t in TEXTS]
+
+
+def test_fuzzy_ctx_many_accepts_a_profile_and_empty_inputs():
+    profile = scoring.context_profile(CONTEXT)
+    assert scoring.fuzzy_ctx_many(profile, TEXTS).tolist() == scoring.fuzzy_ctx_many(CONTEXT, TEXTS).tolist()
+    assert scoring.fuzzy_ctx_many("", TEXTS).tolist() == [0.0] * len(TEXTS)
+    assert scoring.fuzzy_ctx_many(CONTEXT, []).shape == (0,)
+
+
+def _candidates():
+    from wikidata.entities import Candidate
+    fixed = [
+        Candidate("Q1", label="graphene", description="allotrope of carbon", aliases=["graphite monolayer"],
+                  p31_text="chemical substance allotrope", p279_text="carbon material",
+                  p31s={"Q11173"}, p279s={"Q2", "Q3"}, sitelinks=80, alias_count=1, has_p279=True),
+        Candidate("Q2", label="Chemical vapor deposition", aliases=["CVD", "CVD process"],
+                  p31_text="deposition process", sitelinks=25, alias_count=2),
+        Candidate("Q3", label="cardiovascular disease", aliases=["CVD"], p31_text="disease class",
+                  p279_text="disease", p31s={"Q112193867"}, sitelinks=120, alias_count=30),
+        Candidate("Q4", label="battery", description="electrochemical cell", p31_text="", p279_text=""),
+        Candidate("Q5", label="Cr"),                                       # no text at all
+    ]
+    words = ["lithium", "ion", "battery", "graphene", "copper", "growth", "cell", "carbon", "disease", "film"]
+    rng = random.Random(0)
+    generated = [
+        Candidate(f"Q{100 + i}", label=" ".join(rng.sample(words, rng.randint(1, 3))),
+                  description=" ".join(rng.sample(words, 3)),
+                  aliases=[rng.choice(words) for _ in range(rng.randint(0, 4))],
+                  p31_text=" ".join(rng.sample(words, rng.randint(0, 4))),
+                  p279_text=" ".join(rng.sample(words, rng.randint(0, 4))),
+                  p31s={f"Q{j}" for j in range(rng.randint(0, 3))},
+                  p279s={f"Q{j}" for j in range(rng.randint(0, 3))},
+                  sitelinks=rng.randint(0, 300), alias_count=rng.randint(0, 50))
+        for i in range(40)
+    ]
+    return fixed + generated
+
+
+@pytest.mark.parametrize("keyword", ["graphene", "CVD", "batteries", "Cr", ""])
+def test_label_similarity_many_equals_scalar(keyword):
+    cands = _candidates()
+    batch = scoring.label_similarity_many(keyword, cands)
+    assert batch.tolist() == [scoring.label_similarity(keyword, c) for c in cands]
+    assert scoring.label_similarity_many(keyword, []).shape == (0,)
+
+
+@pytest.mark.parametrize("keyword, raw", [("graphene", None), ("CVD", "CVD"), ("batteries", None),
+                                          ("Cr", "Cr"), ("lithium ion", None)])
+def test_vectorized_mode_scores_equal_the_scalar_ones(keyword, raw):
+    cands = _candidates()
+    expected = [scoring.mode_aware_total_score(keyword, CONTEXT, c.copy(), raw_keyword=raw) for c in cands]
+    totals = scoring.mode_aware_total_scores(keyword, scoring.context_profile(CONTEXT), cands, raw_keyword=raw)
+    assert totals.tolist() == expected                      # bit for bit, not approx
+    assert [c.mode_score for c in cands] == expected
+    assert scoring.mode_aware_total_scores(keyword, CONTEXT, []).shape == (0,)
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from wikidata import streaming
+
+RECORDS = [
+    {"docid": "1", "title_s": "Graphene, [carbon] \"allotrope\"", "keyword_s": ["CVD", "Li-ion"]},
+    {"docid": "2", "title_s": "Thé à l'école \\ ünïcode 🧪", "keyword_s": []},
+    12345678901234567890,
+    -1.5e-3,
+    "a string ] with , separators",
+    None,
+    True,
+    [1, [2, [3]], {"k": {"n": []}}],
+    {},
+]
+
+
+@pytest.fixture(params=[1, 2, 3, 7, 64, 1 << 16])
+def chunk(request, monkeypatch):
+    """Small read sizes put every token across a chunk boundary at some point."""
+    monkeypatch.setattr(streaming, "_CHUNK", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("text", [
+    json.dumps(RECORDS),
+    json.dumps(RECORDS, indent=2, ensure_ascii=False),
+    "\n\n   " + json.dumps(RECORDS, separators=(",", ":")) + "\n",
+])
+def test_json_array_matches_json_load(tmp_path, chunk, text):
+    path = tmp_path / "records.json"
+    path.write_text(text, encoding="utf-8")
+    assert list(streaming.iter_json_records(path)) == RECORDS
+
+
+def test_ndjson_matches_line_by_line(tmp_path, chunk):
+    path = tmp_path / "records.ndjson"
+    path.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in RECORDS if isinstance(r, dict))
+                    + "\n\n", encoding="utf-8")
+    assert list(streaming.iter_json_records(path)) == [r for r in RECORDS if isinstance(r, dict)]
+
+
+@pytest.mark.parametrize("text, expected", [("[]", []), ("  [ ]  ", []), ("", []), ("  \n", [])])
+def test_empty_inputs(tmp_path, chunk, text, expected):
+    path = tmp_path / "empty.json"
+    path.write_text(text, encoding="utf-8")
+    assert list(streaming.iter_json_records(path)) == expected
+
+
+def test_truncated_array_raises(tmp_path, chunk):
+    path = tmp_path / "cut.json"
+    path.write_text(json.dumps(RECORDS)[:-20], encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(streaming.iter_json_records(path))
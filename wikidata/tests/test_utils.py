@@ -0,0 +1,30 @@
+from wikidata import bench_text, utils
+
+WORDS = ["Graphene", "DNA", "batteries", "Classes", "glass", "CVD-growth", "Li+ ions", "", "x" * 300]
+
+
+def test_text_helpers_match_the_previous_implementation():
+    for w in WORDS:
+        assert utils.normalize_kw(w) == bench_text._legacy_normalize_kw(w)
+        assert utils.tokenize(w) == bench_text._legacy_tokenize(w)
+        assert utils.singularize_en(w) == bench_text._legacy_singularize_en(w)
+        assert utils._singularize_uncached(w) == bench_text._legacy_singularize_en(w)
+
+
+def test_uncached_singularize_touches_no_cache():
+    utils.clear_text_caches()
+    for w in WORDS:
+        utils._singularize_uncached(w)
+    assert all(s["hits"] == s["misses"] == 0 for s in utils.text_cache_stats().values())
+
+
+def test_tokenize_returns_a_fresh_list():
+    first = utils.tokenize("lithium ion battery")
+    first.append("mutated")
+    assert utils.tokenize("lithium ion battery") == ["lithium", "ion", "battery"]
+
+
+def test_long_strings_bypass_the_cache():
+    utils.clear_text_caches()
+    utils.normalize_kw("y" * (utils.TEXT_CACHE_MAX_LEN + 1))
+    assert utils.text_cache_stats()["normalize_kw"]["misses"] == 0
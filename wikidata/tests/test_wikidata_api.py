@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from wikidata import config, wikidata_api
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """wbgetentities answered in memory, with a delay so concurrent callers overlap."""
+    monkeypatch.setattr(config, "OFFLINE_MODE", False, raising=False)
+    monkeypatch.setattr(config, "ENABLE_ENTITY_CACHE", False, raising=False)
+    monkeypatch.setattr(config, "SLIM_ENTITIES", False, raising=False)
+    monkeypatch.setattr(wikidata_api, "_inflight", {})
+    monkeypatch.setattr(wikidata_api, "_coalesce_stats", {"requested_ids": 0, "fetched_ids": 0, "coalesced_ids": 0})
+    calls = []
+
+    async def fake_aget(params):
+        ids = params["ids"].split("|")
+        calls.append(ids)
+        await asyncio.sleep(0.01)
+        if "Qbad" in ids:
+            raise RuntimeError("API down")
+        return {"entities": {q: {"id": q} for q in ids}}
+
+    monkeypatch.setattr(wikidata_api, "_aget", fake_aget)
+    return calls
+
+
+def test_concurrent_callers_share_in_flight_fetches(fake_api):
+    async def both():
+        return await asyncio.gather(wikidata_api.awbgetentities(["Q1", "Q2"]),
+                                    wikidata_api.awbgetentities(["Q2", "Q3", "Q1"]))
+
+    first, second = asyncio.run(both())
+    assert list(first) == ["Q1", "Q2"]
+    assert list(second) == ["Q2", "Q3", "Q1"]
+    assert second["Q2"] == {"id": "Q2"}
+    assert sorted(q for ids in fake_api for q in ids) == ["Q1", "Q2", "Q3"]
+    assert wikidata_api.coalescing_stats() == {"requested_ids": 5, "fetched_ids": 3, "coalesced_ids": 2}
+    assert wikidata_api._inflight == {}
+
+
+def test_waiters_see_the_owner_failure(fake_api):
+    async def both():
+        return await asyncio.gather(wikidata_api.awbgetentities(["Qbad"]),
+                                    wikidata_api.awbgetentities(["Qbad"]),
+                                    return_exceptions=True)
+
+    results = asyncio.run(both())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert fake_api == [["Qbad"]]
+    assert wikidata_api._inflight == {}
+
+
+def test_search_results_and_empty_answers_are_cached(fake_api, monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "ENABLE_SEARCH_CACHE", True, raising=False)
+    monkeypatch.setattr(config, "CACHE_DB_PATH", tmp_path / "cache.sqlite", raising=False)
+    monkeypatch.setattr(wikidata_api, "_search_caches", None)
+    searches = []
+
+    async def fake_aget(params):
+        searches.append(params["search"])
+        return {"search": [{"id": "Q169917"}] if "graphene" in params["search"] else []}
+
+    monkeypatch.setattr(wikidata_api, "_aget", fake_aget)
+    for _ in range(2):
+        assert asyncio.run(wikidata_api.awbsearchentities("Graphene")) == [{"id": "Q169917"}]
+        assert asyncio.run(wikidata_api.awbsearch_label_only("graphene")) == [{"id": "Q169917"}]
+        assert asyncio.run(wikidata_api.awbsearchentities("no such thing")) == []
+    assert searches == ["graphene", "label:graphene", "no such thing"]
+    assert wikidata_api.search_cache_stats() == {"hits": 3, "misses": 3, "negative_hits": 1, "hit_rate": 0.5}
+
+
+def test_slim_entity_keeps_what_the_matcher_reads():
+    full = {
+        "type": "item", "id": "Q1",
+        "labels": {"en": {"language": "en", "value": "graphene"}},
+        "descriptions": {}, "aliases": {"en": [{"language": "en", "value": "graphite monolayer"}]},
+        "claims": {
+            "P31": [{"mainsnak": {"datavalue": {"value": {"id": "Q2"}}}, "references": [{}], "rank": "normal"}],
+            "P279": [{"mainsnak": {"snaktype": "novalue"}}],
+            "P18": [{"mainsnak": {"datavalue": {"value": "Graphene.png"}}}],
+        },
+        "sitelinks": {"enwiki": {}, "frwiki": {}},
+    }
+    slim = wikidata_api.slim_entity(full)
+    assert slim["claims"] == {"P31": [{"mainsnak": {"datavalue": {"value": {"id": "Q2"}}}}]}
+    assert wikidata_api.get_p31_ids(slim) == wikidata_api.get_p31_ids(full) == {"Q2"}
+    assert wikidata_api.sitelink_count(slim) == wikidata_api.sitelink_count(full) == 2
+    assert wikidata_api.claims_count(slim) == wikidata_api.claims_count(full) == 3
+    assert wikidata_api.extract_label(slim) == wikidata_api.extract_label(full)
+    assert wikidata_api.slim_entity(slim) is slim
+    assert wikidata_api.slim_entity({"id": "Q9", "missing": ""}) == {"id": "Q9", "missing": ""}
@@ -1,40 +1,90 @@
+import asyncio
 import re
 import time
-from typing import Dict, List, Iterable
+from functools import lru_cache
+from typing import Dict, List, Iterable, Tuple
+
+from . import config
 
 _ws_re = re.compile(r"\s+", re.UNICODE)
 _token_re = re.compile(r"[^\w\-]+")
+_kw_token_re = re.compile(r"[A-Za-z0-9\-\+]+")
+
+# Labels, aliases and keywords come back over and over: the text helpers below are
+# memoized in bounded LRUs. Longer strings (titles, abstracts) skip the caches.
+TEXT_CACHE_SIZE = int(getattr(config, "TEXT_CACHE_SIZE", 100_000))
+TEXT_CACHE_MAX_LEN = int(getattr(config, "TEXT_CACHE_MAX_LEN", 200))
+
 
+def _normalize_kw(s: str) -> str:
+    # acronyms (2-5 upper-case letters) keep their case, everything else is lower-cased
+    return " ".join([
+        t if (t.isalpha() and t.isupper() and 2 <= len(t) <= 5) else t.lower()
+        for t in _kw_token_re.findall(s)
+    ])
 
+_normalize_kw_cached = lru_cache(maxsize=TEXT_CACHE_SIZE)(_normalize_kw)
 
 
 def normalize_kw(s: str) -> str:
 
     if not s:
         return ""
-    
-    tokens = re.findall(r"[A-Za-z0-9\-\+]+", s)
-    normalized = []
-    for t in tokens:
-        
-        if t.isalpha() and t.isupper() and 2 <= len(t) <= 5:
-            normalized.append(t)
-        else:
-            normalized.append(t.lower())
-    return " ".join(normalized)
+    if len(s) > TEXT_CACHE_MAX_LEN:
+        return _normalize_kw(s)
+    return _normalize_kw_cached(s)
+
+
+def _tokenize(text: str) -> Tuple[str, ...]:
+    return tuple(t for t in _token_re.split(text) if t)
+
+_tokenize_cached = lru_cache(maxsize=TEXT_CACHE_SIZE)(_tokenize)
 
 
 def tokenize(text: str) -> List[str]:
-    return [t for t in _token_re.split((text or "")) if t]
+    # a fresh list every time: callers may modify it, the cached tuple stays intact
+    if not text:
+        return []
+    if len(text) > TEXT_CACHE_MAX_LEN:
+        return list(_tokenize(text))
+    return list(_tokenize_cached(text))
 
-def singularize_en(word: str) -> str:
-    w = normalize_kw(word)
+
+def _singularize_uncached(word: str) -> str:
+    # no cache anywhere in the chain (normalize_kw included): the cached entry point
+    # below stores the result, and bench_text times this as the uncached baseline
+    w = _normalize_kw(word)
     wl = w.lower()
     if len(w) > 3 and wl.endswith("ies"): return w[:-3] + "y"
     if len(w) > 3 and wl.endswith("ses"): return w[:-2]
     if len(w) > 2 and wl.endswith("s") and not wl.endswith("ss"): return w[:-1]
     return w
 
+_singularize_en = lru_cache(maxsize=TEXT_CACHE_SIZE)(_singularize_uncached)
+
+
+def singularize_en(word: str) -> str:
+    if not word:
+        return ""
+    if len(word) > TEXT_CACHE_MAX_LEN:
+        return _singularize_uncached(word)
+    return _singularize_en(word)
+
+
+def clear_text_caches() -> None:
+    for fn in (_normalize_kw_cached, _tokenize_cached, _singularize_en):
+        fn.cache_clear()
+
+
+def text_cache_stats() -> Dict[str, Dict[str, int]]:
+    """hits / misses / size of the normalize_kw, tokenize and singularize_en caches."""
+    out = {}
+    for name, fn in (("normalize_kw", _normalize_kw_cached), ("tokenize", _tokenize_cached),
+                     ("singularize_en", _singularize_en)):
+        info = fn.cache_info()
+        out[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+    return out
+
 def chunked(seq: List[str], size: int) -> Iterable[List[str]]:
     for i in range(0, len(seq), size):
         yield seq[i:i + size]
@@ -42,3 +92,6 @@ def chunked(seq: List[str], size: int) -> Iterable[List[str]]:
 def backoff_sleep(attempt: int):
     
     time.sleep(0.5 * (attempt + 1))
+
+async def abackoff_sleep(attempt: int):
+    await asyncio.sleep(0.5 * (attempt + 1))
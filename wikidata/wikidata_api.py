@@ -1,63 +1,265 @@
+import asyncio
 from typing import Dict, List, Optional, Tuple
-import requests
 from . import config
-from .utils import normalize_kw, chunked, backoff_sleep
-
-def _get(params: Dict, sleep_sec: float = 0.1) -> Dict:
-    params = {**params, "format": "json"}
-    for attempt in range(5):
-        try:
-            r = requests.get(config.WIKIDATA_API, params=params, headers=config.HEADERS, timeout=20)
-            r.raise_for_status()
-            data = r.json()
-            if "error" in data:
-                raise RuntimeError(data["error"])
-            # 
-            return data
-        except Exception:
-            if attempt == 4:
-                raise
-            backoff_sleep(attempt)
-    return {}
+from .utils import normalize_kw, chunked
+from .cache import DiskCache, open_cache
+from .async_client import get_client, run_sync
 
-def wbsearchentities(search: str, language: str = "en", limit: int = config.SEARCH_LIMIT) -> List[Dict]:
+_entity_cache: Optional[DiskCache] = None
+_search_caches: Optional[Tuple[DiskCache, DiskCache]] = None
+_offline_store = None  # OfflineStore, opened lazily
+
+# Entity fetches currently on the wire, keyed like the entity cache.
+# Only touched from the I/O event loop, so no lock is needed.
+_inflight: Dict[str, asyncio.Future] = {}
+_coalesce_stats = {"requested_ids": 0, "fetched_ids": 0, "coalesced_ids": 0}
+
+def _get_offline_store():
+    """The local dump-based store when OFFLINE_MODE is on, else None."""
+    global _offline_store
+    if not getattr(config, "OFFLINE_MODE", False):
+        return None
+    if _offline_store is None:
+        from .offline_store import OfflineStore  # offline_store imports this module
+        _offline_store = OfflineStore(config.OFFLINE_STORE_PATH)
+    return _offline_store
+
+async def _aget(params: Dict) -> Dict:
+    return await get_client().get(params)
+
+def _get(params: Dict) -> Dict:
+    """Blocking call through the shared async client (paced by its rate limiter)."""
+    return run_sync(_aget(params))
+
+def _get_search_caches() -> Optional[Tuple[DiskCache, DiskCache]]:
+    """(hits cache, negative cache) for search results, or None when disabled."""
+    global _search_caches
+    if not getattr(config, "ENABLE_SEARCH_CACHE", False):
+        return None
+    if _search_caches is None:
+        max_entries = getattr(config, "SEARCH_CACHE_MAX_ENTRIES", 200_000)
+        _search_caches = (
+            open_cache("searches", getattr(config, "SEARCH_CACHE_TTL_SEC", 7 * 24 * 3600), max_entries),
+            open_cache("searches_empty", getattr(config, "SEARCH_CACHE_NEGATIVE_TTL_SEC", 24 * 3600), max_entries),
+        )
+    return _search_caches
+
+def search_cache_stats() -> Dict:
+    """Hit/miss counters of the search cache (positive and negative tables)."""
+    caches = _get_search_caches()
+    if not caches:
+        return {}
+    pos, neg = caches[0].stats(), caches[1].stats()
+    # a lookup goes to the positive table first, then to the negative one
+    lookups = pos["hits"] + pos["misses"]
+    hits = pos["hits"] + neg["hits"]
+    return {
+        "hits": hits,
+        "misses": lookups - hits,
+        "negative_hits": neg["hits"],
+        "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+    }
+
+async def _acached_search(mode: str, search: str, language: str, limit: int) -> List[Dict]:
+    """Run a wbsearchentities query, answering from the search cache when possible."""
     search = normalize_kw(search)
-    return _get({
+    offline = _get_offline_store()
+    if offline:
+        return offline.search(search, language, limit, label_only=(mode == "label"))
+    caches = _get_search_caches()
+    key = f"{mode}|{language}|{limit}|{search}"
+    if caches:
+        hit = caches[0].get(key)
+        if hit is None:
+            hit = caches[1].get(key)
+        if hit is not None:
+            return hit
+
+    term = f"label:{search}" if mode == "label" else search
+    data = await _aget({
         "action": "wbsearchentities",
-        "search": search,
+        "search": term,
         "language": language,
         "uselang": language,
         "type": "item",
         "limit": limit,
         "strictlanguage": 0,
-    }).get("search", [])
+    })
+    results = data.get("search", [])
+
+    if caches:
+        (caches[0] if results else caches[1]).put(key, results)
+    return results
+
+async def awbsearchentities(search: str, language: str = "en", limit: int = config.SEARCH_LIMIT) -> List[Dict]:
+    return await _acached_search("default", search, language, limit)
+
+async def awbsearch_label_only(search: str, language: str = "en", limit: int = config.SEARCH_LIMIT) -> List[Dict]:
+    return await _acached_search("label", search, language, limit)
+
+def wbsearchentities(search: str, language: str = "en", limit: int = config.SEARCH_LIMIT) -> List[Dict]:
+    return run_sync(awbsearchentities(search, language, limit))
 
 def wbsearch_label_only(search: str, language: str = "en", limit: int = config.SEARCH_LIMIT) -> List[Dict]:
-    search = normalize_kw(search)
-    return _get({
-        "action": "wbsearchentities",
-        "search": f"label:{search}",
-        "language": language,
-        "uselang": language,
-        "type": "item",
-        "limit": limit,
-        "strictlanguage": 0,
-    }).get("search", [])
+    return run_sync(awbsearch_label_only(search, language, limit))
 
-def wbgetentities(ids: List[str], languages: List[str] = None) -> Dict:
-    from .utils import chunked
-    languages = languages or config.LANGS
-    combined = {}
-    for batch in chunked(list(ids), 50):
-        data = _get({
+def _get_entity_cache() -> Optional[DiskCache]:
+    """Lazily open the persistent entity cache (None when disabled)."""
+    global _entity_cache
+    if not getattr(config, "ENABLE_ENTITY_CACHE", False):
+        return None
+    if _entity_cache is None:
+        _entity_cache = open_cache(
+            "entities",
+            ttl_sec=getattr(config, "ENTITY_CACHE_TTL_SEC", 30 * 24 * 3600),
+            max_entries=getattr(config, "ENTITY_CACHE_MAX_ENTRIES", 500_000),
+        )
+    return _entity_cache
+
+def _entity_key(qid: str, languages: List[str]) -> str:
+    key = f"{qid}|{','.join(sorted(languages))}"
+    return key + "|slim" if getattr(config, "SLIM_ENTITIES", False) else key
+
+def slim_entity(entity: Dict) -> Dict:
+    """
+    Project a wbgetentities payload onto what the matcher reads:
+    labels/descriptions/aliases, the SLIM_CLAIM_PIDS claims reduced to their
+    datavalue, and precomputed 'sitelinks_count' / 'claims_count'.
+    Claim lists keep the API shape, so _claim_ids() and friends work unchanged.
+    """
+    if not entity or "missing" in entity or "sitelinks_count" in entity:
+        return entity
+    all_claims = entity.get("claims") or {}
+    claims = {}
+    for pid in getattr(config, "SLIM_CLAIM_PIDS", ()):
+        kept = []
+        for cl in all_claims.get(pid, []):
+            dv = cl.get("mainsnak", {}).get("datavalue")
+            if dv:
+                kept.append({"mainsnak": {"datavalue": {"value": dv.get("value")}}})
+        if kept:
+            claims[pid] = kept
+    return {
+        "type": entity.get("type", "item"),
+        "id": entity.get("id"),
+        "labels": entity.get("labels") or {},
+        "descriptions": entity.get("descriptions") or {},
+        "aliases": entity.get("aliases") or {},
+        "claims": claims,
+        "sitelinks_count": len(entity.get("sitelinks") or {}),
+        "claims_count": sum(len(v) for v in all_claims.values()),
+    }
+
+def sitelink_count(entity: Dict) -> int:
+    """Number of sitelinks, for full and slim entities alike."""
+    if not entity:
+        return 0
+    if "sitelinks_count" in entity:
+        return entity["sitelinks_count"]
+    return len(entity.get("sitelinks") or {})
+
+def claims_count(entity: Dict) -> int:
+    """Total number of claims (all properties), for full and slim entities alike."""
+    if not entity:
+        return 0
+    if "claims_count" in entity:
+        return entity["claims_count"]
+    return sum(len(v) for v in (entity.get("claims") or {}).values())
+
+def entity_cache_stats() -> Dict:
+    """Hit/miss counters of the entity cache for this run."""
+    cache = _get_entity_cache()
+    return cache.stats() if cache else {}
+
+def coalescing_stats() -> Dict:
+    """How many entity fetches were saved by sharing in-flight requests."""
+    return dict(_coalesce_stats)
+
+async def _fetch_entities(ids: List[str], languages: List[str], cache: Optional[DiskCache]) -> Dict:
+    """Fetch 'ids' from the API (50 per call, batches in parallel) and fill the cache."""
+    responses = await asyncio.gather(*(
+        _aget({
             "action": "wbgetentities",
             "ids": "|".join(batch),
             "props": "labels|descriptions|aliases|claims|sitelinks",
             "languages": "|".join(languages),
             "languagefallback": 1,
-        }, sleep_sec=0.05)
-        combined.update(data.get("entities", {}))
-    return combined
+        })
+        for batch in chunked(ids, 50)
+    ))
+    fetched = {}
+    for data in responses:
+        fetched.update(data.get("entities", {}))
+    if getattr(config, "SLIM_ENTITIES", False):
+        fetched = {q: slim_entity(ent) for q, ent in fetched.items()}
+    if cache:
+        cache.put_many({_entity_key(q, languages): ent for q, ent in fetched.items()})
+    return fetched
+
+async def awbgetentities(ids: List[str], languages: List[str] = None) -> Dict:
+    languages = languages or config.LANGS
+    offline = _get_offline_store()
+    if offline:
+        return offline.get_entities(ids, languages)
+    ids = list(dict.fromkeys(q for q in ids if q))
+    keys = {q: _entity_key(q, languages) for q in ids}
+    combined = {}
+    _coalesce_stats["requested_ids"] += len(ids)
+
+    # 1) Serve what we already have on disk
+    cache = _get_entity_cache()
+    if cache:
+        cached = cache.get_many(keys.values())
+        for q, key in keys.items():
+            if key in cached:
+                combined[q] = cached[key]
+
+    # 2) IDs another caller is already fetching: wait for its result
+    missing = [q for q in ids if q not in combined]
+    shared = {q: _inflight[keys[q]] for q in missing if keys[q] in _inflight}
+    own = [q for q in missing if q not in shared]
+    _coalesce_stats["coalesced_ids"] += len(shared)
+
+    # 3) Everything else is ours to fetch; register it so later callers can join
+    loop = asyncio.get_running_loop()
+    futures = {}
+    for q in own:
+        fut = loop.create_future()
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())  # no "never retrieved" noise
+        futures[q] = fut
+        _inflight[keys[q]] = fut
+    try:
+        fetched = await _fetch_entities(own, languages, cache) if own else {}
+        _coalesce_stats["fetched_ids"] += len(own)
+        for q, fut in futures.items():
+            if not fut.done():
+                fut.set_result(fetched.get(q))
+        combined.update(fetched)
+    except BaseException as exc:
+        for fut in futures.values():
+            if fut.done():
+                continue
+            if isinstance(exc, asyncio.CancelledError):
+                fut.cancel()
+            else:
+                fut.set_exception(exc)
+        raise
+    finally:
+        for q in own:
+            _inflight.pop(keys[q], None)
+
+    if shared:
+        # shield: a cancelled waiter must not cancel the owner's future
+        for q, ent in zip(shared, await asyncio.gather(*(asyncio.shield(f) for f in shared.values()))):
+            if ent is not None:
+                combined[q] = ent
+
+    ordered = {q: combined[q] for q in ids if q in combined}
+    ordered.update(combined)
+    return ordered
+
+def wbgetentities(ids: List[str], languages: List[str] = None) -> Dict:
+    return run_sync(awbgetentities(ids, languages))
 
 def _claim_ids(entity: Dict, pid: str) -> List[str]:
     out = []
@@ -73,28 +275,41 @@ def get_p31_ids(entity: Dict) -> set:
 def get_p101_ids(entity: Dict) -> set:
     return set(_claim_ids(entity, config.P_FIELD_OF_WORK))
 
-def expand_p279_paths(start_parents: List[str], max_levels: int, languages: List[str]) -> List[List[str]]:
+async def aexpand_p279_paths(start_parents: List[str], max_levels: int, languages: List[str]) -> List[List[str]]:
     if not start_parents:
         return []
-    paths = []
+    # Breadth-first over the shared P279 parent map: one packed request per
+    # level for classes never seen before, a dictionary lookup otherwise.
+    from .hierarchy import get_closure  # hierarchy imports this module
+    parents_of = await get_closure().aparent_map(start_parents, max_levels - 1)
+
+    # Paths are enumerated in memory from the parent map: no more requests.
+    paths, seen = [], set()
+
+    def _add(path: List[str]) -> None:
+        key = tuple(path)
+        if key not in seen:
+            seen.add(key)
+            paths.append(path)
+
     frontier = [[p] for p in start_parents]
     for _ in range(max_levels - 1):
         new_frontier = []
         for path in frontier:
-            current = path[-1]
-            ent = wbgetentities([current], languages).get(current, {})
-            parents = _claim_ids(ent, config.P_SUBCLASS_OF)
+            parents = parents_of.get(path[-1], [])
             if not parents:
-                paths.append(path)
+                _add(path)
                 continue
             for par in parents:
                 new_frontier.append(path + [par])
         frontier = new_frontier or frontier
     for p in frontier:
-        if p not in paths:
-            paths.append(p)
+        _add(p)
     return paths
 
+def expand_p279_paths(start_parents: List[str], max_levels: int, languages: List[str]) -> List[List[str]]:
+    return run_sync(aexpand_p279_paths(start_parents, max_levels, languages))
+
 def extract_bnf_id(entity: Dict) -> Optional[str]:
     for cl in entity.get("claims", {}).get(config.P_BNF_ID, []):
         dv = cl.get("mainsnak", {}).get("datavalue", {})
@@ -102,6 +317,14 @@ def extract_bnf_id(entity: Dict) -> Optional[str]:
             return str(dv["value"])
     return None
 
+def entity_text(entity: Dict) -> str:
+    """Labels, descriptions and aliases of an entity (all fetched languages) as one string."""
+    labs = " ".join([v["value"] for v in (entity.get("labels") or {}).values()])
+    desc = " ".join([v["value"] for v in (entity.get("descriptions") or {}).values()])
+    alias_lists = (entity.get("aliases") or {}).values()
+    aliases = " ".join([a["value"] for L in alias_lists for a in L])
+    return " ".join([labs, desc, aliases]).strip()
+
 def extract_label(entity: Dict, languages: List[str] = None) -> str:
     languages = languages or config.LANGS
     for lg in languages: